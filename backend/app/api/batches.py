@@ -0,0 +1,290 @@
+"""Batch task API endpoints."""
+import json
+import tarfile
+import uuid
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from pydantic import BaseModel
+
+from app.api.tasks import _check_admission, _in_use, _task_to_response
+from app.database import async_session
+from app.models.batch import TaskBatch
+from app.models.task import Task, TaskStatus
+from app.orchestrator import batch_lane, cancel_execution, dispatch_task
+from app.orchestrator.progress import TERMINAL_STATUSES, get_progress_hub
+from app.parsers.local_adapter import IMAGE_EXTENSIONS
+from app.repositories.batch_repository import BatchRepository
+from app.repositories.task_repository import TaskRepository
+from app.services.storage import StorageService
+
+
+router = APIRouter()
+
+# Most tasks accepted in one batch request
+MAX_BATCH_SIZE = 1000
+
+# Archive members larger than this are skipped (guards against bombs)
+MAX_ARCHIVE_MEMBER_BYTES = 50 * 1024 * 1024
+
+# Most image bytes unpacked from all archives of one request
+MAX_ARCHIVE_TOTAL_BYTES = 512 * 1024 * 1024
+
+# Most bytes of plain (non-archive) files in one request; they are written
+# to their task directories as they are read, never held whole in memory
+MAX_UPLOAD_TOTAL_BYTES = 8 * 1024 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+class CreateBatchRequest(BaseModel):
+    inputs: list[str]
+    options: Optional[dict] = None
+
+
+class CreateBatchResponse(BaseModel):
+    batchId: str
+    total: int
+    taskIds: list[str]
+    message: str
+
+
+async def _create_batch(tasks: list[Task], options: Optional[dict]) -> CreateBatchResponse:
+    """Insert the batch and all its tasks in one transaction, then schedule them."""
+    async with async_session() as session:
+        batch = await BatchRepository(session).create(TaskBatch(options=options), tasks)
+        await session.commit()
+
+    lane = batch_lane(batch.id)
+    for t in tasks:
+        dispatch_task(t.id, lane=lane)
+
+    return CreateBatchResponse(
+        batchId=batch.id,
+        total=len(tasks),
+        taskIds=[t.id for t in tasks],
+        message="批量任务已创建",
+    )
+
+
+def _check_size(count: int) -> None:
+    if count == 0:
+        raise HTTPException(status_code=400, detail="批量任务不能为空")
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"单个批量最多 {MAX_BATCH_SIZE} 个任务")
+
+
+def _batch_status(counts: dict[str, int], total: int) -> str:
+    """Aggregate status: pending / running / completed / partial / failed."""
+    finished = sum(counts.get(s, 0) for s in TERMINAL_STATUSES)
+    if finished < total:
+        return "pending" if counts.get(TaskStatus.PENDING.value, 0) == total else "running"
+    completed = counts.get(TaskStatus.COMPLETED.value, 0)
+    if completed == total:
+        return "completed"
+    return "partial" if completed else "failed"
+
+
+@router.post("", response_model=CreateBatchResponse)
+async def create_batch(request: CreateBatchRequest):
+    """Create one task per input, scheduled as a batch."""
+    inputs = [i.strip() for i in request.inputs if i.strip()]
+    _check_size(len(inputs))
+    await _check_admission(len(inputs))
+    metadata = {"options": request.options} if request.options else None
+    tasks = [
+        Task(
+            id=str(uuid.uuid4()),
+            input=i,
+            platform="unknown",
+            status=TaskStatus.PENDING.value,
+            metadata_=metadata,
+        )
+        for i in inputs
+    ]
+    return await _create_batch(tasks, request.options)
+
+
+def _archive_images(data: BinaryIO, filename: str, max_count: int, max_bytes: int) -> list[tuple[str, bytes]]:
+    """Image members of a zip or tar archive as (basename, bytes), in archive order.
+
+    Member sizes come from the archive index and are checked before a
+    member is read (for zip, before any is): more than ``max_count``
+    images or ``max_bytes`` in total is rejected with 400.
+    """
+    images = []
+    count = total = 0
+
+    def wanted(name: str, size: int) -> bool:
+        nonlocal count, total
+        name = Path(name).name
+        # macOS resource forks look like images but are not
+        if size > MAX_ARCHIVE_MEMBER_BYTES or name.startswith("._") or Path(name).suffix.lower() not in IMAGE_EXTENSIONS:
+            return False
+        count += 1
+        total += size
+        if count > max_count:
+            raise HTTPException(status_code=400, detail=f"单个批量最多 {MAX_BATCH_SIZE} 个任务")
+        if total > max_bytes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"压缩包内图片总大小超过 {MAX_ARCHIVE_TOTAL_BYTES // (1024 * 1024)}MB",
+            )
+        return True
+
+    try:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(data) as archive:
+                members = [i for i in archive.infolist() if not i.is_dir() and wanted(i.filename, i.file_size)]
+                images = [(Path(info.filename).name, archive.read(info)) for info in members]
+        else:
+            with tarfile.open(fileobj=data) as archive:
+                for info in archive:
+                    if info.isfile() and wanted(info.name, info.size):
+                        images.append((Path(info.name).name, archive.extractfile(info).read()))
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise HTTPException(status_code=400, detail=f"无法读取压缩包 {filename}: {e}")
+    return images
+
+
+@router.post("/upload", response_model=CreateBatchResponse)
+async def create_batch_upload(
+    files: list[UploadFile] = File(...),
+    options: Optional[str] = Form(None),
+):
+    """Create one task per uploaded file, scheduled as a batch.
+
+    A zip or tar archive contributes one task per image inside it, so a
+    screenshot dump can be uploaded as a single file; image tasks that run
+    together are recognized in shared OCR batches.
+    """
+    try:
+        task_options = json.loads(options) if options else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="options 格式错误")
+
+    storage = StorageService()
+    saved: list[tuple[str, Path]] = []  # (task id, media path)
+    unpacked = written = 0
+
+    def task_path(name: str) -> tuple[str, Path]:
+        task_id = str(uuid.uuid4())
+        ext = Path(name).suffix.lower() or ".mp4"
+        # Images keep their base name, recorded as the task's metadata.filename
+        return task_id, storage.get_task_dir(task_id) / (Path(name).name if ext in IMAGE_EXTENSIONS else f"video{ext}")
+
+    try:
+        for file in files:
+            name = file.filename or "video.mp4"
+            if name.lower().endswith(ARCHIVE_SUFFIXES):
+                # The upload is already spooled to disk; read members from it directly
+                images = _archive_images(
+                    file.file, name, MAX_BATCH_SIZE - len(saved), MAX_ARCHIVE_TOTAL_BYTES - unpacked
+                )
+                for image_name, content in images:
+                    task_id, save_path = task_path(image_name)
+                    saved.append((task_id, save_path))
+                    save_path.write_bytes(content)
+                    unpacked += len(content)
+                continue
+            _check_size(len(saved) + 1)
+            task_id, save_path = task_path(name)
+            saved.append((task_id, save_path))
+            with save_path.open("wb") as out:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    written += len(chunk)
+                    if written > MAX_UPLOAD_TOTAL_BYTES:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"上传文件总大小超过 {MAX_UPLOAD_TOTAL_BYTES // (1024 * 1024 * 1024)}GB",
+                        )
+                    out.write(chunk)
+        _check_size(len(saved))
+        await _check_admission(len(saved))
+    except BaseException:
+        for task_id, _ in saved:
+            storage.cleanup_task(task_id)
+        raise
+
+    tasks = [
+        Task(
+            id=task_id,
+            input=str(save_path),
+            platform="local",
+            status=TaskStatus.PENDING.value,
+            metadata_={"options": task_options} if task_options else None,
+        )
+        for task_id, save_path in saved
+    ]
+    return await _create_batch(tasks, task_options)
+
+
+@router.get("/{batch_id}")
+async def get_batch(batch_id: str):
+    """Batch detail with aggregate status, progress and per-status counts."""
+    async with async_session() as session:
+        repo = BatchRepository(session)
+        batch = await repo.get(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="批量任务不存在")
+        summary = await repo.status_summary(batch_id)
+
+    counts = {status: count for status, (count, _) in summary.items()}
+    # Finished tasks count as fully progressed, whatever their outcome
+    progress_sum = sum(
+        count * 100 if status in TERMINAL_STATUSES else progress
+        for status, (count, progress) in summary.items()
+    )
+    return {
+        "id": batch.id,
+        "total": batch.total,
+        "status": _batch_status(counts, batch.total),
+        "progress": progress_sum // batch.total if batch.total else 0,
+        "counts": counts,
+        "options": batch.options or {},
+        "createdAt": batch.created_at.isoformat() + "Z" if batch.created_at else None,
+    }
+
+
+@router.get("/{batch_id}/tasks")
+async def list_batch_tasks(batch_id: str, limit: int = 100, offset: int = 0):
+    """Tasks of a batch in submission order."""
+    async with async_session() as session:
+        repo = BatchRepository(session)
+        batch = await repo.get(batch_id)
+        if not batch:
+            raise HTTPException(status_code=404, detail="批量任务不存在")
+        tasks = await repo.list_tasks(batch_id, limit=limit, offset=offset)
+    return {"items": [_task_to_response(t) for t in tasks], "total": batch.total}
+
+
+@router.post("/{batch_id}/cancel")
+async def cancel_batch(batch_id: str):
+    """Cancel every unfinished task of a batch; files of tasks no execution owns yet are removed."""
+    async with async_session() as session:
+        repo = BatchRepository(session)
+        if not await repo.get(batch_id):
+            raise HTTPException(status_code=404, detail="批量任务不存在")
+        tasks = await repo.list_tasks(batch_id, limit=MAX_BATCH_SIZE)
+        task_repo = TaskRepository(session)
+        cancelled = []
+        unowned = []
+        for t in tasks:
+            if t.status not in TERMINAL_STATUSES:
+                if not await _in_use(task_repo, t.id):
+                    unowned.append(t.id)
+                await task_repo.update_status(t.id, status=TaskStatus.CANCELLED.value)
+                cancelled.append(t.id)
+        await session.commit()
+
+    hub = get_progress_hub()
+    for task_id in cancelled:
+        hub.publish(task_id, status=TaskStatus.CANCELLED.value)
+        cancel_execution(task_id)
+    storage = StorageService()
+    for task_id in unowned:
+        storage.cleanup_task(task_id)
+    return {"message": "已取消", "cancelled": len(cancelled)}
@@ -0,0 +1,43 @@
+"""System status endpoints."""
+from fastapi import APIRouter
+
+from app.config import get_settings
+from app.database import async_session
+from app.extractors.asr_backends import BACKENDS
+from app.extractors.model_registry import get_model_registry
+from app.extractors.ocr import get_ocr_engine
+from app.orchestrator import get_scheduler
+from app.orchestrator.image_batch import get_image_batcher
+from app.orchestrator.progress import get_progress_hub
+from app.orchestrator.singleflight import get_single_flight
+from app.repositories.task_repository import TaskRepository
+from app.services.ocr_cache import get_ocr_cache
+from app.services.result_cache import get_result_cache
+
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_stats():
+    """Runtime counters of the scheduler, extractors, caches and workers."""
+    async with async_session() as session:
+        workers = await TaskRepository(session).lease_summary()
+    return {
+        "scheduler": get_scheduler().stats(),
+        "singleFlight": get_single_flight().stats(),
+        "progressStreams": get_progress_hub().stats(),
+        "asr": {
+            "backend": get_settings().asr_backend,
+            "installed": {name: backend().available() for name, backend in BACKENDS.items()},
+        },
+        "ocr": {
+            "enabled": get_settings().ocr_enabled,
+            "installed": get_ocr_engine(get_settings().ocr_lang).available(),
+        },
+        "models": get_model_registry().loaded(),
+        "resultCache": await get_result_cache().stats(),
+        "ocrCache": await ocr_cache.stats() if (ocr_cache := get_ocr_cache()) else None,
+        "imageBatches": get_image_batcher().stats(),
+        "workers": workers,
+    }
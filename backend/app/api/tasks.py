@@ -1,18 +1,31 @@
 """Task API endpoints."""
+import asyncio
 import json
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from app.config import get_settings
 from app.database import async_session
-from app.models.task import Task, TaskResult, TaskStatus
+from app.models.task import Task, TaskPartialResult, TaskResult, TaskStatus
+from app.repositories.batch_repository import BatchRepository
 from app.repositories.task_repository import TaskRepository, TaskResultRepository
-from app.orchestrator import execute_task
+from app.orchestrator import cancel_execution, dispatch_task, get_scheduler
+from app.orchestrator.executor import ACTIVE_STATUSES
+from app.orchestrator.progress import TERMINAL_STATUSES, get_progress_hub
+from app.orchestrator.singleflight import get_single_flight
 
 
 router = APIRouter()
 
+# Seconds between keep-alive comments on idle event streams
+SSE_KEEPALIVE = 15.0
+
+# Seconds between DB polls for tasks running in a worker process
+SSE_DB_POLL = 1.0
+
 
 class CreateTaskRequest(BaseModel):
     input: str
@@ -25,8 +38,15 @@ class CreateTaskResponse(BaseModel):
     message: str
 
 
-def _task_to_response(task: Task, result: Optional[TaskResult] = None) -> dict:
-    """Convert Task to API response format."""
+def _task_to_response(
+    task: Task,
+    result: Optional[TaskResult] = None,
+    partial: Optional[TaskPartialResult] = None,
+) -> dict:
+    """Convert Task to API response format.
+
+    Until the result exists, ``partial`` carries the text extracted so far.
+    """
     data = {
         "id": task.id,
         "input": task.input,
@@ -37,6 +57,7 @@ def _task_to_response(task: Task, result: Optional[TaskResult] = None) -> dict:
         "metadata": task.metadata_ or {},
         "error": task.error,
         "result": None,
+        "partial": None,
         "createdAt": task.created_at.isoformat() + "Z" if task.created_at else None,
         "updatedAt": task.updated_at.isoformat() + "Z" if task.updated_at else None,
     }
@@ -47,30 +68,81 @@ def _task_to_response(task: Task, result: Optional[TaskResult] = None) -> dict:
             "segments": segments,
             "stats": result.stats or {},
         }
+    elif partial:
+        data["partial"] = {
+            "fullText": partial.full_text,
+            "segments": partial.segments.get("items", []),
+            "updatedAt": partial.updated_at.isoformat() + "Z" if partial.updated_at else None,
+        }
     return data
 
 
+def _task_to_event(task: Task) -> dict:
+    """Progress event for a task as stored in the DB."""
+    return {
+        "taskId": task.id,
+        "status": task.status,
+        "progress": task.progress or 0,
+        "stageProgress": task.stage_progress or {},
+        "error": task.error,
+    }
+
+
+async def _check_admission(count: int = 1) -> None:
+    """Reject new tasks with 429 while the estimated backlog is over budget.
+
+    In worker mode tasks run in other processes, so the backlog is
+    estimated from the active tasks in the database.
+    """
+    scheduler = get_scheduler()
+    if get_settings().task_execution == "worker" and scheduler.backlog_budget > 0:
+        async with async_session() as session:
+            repo = TaskRepository(session)
+            active = await repo.count_by_status(ACTIVE_STATUSES)
+            workers = len(await repo.lease_summary())
+        retry_after = scheduler.admit(count, backlog=active * scheduler.default_cost, workers=workers)
+    else:
+        retry_after = scheduler.admit(count)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="任务队列繁忙，请稍后重试",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _event_stream(generator) -> StreamingResponse:
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("", response_model=CreateTaskResponse)
-async def create_task(
-    request: CreateTaskRequest,
-    background_tasks: BackgroundTasks,
-):
+async def create_task(request: CreateTaskRequest):
     """Create extraction task."""
     from app.database import async_session
     from app.models.task import Task
 
+    await _check_admission()
     async with async_session() as session:
         repo = TaskRepository(session)
         task = Task(
             input=request.input,
             platform="unknown",
             status=TaskStatus.PENDING.value,
+            metadata_={"options": request.options} if request.options else None,
         )
         await repo.create(task)
         await session.commit()
         task_id = task.id
 
-    background_tasks.add_task(execute_task, task_id)
+    dispatch_task(task_id)
 
     return CreateTaskResponse(
         taskId=task_id,
@@ -81,7 +153,6 @@ async def create_task(
 
 @router.post("/upload", response_model=CreateTaskResponse)
 async def create_task_upload(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     options: Optional[str] = Form(None),
 ):
@@ -92,6 +163,12 @@ async def create_task_upload(
     from app.models.task import Task
     from app.services.storage import StorageService
 
+    try:
+        task_options = json.loads(options) if options else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="options 格式错误")
+    await _check_admission()
+
     task_id = str(uuid.uuid4())
     storage = StorageService()
     task_dir = storage.get_task_dir(task_id)
@@ -107,11 +184,12 @@ async def create_task_upload(
             input=str(save_path),
             platform="local",
             status=TaskStatus.PENDING.value,
+            metadata_={"options": task_options} if task_options else None,
         )
         await repo.create(task)
         await session.commit()
 
-    background_tasks.add_task(execute_task, task_id)
+    dispatch_task(task_id)
 
     return CreateTaskResponse(
         taskId=task_id,
@@ -120,6 +198,105 @@ async def create_task_upload(
     )
 
 
+async def _poll_running_events():
+    """Events for every running task, from the DB: worker processes publish nothing here."""
+
+    async def load_active() -> dict[str, dict]:
+        async with async_session() as session:
+            tasks = await TaskRepository(session).list_by_status(ACTIVE_STATUSES)
+        return {t.id: _task_to_event(t) for t in tasks}
+
+    async def load_final(task_ids: list[str]) -> list[dict]:
+        async with async_session() as session:
+            repo = TaskRepository(session)
+            tasks = [await repo.get(task_id) for task_id in task_ids]
+        return [_task_to_event(t) for t in tasks if t]
+
+    last = await load_active()
+    for event in last.values():
+        yield _sse(event)
+    idle = 0.0
+    while True:
+        await asyncio.sleep(SSE_DB_POLL)
+        current = await load_active()
+        events = [e for task_id, e in current.items() if last.get(task_id) != e]
+        # Tasks that left the active set: send their final state once
+        ended = [task_id for task_id in last if task_id not in current]
+        if ended:
+            events += await load_final(ended)
+        last = current
+        for event in events:
+            yield _sse(event)
+        idle = 0.0 if events else idle + SSE_DB_POLL
+        if idle >= SSE_KEEPALIVE:
+            yield ": keepalive\n\n"
+            idle = 0.0
+
+
+@router.get("/events")
+async def stream_all_events():
+    """Server-sent progress events for every running task (history view)."""
+    if get_settings().task_execution == "worker":
+        return _event_stream(_poll_running_events())
+    hub = get_progress_hub()
+
+    async def stream():
+        with hub.subscribe() as queue:
+            for state in hub.running():
+                yield _sse(state)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+
+    return _event_stream(stream())
+
+
+@router.get("/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """Server-sent progress events for one task, ending when it finishes.
+
+    The first event is the current state; the result itself is fetched
+    with GET /api/tasks/{task_id} once a terminal event arrives.
+    """
+    hub = get_progress_hub()
+
+    async def load_event() -> Optional[dict]:
+        async with async_session() as session:
+            task = await TaskRepository(session).get(task_id)
+        return _task_to_event(task) if task else None
+
+    if await load_event() is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    # Worker processes publish nothing to this process's hub: poll the DB
+    poll = SSE_DB_POLL if get_settings().task_execution == "worker" else SSE_KEEPALIVE
+
+    async def stream():
+        # Subscribe before reading state, so no update falls in between
+        with hub.subscribe(task_id) as queue:
+            event = hub.snapshot(task_id) or await load_event()
+            last, idle = None, 0.0
+            while event is not None:
+                if event != last or idle >= SSE_KEEPALIVE:
+                    # Unchanged state is resent only as a keep-alive
+                    yield _sse(event)
+                    last, idle = event, 0.0
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), poll)
+                except asyncio.TimeoutError:
+                    # Falls back to the DB for tasks not running in this process
+                    idle += poll
+                    event = hub.snapshot(task_id) or await load_event()
+
+    return _event_stream(stream())
+
+
 @router.get("/{task_id}")
 async def get_task(task_id: str):
     """Get task detail."""
@@ -130,12 +307,25 @@ async def get_task(task_id: str):
         if not task:
             raise HTTPException(status_code=404, detail="任务不存在")
         result = await result_repo.get(task_id)
-        return _task_to_response(task, result)
+        partial = None if result else await result_repo.get_partial(task_id)
+        return _task_to_response(task, result, partial)
+
+
+async def _in_use(repo: TaskRepository, task_id: str) -> bool:
+    """Whether an execution owns the task's directory and removes it when it stops.
+
+    A task not yet attached to a flight here or leased by a worker has no
+    such owner: a queued task, or one still being parsed.
+    """
+    # A cancelled leader's directory may still serve its followers, here or in a worker
+    return get_single_flight().get(task_id) is not None or await repo.is_leased(task_id)
 
 
 @router.post("/{task_id}/cancel")
 async def cancel_task(task_id: str):
-    """Cancel task."""
+    """Cancel task; files of a task no execution owns yet are removed here."""
+    from app.services.storage import StorageService
+
     async with async_session() as session:
         repo = TaskRepository(session)
         task = await repo.get(task_id)
@@ -143,8 +333,13 @@ async def cancel_task(task_id: str):
             raise HTTPException(status_code=404, detail="任务不存在")
         if task.status in (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value):
             raise HTTPException(status_code=400, detail="任务已结束，无法取消")
+        in_use = await _in_use(repo, task_id)
         await repo.update_status(task_id, status=TaskStatus.CANCELLED.value)
         await session.commit()
+    get_progress_hub().publish(task_id, status=TaskStatus.CANCELLED.value)
+    cancel_execution(task_id)
+    if not in_use:
+        StorageService().cleanup_task(task_id)
     return {"message": "已取消"}
 
 
@@ -178,7 +373,7 @@ async def list_tasks(
 
 @router.delete("/{task_id}")
 async def delete_task(task_id: str):
-    """Delete task."""
+    """Delete task; a running one is cancelled, and its executor removes its files if it has one."""
     from app.services.storage import StorageService
 
     async with async_session() as session:
@@ -187,9 +382,16 @@ async def delete_task(task_id: str):
         task = await repo.get(task_id)
         if not task:
             raise HTTPException(status_code=404, detail="任务不存在")
+        running = task.status not in TERMINAL_STATUSES
+        in_use = await _in_use(repo, task_id)
         await result_repo.delete(task_id)
+        await BatchRepository(session).remove_task(task_id)
         await repo.delete(task_id)
         await session.commit()
 
-    StorageService().cleanup_task(task_id)
+    if running:
+        get_progress_hub().publish(task_id, status=TaskStatus.CANCELLED.value)
+        cancel_execution(task_id)
+    if not in_use:
+        StorageService().cleanup_task(task_id)
     return {"message": "已删除"}
@@ -0,0 +1,105 @@
+"""Cooperative cancellation shared between the event loop and worker threads."""
+import subprocess
+import threading
+from typing import Callable, Optional
+
+
+class TaskCancelledError(Exception):
+    """Raised inside blocking work when its task has been cancelled."""
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag.
+
+    Blocking code polls ``raise_if_cancelled`` at safe points. Child
+    processes registered with the token are killed as soon as it is
+    cancelled, so ffmpeg / yt-dlp stop immediately instead of at the next
+    poll.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: set[subprocess.Popen] = set()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel and kill registered child processes."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            processes = list(self._processes)
+            callbacks = list(self._callbacks)
+        for proc in processes:
+            _kill(proc)
+        for callback in callbacks:
+            callback()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TaskCancelledError("任务已取消")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout. Returns True if cancelled."""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run callback on cancel (immediately if already cancelled).
+
+        Returns a function that unregisters the callback, for callers that
+        outlive their interest in this token.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def register_process(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._processes.add(proc)
+                return
+        _kill(proc)
+
+    def unregister_process(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(proc)
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+def run_process(cmd: list[str], token: Optional[CancellationToken] = None) -> subprocess.CompletedProcess:
+    """Like ``subprocess.run(cmd, check=True, capture_output=True)``, but killable via token."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if token is not None:
+        token.register_process(proc)
+    try:
+        stdout, stderr = proc.communicate()
+    finally:
+        if token is not None:
+            token.unregister_process(proc)
+    if token is not None:
+        token.raise_if_cancelled()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
@@ -19,8 +19,40 @@ class Settings(BaseSettings):
     retention_days: int = 7
 
     # Extract
+    asr_backend: str = "whisper"  # whisper | faster-whisper
     asr_model: str = "base"  # whisper model: tiny, base, small, medium, large-v3
-    ocr_interval: float = 1.0  # seconds
+    asr_tiers: str = ""  # e.g. "tiny,base,small" (fastest first): pick per task; empty = always asr_model
+    asr_tier_backlog: float = 600.0  # seconds of queued work per extract slot that drop one tier
+    asr_tier_long_media: float = 1800.0  # media longer than this (seconds) drops one tier
+    asr_compute_type: str = "int8"  # faster-whisper quantization: int8, int8_float16, float16, float32
+    asr_preload: bool = False  # load and warm up the ASR model(s) at startup
+    asr_workers: int = 0  # >1: transcribe long audio in parallel windows on this many processes
+    ocr_enabled: bool = False  # recognize on-screen text in "full" mode (needs paddleocr)
+    ocr_interval: float = 1.0  # seconds between sampled frames; OCR runs only on changed ones
+    ocr_lang: str = "ch"  # PaddleOCR language
+    ocr_region: str = "auto"  # auto (detect caption band) | full | "top,bottom" height fractions, e.g. "0.7,1.0"
+    ocr_batch_size: int = 8  # caption strips stacked into one OCR call
+    ocr_hash_distance: int = 6  # changed frames within this many fingerprint bits of the last OCR'd one are skipped
+    ocr_cache_entries: int = 100000  # OCR results kept per frame fingerprint across tasks (LRU; 0 = off)
+    ocr_image_batch: int = 32  # image tasks recognized together in one extraction call
+    ocr_image_batch_window: float = 0.05  # seconds an image waits for others to join its batch
+    stream_ingest: bool = False  # remote media: run ASR on audio chunks while downloading
+
+    # Orchestrator: concurrent slots per stage
+    parse_concurrency: int = 8  # network bound
+    download_concurrency: int = 4  # network bound
+    extract_concurrency: int = 1  # CPU bound (ASR)
+    stream_concurrency: int = 2  # streamed tasks transcribing while they download
+    recover_on_startup: bool = True  # requeue interrupted tasks, resuming from checkpoints
+    queue_aging_rate: float = 1.0  # seconds of estimated cost forgiven per second queued
+    backlog_budget: float = 0  # max estimated seconds of queued work before 429 (0 = unlimited)
+
+    # Execution: "inline" runs tasks in the API process; "worker" leaves them
+    # for `python -m app.worker` processes that claim them through leases
+    task_execution: str = "inline"
+    worker_capacity: int = 4  # tasks a worker claims at once
+    lease_seconds: float = 30.0  # lease lifetime; renewed every poll while running
+    worker_poll_interval: float = 2.0  # seconds between worker claim/heartbeat rounds
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
 """Database connection and session management."""
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
@@ -20,6 +21,18 @@ async_session = async_sessionmaker(
 )
 
 
+def upsert(table):
+    """INSERT for ``table`` with ``on_conflict_do_update`` / ``on_conflict_do_nothing``.
+
+    Supported on SQLite and PostgreSQL, the two databases the app runs on.
+    """
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"upsert is not supported on {engine.dialect.name}")
+
+
 class Base(DeclarativeBase):
     """SQLAlchemy declarative base."""
     pass
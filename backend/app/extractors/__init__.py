@@ -1,5 +1,5 @@
 """Content extractors."""
 from app.extractors.models import TextSegment, TextSource, MergedResult
-from app.extractors.pipeline import ExtractPipeline
+from app.extractors.pipeline import ExtractPipeline, get_pipeline
 
-__all__ = ["TextSegment", "TextSource", "MergedResult", "ExtractPipeline"]
+__all__ = ["TextSegment", "TextSource", "MergedResult", "ExtractPipeline", "get_pipeline"]
@@ -1,34 +1,40 @@
-"""ASR extractor using Whisper."""
-import subprocess
-import tempfile
-from pathlib import Path
+"""ASR extractor on a pluggable speech recognition backend."""
 from typing import Callable, Optional
 
+from app.cancellation import CancellationToken
+from app.extractors.asr_backends import BackendUnavailableError, get_backend
+from app.extractors.asr_parallel import PARALLEL_MIN_SECONDS, get_asr_pool, plan_chunks
+from app.extractors.audio import SAMPLE_RATE, STREAM_CHUNK_SECONDS, AudioStream, decode_pcm
+from app.extractors.model_registry import get_model_registry
 from app.extractors.models import TextSegment, TextSource
 
 
-def _extract_audio(video_path: str, output_path: str) -> str:
-    """Extract audio from video using ffmpeg."""
-    cmd = [
-        "ffmpeg", "-y", "-i", video_path,
-        "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1",
-        output_path,
-    ]
-    subprocess.run(cmd, check=True, capture_output=True)
-    return output_path
+# Characters of preceding transcript passed as the prompt for the next chunk
+PROMPT_CHARS = 200
 
+# Incremental backends get windows of at most this much audio, so only one
+# window is held as float32 (30 min is about 115 MB) and audio spilled to
+# a memory-mapped file is read a window at a time
+INCREMENTAL_WINDOW_SECONDS = 1800.0
 
-def _whisper_to_segments(result: dict) -> list[TextSegment]:
-    """Convert Whisper result to TextSegments."""
+SegmentCallback = Callable[[list[TextSegment]], None]
+
+
+def _prompt(segments: list[TextSegment]) -> Optional[str]:
+    return "".join(s.text for s in segments[-5:])[-PROMPT_CHARS:] or None
+
+
+def _to_segments(raw_segments: list[dict], offset: float = 0.0) -> list[TextSegment]:
+    """Convert backend segments to TextSegments, shifted by offset seconds."""
     segments = []
-    for seg in result.get("segments", []):
+    for seg in raw_segments:
         text = seg.get("text", "").strip()
         if not text:
             continue
         segments.append(TextSegment(
             source=TextSource.ASR,
-            start_time=float(seg.get("start", 0)),
-            end_time=float(seg.get("end", 0)),
+            start_time=offset + float(seg.get("start", 0)),
+            end_time=offset + float(seg.get("end", 0)),
             text=text,
             confidence=1.0,
         ))
@@ -36,40 +42,152 @@ def _whisper_to_segments(result: dict) -> list[TextSegment]:
 
 
 class ASRExtractor:
-    """Extract speech from video using Whisper."""
+    """Extract speech from video with the configured ASR backend.
 
-    def __init__(self, model_size: str = "base", language: str = "zh"):
+    ``model_size`` is the default; each call may pick another size, and
+    every size used stays resident. With ``workers`` > 1, long audio is
+    transcribed in parallel windows on a process pool instead of by the
+    shared in-process model. Raises BackendUnavailableError when the
+    backend is not installed or its model cannot be loaded.
+    """
+
+    def __init__(
+        self,
+        model_size: str = "base",
+        language: str = "zh",
+        workers: int = 0,
+        backend: Optional[str] = None,
+    ):
         self.model_size = model_size
         self.language = language
-        self._model = None
+        self.workers = workers
+        self.backend = get_backend(backend)
 
-    def _load_model(self):
-        """Lazy load Whisper model."""
-        if self._model is None:
-            import whisper
-            self._model = whisper.load_model(self.model_size)
-        return self._model
+    def _load_model(self, model_size: str):
+        """Get the shared model, loading it once per process."""
+        try:
+            return get_model_registry().get(model_size, self.backend.name)
+        except BackendUnavailableError:
+            raise
+        except Exception as e:
+            raise BackendUnavailableError(f"ASR 模型 {self.backend.name}/{model_size} 加载失败: {e}") from e
+
+    def _transcribe(
+        self,
+        model_size: str,
+        model,
+        samples,
+        cancel_token: Optional[CancellationToken],
+        prompt: Optional[str] = None,
+    ) -> list[dict]:
+        with get_model_registry().inference(model_size, cancel_token, self.backend.name):
+            return self.backend.transcribe(
+                model,
+                samples,
+                language=self.language,
+                initial_prompt=prompt,
+                cancel_token=cancel_token,
+            )
 
     def extract(
         self,
         media_path: str,
-        progress_callback: Optional[Callable[[int, int], None]] = None,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        segment_callback: Optional[SegmentCallback] = None,
+        model_size: Optional[str] = None,
     ) -> list[TextSegment]:
-        """Extract speech from video."""
-        try:
-            model = self._load_model()
-        except Exception as e:
-            return []  # Fallback: no ASR if whisper not available
+        """Extract speech from video.
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            audio_path = f.name
-        try:
-            _extract_audio(media_path, audio_path)
-            result = model.transcribe(
-                audio_path,
-                language=self.language,
-                word_timestamps=False,
-            )
-            return _whisper_to_segments(result)
-        finally:
-            Path(audio_path).unlink(missing_ok=True)
+        The audio is decoded into memory and transcribed incrementally:
+        ``segment_callback`` receives each batch of new segments as soon as
+        it is decoded, and ``progress_callback`` the percentage of audio
+        processed so far.
+        """
+        model_size = model_size or self.model_size
+        model = None
+        self.backend.ensure_available()
+        if self.workers <= 1:  # Otherwise worker processes load their own models
+            model = self._load_model(model_size)
+
+        pcm = decode_pcm(media_path, cancel_token)
+        duration = len(pcm) / SAMPLE_RATE
+        if model is None:
+            if duration >= PARALLEL_MIN_SECONDS:
+                return get_asr_pool(self.backend.name, self.workers, self.model_size).transcribe(
+                    pcm,
+                    model_size,
+                    self.language,
+                    cancel_token,
+                    progress_callback=progress_callback,
+                    segment_callback=segment_callback,
+                )
+            model = self._load_model(model_size)  # Too short to be worth splitting
+
+        def report(new: list[TextSegment], position: float) -> None:
+            if segment_callback and new:
+                segment_callback(new)
+            if progress_callback and duration:
+                progress_callback(min(99, int(position * 100 / duration)))
+
+        segments: list[TextSegment] = []
+        if self.backend.incremental:
+            for chunk in plan_chunks(pcm, INCREMENTAL_WINDOW_SECONDS):
+                samples = pcm[chunk.own_start:chunk.own_end].astype("float32")
+                samples /= 32768.0
+                offset = chunk.own_start / SAMPLE_RATE
+                with get_model_registry().inference(model_size, cancel_token, self.backend.name):
+                    for raw in self.backend.transcribe_iter(
+                        model, samples, language=self.language, initial_prompt=_prompt(segments),
+                        cancel_token=cancel_token,
+                    ):
+                        new = _to_segments([raw], offset)
+                        segments.extend(new)
+                        report(new, offset + float(raw.get("end", 0)))
+                del samples  # Before the next window is copied
+            return segments
+
+        # The engine only returns at the end: feed it windows cut at quiet
+        # points, carrying the transcript tail over as the prompt. The model
+        # lock is held per window, so other tasks can interleave.
+        for chunk in plan_chunks(pcm, STREAM_CHUNK_SECONDS):
+            samples = pcm[chunk.own_start:chunk.own_end].astype("float32")
+            samples /= 32768.0
+            offset = chunk.own_start / SAMPLE_RATE
+            raw = self._transcribe(model_size, model, samples, cancel_token, _prompt(segments))
+            new = _to_segments(raw, offset)
+            segments.extend(new)
+            report(new, chunk.own_end / SAMPLE_RATE)
+        return segments
+
+    def extract_stream(
+        self,
+        audio: AudioStream,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        duration: Optional[float] = None,
+        segment_callback: Optional[SegmentCallback] = None,
+        model_size: Optional[str] = None,
+    ) -> list[TextSegment]:
+        """Transcribe audio chunk by chunk while it is still being decoded.
+
+        The model lock is held per chunk, so other tasks can interleave.
+        The tail of the transcript so far is passed as the prompt for the
+        next chunk to keep wording consistent across chunk boundaries.
+        ``duration`` (seconds, if known) is used for progress; each chunk's
+        segments are passed to ``segment_callback``.
+        """
+        model_size = model_size or self.model_size
+        model = self._load_model(model_size)
+
+        segments: list[TextSegment] = []
+        for offset, samples in audio.chunks(cancel_token=cancel_token):
+            raw = self._transcribe(model_size, model, samples, cancel_token, _prompt(segments))
+            new = _to_segments(raw, offset)
+            segments.extend(new)
+            if segment_callback and new:
+                segment_callback(new)
+            if progress_callback and duration:
+                done = offset + len(samples) / SAMPLE_RATE
+                progress_callback(min(99, int(done * 100 / duration)))
+        return segments
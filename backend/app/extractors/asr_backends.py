@@ -0,0 +1,167 @@
+"""Speech recognition engines behind a common interface.
+
+Each backend loads a model by size and transcribes 16 kHz float32 samples
+into Whisper-style segment dicts ``{"start", "end", "text"}``, which
+``asr`` turns into TextSegments. The engine is chosen with ``ASR_BACKEND``.
+"""
+import importlib.util
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from app.cancellation import CancellationToken
+
+
+class BackendUnavailableError(RuntimeError):
+    """An extraction engine (ASR backend, OCR) is not installed or fails to load."""
+
+
+class ASRBackend(ABC):
+    """Interface for one ASR engine.
+
+    ``transcribe`` may be called from several threads, but never on the
+    same model at once: callers hold the model registry's inference lock.
+    """
+
+    name: str = ""
+    package: str = ""  # Import name, checked before loading
+    install_hint: str = ""
+    # Whether transcribe_iter yields segments while decoding, rather than
+    # all at the end; callers window the audio themselves otherwise
+    incremental: bool = False
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.package) is not None
+
+    def ensure_available(self) -> None:
+        if not self.available():
+            raise BackendUnavailableError(f"ASR 后端 {self.name} 未安装（{self.install_hint}），已跳过语音识别")
+
+    @abstractmethod
+    def load(self, model_size: str, threads: int = 0) -> Any:
+        """Load a model; ``threads`` > 0 caps the CPU threads it uses."""
+        pass
+
+    @abstractmethod
+    def transcribe(
+        self,
+        model: Any,
+        samples: "np.ndarray",
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> list[dict]:
+        """Transcribe samples into segment dicts."""
+        pass
+
+    def transcribe_iter(
+        self,
+        model: Any,
+        samples: "np.ndarray",
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Iterator[dict]:
+        """Yield segments in time order, as soon as the engine produces them."""
+        yield from self.transcribe(model, samples, language, initial_prompt, cancel_token)
+
+
+@contextmanager
+def _cancellable(model, cancel_token: Optional[CancellationToken]):
+    """Check the token before each 30 s window Whisper decodes.
+
+    transcribe() calls ``model.decode`` once per window, so shadowing it on
+    the instance gives a cancellation point every few seconds of compute.
+    Callers must hold the model's inference lock.
+    """
+    if cancel_token is None:
+        yield
+        return
+    decode = model.decode
+
+    def checked_decode(*args, **kwargs):
+        cancel_token.raise_if_cancelled()
+        return decode(*args, **kwargs)
+
+    model.decode = checked_decode
+    try:
+        yield
+    finally:
+        del model.decode
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper on PyTorch."""
+
+    name = "whisper"
+    package = "whisper"
+    install_hint = "pip install openai-whisper"
+
+    def load(self, model_size: str, threads: int = 0) -> Any:
+        import whisper
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return whisper.load_model(model_size)
+
+    def transcribe(self, model, samples, language=None, initial_prompt=None, cancel_token=None) -> list[dict]:
+        with _cancellable(model, cancel_token):
+            result = model.transcribe(
+                samples,
+                language=language,
+                initial_prompt=initial_prompt,
+                word_timestamps=False,
+            )
+        return [
+            {"start": seg.get("start", 0), "end": seg.get("end", 0), "text": seg.get("text", "")}
+            for seg in result.get("segments", [])
+        ]
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper: the Whisper models on CTranslate2, int8 on CPU by default."""
+
+    name = "faster-whisper"
+    package = "faster_whisper"
+    install_hint = "pip install faster-whisper"
+    incremental = True
+
+    def __init__(self, compute_type: str = "int8"):
+        self.compute_type = compute_type
+
+    def load(self, model_size: str, threads: int = 0) -> Any:
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(model_size, device="auto", compute_type=self.compute_type, cpu_threads=threads)
+
+    def transcribe(self, model, samples, language=None, initial_prompt=None, cancel_token=None) -> list[dict]:
+        return list(self.transcribe_iter(model, samples, language, initial_prompt, cancel_token))
+
+    def transcribe_iter(self, model, samples, language=None, initial_prompt=None, cancel_token=None) -> Iterator[dict]:
+        # Segments are decoded lazily as the generator is consumed, so the
+        # token is checked between segments
+        segments, _info = model.transcribe(samples, language=language, initial_prompt=initial_prompt)
+        for seg in segments:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            yield {"start": seg.start, "end": seg.end, "text": seg.text}
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> ASRBackend:
+    """Backend by name, defaulting to ``ASR_BACKEND``. Raises ValueError if unknown."""
+    from app.config import get_settings
+
+    settings = get_settings()
+    name = name or settings.asr_backend
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 ASR 后端: {name}（可选: {', '.join(BACKENDS)}）")
+    if name == FasterWhisperBackend.name:
+        return FasterWhisperBackend(settings.asr_compute_type)
+    return BACKENDS[name]()
@@ -0,0 +1,364 @@
+"""Chunked ASR transcription on a process pool.
+
+Long audio is split at quiet points into windows that overlap slightly,
+each window is transcribed in its own process and the segments are
+shifted back to absolute time and stitched. Each window reaches its
+worker through its own shared memory segment, not a file. Wall-clock
+time then scales with the number of worker processes instead of one
+core's throughput.
+"""
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+from app.cancellation import CancellationToken, TaskCancelledError
+from app.extractors.asr_backends import BackendUnavailableError, get_backend
+from app.extractors.audio import SAMPLE_RATE
+from app.extractors.models import TextSegment, TextSource
+
+# Window length bounds; within them, aim for two windows per worker
+MIN_CHUNK_SECONDS = 30.0
+MAX_CHUNK_SECONDS = 300.0
+
+# Shorter audio is transcribed in one piece
+PARALLEL_MIN_SECONDS = 2 * MIN_CHUNK_SECONDS
+
+# Audio shared by neighbouring windows, so words at a cut are heard whole
+OVERLAP_SECONDS = 1.0
+
+# How far from the nominal boundary to look for a quiet cut point
+CUT_SEARCH_SECONDS = 3.0
+
+# Energy is measured over frames of this length when choosing a cut
+ENERGY_FRAME_SECONDS = 0.02
+
+# Windows copied to shared memory and queued per worker; the rest wait
+# their turn so memory holds a few windows, not the whole input
+IN_FLIGHT_PER_WORKER = 2
+
+
+@dataclass
+class Chunk:
+    """A window of audio to transcribe.
+
+    Samples ``[start, end)`` are transcribed; segments whose midpoint lies
+    in ``[own_start, own_end)`` are kept, the rest belong to a neighbour.
+    """
+
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+
+
+def chunk_seconds_for(duration: float, workers: int) -> float:
+    """Window length giving about two windows per worker."""
+    return min(MAX_CHUNK_SECONDS, max(MIN_CHUNK_SECONDS, duration / (2 * max(1, workers))))
+
+
+def _quietest_point(samples, lo: int, hi: int) -> int:
+    """Sample index of the lowest-energy frame in ``[lo, hi)``."""
+    import numpy as np
+
+    frame = int(ENERGY_FRAME_SECONDS * SAMPLE_RATE)
+    n = (hi - lo) // frame
+    if n <= 1:
+        return (lo + hi) // 2
+    window = np.asarray(samples[lo:lo + n * frame], dtype=np.float32).reshape(n, frame)
+    energy = np.einsum("ij,ij->i", window, window)
+    return lo + int(np.argmin(energy)) * frame + frame // 2
+
+
+def plan_chunks(samples, chunk_seconds: float) -> list[Chunk]:
+    """Split samples into overlapping windows cut at low-energy points."""
+    total = len(samples)
+    size = int(chunk_seconds * SAMPLE_RATE)
+    search = int(CUT_SEARCH_SECONDS * SAMPLE_RATE)
+    overlap = int(OVERLAP_SECONDS * SAMPLE_RATE)
+
+    cuts = [0]
+    # Stop once the rest fits in one and a half windows, so the last
+    # window is never a short tail
+    while total - cuts[-1] > size + size // 2:
+        nominal = cuts[-1] + size
+        cuts.append(_quietest_point(samples, nominal - search, nominal + search))
+    cuts.append(total)
+
+    return [
+        Chunk(
+            start=max(0, own_start - overlap),
+            end=min(total, own_end + overlap),
+            own_start=own_start,
+            own_end=own_end,
+        )
+        for own_start, own_end in zip(cuts, cuts[1:])
+    ]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[\W_]+", "", text).lower()
+
+
+def stitch_segments(
+    parts: list[tuple[Chunk, list[dict]]],
+    stitched: Optional[list[TextSegment]] = None,
+) -> list[TextSegment]:
+    """Shift window-relative segments to absolute time and join them.
+
+    Each window keeps only the segments centred in the span it owns. A
+    segment that repeats the previous one's text across a cut (the same
+    words heard in both overlaps) is dropped. Passing the segments
+    stitched so far appends the following windows to that list.
+    """
+    if stitched is None:
+        stitched = []
+    for chunk, raw_segments in parts:
+        offset = chunk.start / SAMPLE_RATE
+        own_start = chunk.own_start / SAMPLE_RATE
+        own_end = chunk.own_end / SAMPLE_RATE
+        for seg in raw_segments:
+            text = seg.get("text", "").strip()
+            if not text:
+                continue
+            start = offset + float(seg.get("start", 0))
+            end = offset + float(seg.get("end", 0))
+            if not own_start <= (start + end) / 2 < own_end:
+                continue
+            if stitched:
+                prev = stitched[-1]
+                if start < prev.end_time + OVERLAP_SECONDS and _normalize(text) == _normalize(prev.text):
+                    prev.end_time = max(prev.end_time, end)
+                    continue
+            stitched.append(TextSegment(
+                source=TextSource.ASR,
+                start_time=start,
+                end_time=end,
+                text=text,
+                confidence=1.0,
+            ))
+    return stitched
+
+
+# Worker process state: models are loaded once per process, on first use
+_worker_backend = None
+_worker_threads = 0
+_worker_models: dict = {}
+
+
+def _init_worker(backend: str, threads: int, preload: str) -> None:
+    global _worker_backend, _worker_threads
+    _worker_backend = get_backend(backend)
+    _worker_threads = threads
+    try:
+        _worker_model(preload)
+    except BackendUnavailableError:
+        pass  # Raised again by the first window; failing here would break the pool for good
+
+
+def _worker_model(model_size: str):
+    if model_size not in _worker_models:
+        try:
+            _worker_models[model_size] = _worker_backend.load(model_size, _worker_threads)
+        except Exception as e:
+            raise BackendUnavailableError(f"ASR 模型 {_worker_backend.name}/{model_size} 加载失败: {e}") from e
+    return _worker_models[model_size]
+
+
+class _SharedCancelFlag:
+    """Cancellation token read from the byte after the samples in a window's segment.
+
+    The parent sets the byte when its call ends, so windows still running
+    stop at the backend's next check instead of holding a worker.
+    """
+
+    def __init__(self, buf: memoryview, index: int):
+        self._buf = buf
+        self._index = index
+
+    @property
+    def cancelled(self) -> bool:
+        return bool(self._buf[self._index])
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise TaskCancelledError("任务已取消")
+
+
+def _transcribe_window(shm_name: str, length: int, model_size: str, language: str) -> list[dict]:
+    """Transcribe the int16 window in a shared segment. Runs in a worker process.
+
+    Returns no segments if the call that submitted the window has ended.
+    """
+    import numpy as np
+
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+    except FileNotFoundError:
+        return []  # Queued to this worker before the call ended; nobody waits for it
+    try:
+        token = _SharedCancelFlag(shm.buf, length * 2)
+        if token.cancelled:
+            return []
+        window = np.ndarray((length,), dtype=np.int16, buffer=shm.buf)
+        samples = window.astype(np.float32)
+        del window  # Release the view so the segment can be closed
+        samples /= 32768.0
+        try:
+            return _worker_backend.transcribe(
+                _worker_model(model_size), samples, language=language, cancel_token=token
+            )
+        except TaskCancelledError:
+            return []
+    finally:
+        shm.close()
+
+
+def _release(shm: shared_memory.SharedMemory) -> None:
+    shm.close()
+    shm.unlink()
+
+
+class ASRProcessPool:
+    """Process pool with resident ASR models in each worker process.
+
+    Each process loads its own copy of every model size it is asked for
+    (``preload`` at start, others on first use), so memory grows with
+    ``workers``; CPU threads are divided between the processes so they
+    do not oversubscribe the cores.
+    """
+
+    def __init__(self, backend: str, workers: int, preload: str):
+        self.backend = backend
+        self.workers = workers
+        self.broken = False  # A worker process died; get_asr_pool replaces the pool
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, threads, preload),
+        )
+
+    def transcribe(
+        self,
+        pcm: "np.ndarray",
+        model_size: str,
+        language: str,
+        cancel_token: Optional[CancellationToken] = None,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        segment_callback: Optional[Callable[[list[TextSegment]], None]] = None,
+    ) -> list[TextSegment]:
+        """Transcribe 16 kHz mono int16 samples in parallel windows.
+
+        Each window is copied into its own shared memory segment when it is
+        submitted and the segment is freed when it is done; at most
+        ``IN_FLIGHT_PER_WORKER`` windows per worker are out at a time, so a
+        long input spilled to a memmap is never copied whole.
+        ``progress_callback`` receives the percentage of windows done;
+        ``segment_callback`` receives new stitched segments whenever the
+        leading windows are all done. On cancel, TaskCancelledError is
+        raised: windows not yet started are dropped, and a cancel flag in
+        each window's segment stops running ones at their next segment,
+        freeing the workers for the next task. A model that fails to load,
+        or a worker process that dies, raises BackendUnavailableError.
+        """
+        duration = len(pcm) / SAMPLE_RATE
+        chunks = plan_chunks(pcm, chunk_seconds_for(duration, self.workers))
+
+        results: list[Optional[list[dict]]] = [None] * len(chunks)
+        in_flight: dict[Future, tuple[int, shared_memory.SharedMemory]] = {}
+        submitted = ready = emitted = 0  # Windows handed out; leading windows stitched; segments passed on
+        stitched: list[TextSegment] = []
+        try:
+            while submitted < len(chunks) or in_flight:
+                while submitted < len(chunks) and len(in_flight) < IN_FLIGHT_PER_WORKER * self.workers:
+                    fut, shm = self._submit(pcm, chunks[submitted], model_size, language)
+                    in_flight[fut] = (submitted, shm)
+                    submitted += 1
+                done, _ = wait(set(in_flight), timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    index, shm = in_flight.pop(fut)
+                    _release(shm)
+                    results[index] = fut.result()
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if done and progress_callback:
+                    finished = sum(r is not None for r in results)
+                    progress_callback(min(99, finished * 100 // len(chunks)))
+                start = ready
+                while ready < len(chunks) and results[ready] is not None:
+                    ready += 1
+                if ready > start:
+                    stitch_segments(list(zip(chunks[start:ready], results[start:ready])), stitched)
+                if segment_callback and ready < len(chunks) and len(stitched) > emitted:
+                    segment_callback(stitched[emitted:])
+                    emitted = len(stitched)
+        except BrokenProcessPool as e:
+            self.broken = True
+            raise BackendUnavailableError(f"ASR 工作进程异常退出，已跳过语音识别: {e}") from e
+        finally:
+            for fut, (index, shm) in in_flight.items():
+                fut.cancel()
+                # Windows already handed to a worker stop at their next check;
+                # running ones keep their mapping until they return
+                shm.buf[(chunks[index].end - chunks[index].start) * 2] = 1
+                _release(shm)
+        if segment_callback and len(stitched) > emitted:
+            segment_callback(stitched[emitted:])
+        return stitched
+
+    def _submit(
+        self, pcm: "np.ndarray", chunk: Chunk, model_size: str, language: str
+    ) -> tuple[Future, shared_memory.SharedMemory]:
+        """Copy one window into a new shared segment and queue it."""
+        import numpy as np
+
+        length = chunk.end - chunk.start
+        # One byte past the samples is the cancel flag
+        shm = shared_memory.SharedMemory(create=True, size=length * 2 + 1)
+        try:
+            shared = np.ndarray((length,), dtype=np.int16, buffer=shm.buf)
+            shared[:] = pcm[chunk.start:chunk.end]
+            del shared
+            fut = self._executor.submit(_transcribe_window, shm.name, length, model_size, language)
+        except BaseException:
+            _release(shm)
+            raise
+        return fut, shm
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[ASRProcessPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_asr_pool(backend: str, workers: int, preload: str) -> ASRProcessPool:
+    """Get the process-wide ASR pool, recreating it if the backend or size changed
+    or a worker process died.
+
+    ``preload`` is the model size new worker processes load at start.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.broken or (_pool.backend, _pool.workers) != (backend, workers):
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ASRProcessPool(backend, workers, preload)
+        return _pool
+
+
+def shutdown_asr_pool() -> None:
+    """Stop the worker processes, if started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
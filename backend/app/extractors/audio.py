@@ -0,0 +1,214 @@
+"""16 kHz mono PCM audio shared between a decoder and ASR."""
+import os
+import subprocess
+import tempfile
+import threading
+import wave
+from collections import deque
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.cancellation import CancellationToken
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # s16le
+
+# Seconds of audio handed to ASR at a time while the stream is growing
+STREAM_CHUNK_SECONDS = 60.0
+
+# Decoded audio beyond this length moves from RAM to a memory-mapped
+# scratch file (2 h of s16le is about 230 MB)
+IN_MEMORY_MAX_SECONDS = 2 * 3600
+
+# Initial buffer for decode_pcm; doubled as needed
+DECODE_BUFFER_SECONDS = 600
+
+
+class AudioStream:
+    """WAV file that is readable while it is still being written.
+
+    A decoder thread appends PCM with ``append`` and calls ``finish`` at
+    the end; a consumer thread iterates ``chunks``, which block until
+    enough audio has arrived. Samples are kept on disk rather than in a
+    queue, so a consumer that falls behind costs no memory. The file is
+    written as ``<path>.part.wav`` and renamed to ``path`` on success, so
+    a file at ``path`` is always complete.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + ".part.wav")
+        self._cond = threading.Condition()
+        self._file = None
+        self._wave = None
+        self._data_start: Optional[int] = None
+        self._frames = 0
+        self._finished = False
+        self._error: Optional[BaseException] = None
+
+    @classmethod
+    def from_file(cls, path: Path) -> "AudioStream":
+        """Stream over an already complete 16 kHz mono WAV file."""
+        stream = cls(path)
+        with wave.open(str(path), "rb") as w:
+            stream._frames = w.getnframes()
+        with open(path, "rb") as f:
+            stream._data_start, _ = _wav_data_chunk(f)
+        stream._finished = True
+        return stream
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio received so far."""
+        return self._frames / SAMPLE_RATE
+
+    def append(self, pcm: bytes) -> None:
+        """Append s16le PCM. Called from the decoder thread."""
+        if not pcm:
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.partial_path, "wb")
+            self._wave = wave.open(self._file, "wb")
+            self._wave.setnchannels(1)
+            self._wave.setsampwidth(SAMPLE_WIDTH)
+            self._wave.setframerate(SAMPLE_RATE)
+        self._wave.writeframesraw(pcm)
+        self._file.flush()
+        with self._cond:
+            if self._data_start is None:
+                self._data_start = self._file.tell() - len(pcm)
+            self._frames += len(pcm) // SAMPLE_WIDTH
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Mark the end of the stream; with an error, readers re-raise it."""
+        if self._wave is not None:
+            self._wave.close()  # Patches the header with the final length
+            self._file.close()
+            if error is None:
+                os.replace(self.partial_path, self.path)
+            else:
+                self.partial_path.unlink(missing_ok=True)
+        with self._cond:
+            self._finished = True
+            self._error = error
+            self._cond.notify_all()
+
+    def chunks(
+        self,
+        chunk_seconds: float = STREAM_CHUNK_SECONDS,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Iterator[tuple[float, "np.ndarray"]]:
+        """Yield ``(start_seconds, float32 samples)`` as audio arrives.
+
+        Blocks until a full chunk is available or the stream finished.
+        Raises the decoder's error if the stream failed.
+        """
+        import numpy as np
+
+        chunk_frames = int(chunk_seconds * SAMPLE_RATE)
+        offset = 0
+        reader = None
+        try:
+            while True:
+                with self._cond:
+                    while not self._finished and self._frames - offset < chunk_frames:
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled()
+                        self._cond.wait(timeout=0.5)
+                    available = self._frames - offset
+                    finished = self._finished
+                    error = self._error
+                if error is not None:
+                    raise error
+                if available <= 0 and finished:
+                    return
+                n = min(available, chunk_frames)
+                if reader is None:
+                    reader = open(self.path if self.path.exists() else self.partial_path, "rb")
+                reader.seek(self._data_start + offset * SAMPLE_WIDTH)
+                data = reader.read(n * SAMPLE_WIDTH)
+                samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+                yield offset / SAMPLE_RATE, samples
+                offset += n
+        finally:
+            if reader is not None:
+                reader.close()
+
+
+def decode_pcm(media_path: str, cancel_token: Optional[CancellationToken] = None) -> "np.ndarray":
+    """Decode media to 16 kHz mono int16 samples through a pipe. Blocking.
+
+    ffmpeg writes raw s16le to stdout, read straight into a growing NumPy
+    buffer, so no WAV file is written or read back. Very long inputs spill
+    into a memory-mapped temp file instead of holding all samples in RAM.
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg", "-loglevel", "error", "-i", media_path,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+        "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if cancel_token is not None:
+        cancel_token.register_process(proc)
+    log: deque[bytes] = deque(maxlen=20)
+    stderr_reader = threading.Thread(target=lambda: log.extend(proc.stderr), daemon=True)
+    stderr_reader.start()
+
+    buf = np.empty(DECODE_BUFFER_SECONDS * SAMPLE_RATE, dtype=np.int16)
+    scratch = None
+    filled = 0  # bytes
+    try:
+        while True:
+            if filled == buf.nbytes:
+                samples = 2 * len(buf)
+                if scratch is None and samples > IN_MEMORY_MAX_SECONDS * SAMPLE_RATE:
+                    scratch = tempfile.TemporaryFile(prefix="tg-pcm-")
+                    scratch.write(memoryview(buf).cast("B"))
+                if scratch is not None:
+                    # Remap the larger file; written samples stay in the page cache
+                    scratch.truncate(samples * SAMPLE_WIDTH)
+                    buf = np.memmap(scratch, dtype=np.int16, mode="r+", shape=(samples,))
+                else:
+                    grown = np.empty(samples, dtype=np.int16)
+                    grown[: len(buf)] = buf
+                    buf = grown
+            n = proc.stdout.readinto(memoryview(buf).cast("B")[filled:])
+            if not n:
+                break
+            filled += n
+        proc.wait()
+        stderr_reader.join()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if cancel_token is not None:
+            cancel_token.unregister_process(proc)
+        if scratch is not None:
+            scratch.close()  # Unlinked already; the mapping keeps the data alive
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=b"".join(log))
+    return buf[: filled // SAMPLE_WIDTH]
+
+
+def _wav_data_chunk(f) -> tuple[int, int]:
+    """Byte offset and size of the sample data in a RIFF/WAVE file."""
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV 文件缺少 data 块")
+        size = int.from_bytes(header[4:], "little")
+        if header[:4] == b"data":
+            return f.tell(), size
+        f.seek(size + (size & 1), os.SEEK_CUR)
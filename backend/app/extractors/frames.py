@@ -0,0 +1,151 @@
+"""Video frames decoded by ffmpeg into NumPy arrays for OCR."""
+import json
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from app.cancellation import CancellationToken
+
+# Frames wider than this are scaled down before OCR; captions stay legible
+MAX_FRAME_WIDTH = 1280
+
+
+@dataclass
+class VideoInfo:
+    """Geometry and length of a media file's first video stream."""
+
+    width: int
+    height: int
+    duration: Optional[float]
+
+
+def probe_video(media_path: str) -> Optional[VideoInfo]:
+    """Read the video stream's size and the duration. None if there is no video stream."""
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=duration", "-of", "json", media_path,
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    info = json.loads(out or b"{}")
+    streams = info.get("streams") or []
+    if not streams or not streams[0].get("width"):
+        return None
+    duration = info.get("format", {}).get("duration")
+    return VideoInfo(
+        width=int(streams[0]["width"]),
+        height=int(streams[0]["height"]),
+        duration=float(duration) if duration not in (None, "N/A") else None,
+    )
+
+
+# (width, height, x, y) of a region of the source frame, in pixels
+Crop = tuple[int, int, int, int]
+
+
+def scaled_size(info: VideoInfo, max_width: int = MAX_FRAME_WIDTH, crop: Optional[Crop] = None) -> tuple[int, int]:
+    """Output frame size: at most ``max_width`` wide, aspect kept, both even."""
+    src_width, src_height = (crop[0], crop[1]) if crop else (info.width, info.height)
+    width = min(src_width, max_width)
+    height = round(src_height * width / src_width)
+    return max(2, width - width % 2), max(2, height - height % 2)
+
+
+def sample_keyframes(
+    media_path: str,
+    size: tuple[int, int],
+    limit: int,
+    cancel_token: Optional[CancellationToken] = None,
+) -> "np.ndarray":
+    """Up to ``limit`` keyframes as grayscale ``(n, height, width)`` uint8. Blocking.
+
+    Only keyframes are decoded, so this costs a small fraction of a full
+    decode; used to look at the layout before the real pass.
+    """
+    import numpy as np
+
+    width, height = size
+    cmd = [
+        "ffmpeg", "-loglevel", "error", "-skip_frame", "nokey", "-i", media_path, "-an", "-sn",
+        "-vf", f"scale={width}:{height}", "-vsync", "vfr", "-frames:v", str(limit),
+        "-f", "rawvideo", "-pix_fmt", "gray", "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if cancel_token is not None:
+        cancel_token.register_process(proc)
+    try:
+        out, err = proc.communicate()
+    finally:
+        if cancel_token is not None:
+            cancel_token.unregister_process(proc)
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=err)
+    frames = len(out) // (width * height)
+    return np.frombuffer(out[: frames * width * height], dtype=np.uint8).reshape(frames, height, width)
+
+
+def iter_frames(
+    media_path: str,
+    interval: float,
+    size: tuple[int, int],
+    cancel_token: Optional[CancellationToken] = None,
+    crop: Optional[Crop] = None,
+) -> Iterator[tuple[float, "np.ndarray"]]:
+    """Yield ``(seconds, frame)`` every ``interval`` seconds of video. Blocking.
+
+    ffmpeg samples, crops to ``crop`` (if given), scales to ``size`` and
+    writes raw BGR24 to stdout, which is read straight into a NumPy array.
+    The array is reused for the next frame, so consumers must copy what
+    they keep. Raises CalledProcessError with ffmpeg's stderr if decoding
+    fails.
+    """
+    import numpy as np
+
+    width, height = size
+    filters = [f"fps=1/{interval}"]
+    if crop:
+        filters.append("crop={}:{}:{}:{}".format(*crop))
+    filters.append(f"scale={width}:{height}")
+    cmd = [
+        "ffmpeg", "-loglevel", "error", "-i", media_path, "-an", "-sn",
+        "-vf", ",".join(filters),
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if cancel_token is not None:
+        cancel_token.register_process(proc)
+    log: deque[bytes] = deque(maxlen=20)
+    stderr_reader = threading.Thread(target=lambda: log.extend(proc.stderr), daemon=True)
+    stderr_reader.start()
+
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    view = memoryview(frame).cast("B")
+    index = 0
+    try:
+        while True:
+            filled = 0
+            while filled < len(view):
+                n = proc.stdout.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            if filled < len(view):
+                break  # End of stream (a truncated last frame is dropped)
+            # The fps filter emits the frame nearest each multiple of interval
+            yield index * interval, frame
+            index += 1
+        proc.wait()
+        stderr_reader.join()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if cancel_token is not None:
+            cancel_token.unregister_process(proc)
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=b"".join(log))
@@ -0,0 +1,72 @@
+"""Run extraction stages as a dependency graph."""
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from app.cancellation import CancellationToken
+
+
+@dataclass
+class Stage:
+    """One node of the extraction graph.
+
+    ``run`` receives the outputs of ``deps`` keyed by stage name.
+    """
+
+    name: str
+    run: Callable[[dict[str, Any]], Any]
+    deps: tuple[str, ...] = ()
+
+
+def run_graph(
+    stages: list[Stage],
+    executor: Executor,
+    cancel_token: Optional[CancellationToken] = None,
+    stage_token: Optional[CancellationToken] = None,
+) -> dict[str, Any]:
+    """Run each stage on executor as soon as its dependencies are done.
+
+    Independent stages run concurrently. If one fails, no new stages are
+    started and ``stage_token`` (the token the stages themselves poll) is
+    cancelled so running siblings stop early; the first error is raised
+    once they have all returned. Raises TaskCancelledError if
+    ``cancel_token`` is cancelled. Returns every stage's output by name.
+    """
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"stage {s.name} depends on unknown stages {missing}")
+
+    results: dict[str, Any] = {}
+    pending = list(stages)
+    running: dict[Future, Stage] = {}
+    error: Optional[BaseException] = None
+
+    while pending or running:
+        if error is None and not (cancel_token is not None and cancel_token.cancelled):
+            for s in [s for s in pending if all(d in results for d in s.deps)]:
+                pending.remove(s)
+                deps = {d: results[d] for d in s.deps}
+                running[executor.submit(s.run, deps)] = s
+        if not running:
+            break  # Stopped scheduling after a failure or cancel
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for fut in done:
+            s = running.pop(fut)
+            try:
+                results[s.name] = fut.result()
+            except BaseException as e:
+                # Later errors are usually siblings reacting to stage_token
+                if error is None:
+                    error = e
+                    if stage_token is not None:
+                        stage_token.cancel()
+
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    if error is not None:
+        raise error
+    if pending:
+        raise RuntimeError(f"stages never became ready: {[s.name for s in pending]}")
+    return results
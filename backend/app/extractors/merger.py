@@ -1,4 +1,11 @@
 """Merge and deduplicate text segments from multiple sources."""
+import heapq
+import random
+import zlib
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Union
+
 from app.extractors.models import MergedResult, TextSegment, TextSource
 
 # Priority: higher = prefer when overlapping
@@ -8,59 +15,315 @@ SOURCE_PRIORITY = {
     TextSource.OCR: 1,
 }
 
+# Segments starting within this many seconds of each other may be duplicates
+DUPLICATE_WINDOW = 1.0
+# Text similarity above which overlapping segments count as duplicates
+DUPLICATE_THRESHOLD = 0.85
 
-def _similarity(a: str, b: str) -> float:
-    """Simple Jaccard-like similarity for Chinese/English."""
-    a_set = set(a) if len(a) < 50 else set(a[i:i+2] for i in range(len(a)-1))
-    b_set = set(b) if len(b) < 50 else set(b[i:i+2] for i in range(len(b)-1))
+# Similar texts recurring within this many seconds of the previous
+# occurrence's end collapse into one segment. On screen (lingering captions,
+# a slogan shown every minute or two) that can be minutes; a line spoken or
+# subtitled again minutes later is content, so those only absorb close repeats
+COLLAPSE_GAP = {
+    TextSource.SUBTITLE: 10.0,
+    TextSource.ASR: 10.0,
+    TextSource.OCR: 300.0,
+}
+# Shorter texts ("好", "对对") are never collapsed: repeating them is content
+COLLAPSE_MIN_CHARS = 4
+# Runs open longer than this are emitted before they end and extended in
+# place, so text on screen throughout (a watermark) does not hold back the
+# output after it
+EARLY_EMIT_SECONDS = 60.0
+
+# MinHash LSH: BANDS bands of ROWS hashes each. A pair at the duplicate
+# threshold shares a band with probability 1 - (1 - 0.85**3)**8 > 0.999
+LSH_BANDS = 8
+LSH_ROWS = 3
+# Texts kept per LSH bucket; bounds comparisons when many collide
+LSH_BUCKET_LIMIT = 16
+# Shingle hash rows cached by a long-running IncrementalMerger
+LSH_ROW_CACHE = 1 << 16
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(_MERSENNE)) for _ in range(LSH_BANDS * LSH_ROWS)
+]
+
+
+def _shingles(text: str) -> set[str]:
+    """Characters of short texts, character bigrams of long ones."""
+    return set(text) if len(text) < 50 else set(text[i:i+2] for i in range(len(text)-1))
+
+
+def _jaccard(a_set: set[str], b_set: set[str]) -> float:
     if not a_set or not b_set:
         return 0.0
     return len(a_set & b_set) / len(a_set | b_set)
 
 
-def _is_duplicate(seg_a: TextSegment, seg_b: TextSegment, threshold: float = 0.85) -> bool:
+def _similarity(a: str, b: str) -> float:
+    """Simple Jaccard-like similarity for Chinese/English."""
+    return _jaccard(_shingles(a), _shingles(b))
+
+
+def _similar(a_set: set[str], b_set: set[str]) -> bool:
+    """Whether two shingle sets are above the duplicate threshold."""
+    if not a_set or not b_set:
+        return False
+    small, large = sorted((len(a_set), len(b_set)))
+    # Jaccard cannot exceed the size ratio; skip the set operations
+    if small / large <= DUPLICATE_THRESHOLD:
+        return False
+    return _jaccard(a_set, b_set) > DUPLICATE_THRESHOLD
+
+
+def _shadowed(shingles: set[str], priority: int, window: Iterable[tuple[TextSegment, set[str], int]]) -> bool:
+    """Whether a kept segment in the window, of the same or higher priority, has similar text."""
+    # Prefer higher priority source
+    return any(priority <= other_priority and _similar(shingles, other) for _, other, other_priority in window)
+
+
+def _is_duplicate(seg_a: TextSegment, seg_b: TextSegment, threshold: float = DUPLICATE_THRESHOLD) -> bool:
     """Check if two segments are duplicates (overlapping time + similar text)."""
     time_gap = abs(seg_a.start_time - seg_b.start_time)
-    if time_gap > 1.0:
+    if time_gap > DUPLICATE_WINDOW:
         return False
     return _similarity(seg_a.text, seg_b.text) > threshold
 
 
+def merger_settings() -> dict:
+    """Settings that affect merge output, for cache keys."""
+    return {
+        "window": DUPLICATE_WINDOW,
+        "threshold": DUPLICATE_THRESHOLD,
+        "priority": {src.value: p for src, p in SOURCE_PRIORITY.items()},
+        "collapse": {"gap": {src.value: g for src, g in COLLAPSE_GAP.items()}, "minChars": COLLAPSE_MIN_CHARS},
+    }
+
+
+def _minhash(shingles: set[str], rows: dict[str, tuple[int, ...]]) -> tuple[int, ...]:
+    """MinHash signature of a shingle set (deterministic across processes).
+
+    ``rows`` caches each shingle's permuted hashes; the shingle vocabulary
+    (characters, bigrams) is small next to the number of texts.
+    """
+    columns = []
+    for shingle in shingles:
+        row = rows.get(shingle)
+        if row is None:
+            h = zlib.crc32(shingle.encode("utf-8"))
+            row = rows[shingle] = tuple((a * h + b) % _MERSENNE for a, b in _PERMUTATIONS)
+        columns.append(row)
+    return tuple(map(min, zip(*columns)))
+
+
+def _gap(source: TextSource) -> float:
+    """Longest gap after which a repeat of this source still collapses."""
+    return COLLAPSE_GAP.get(source, 0.0)
+
+
+def _absorb(head: TextSegment, seg: TextSegment, absorbed: dict[str, int]) -> None:
+    """Extend a run's segment over ``seg``, taking its text if its source ranks higher."""
+    dropped = seg.source
+    if SOURCE_PRIORITY.get(seg.source, 0) > SOURCE_PRIORITY.get(head.source, 0):
+        dropped = head.source
+        head.source, head.text, head.confidence = seg.source, seg.text, seg.confidence
+    absorbed[dropped.value] = absorbed.get(dropped.value, 0) + 1
+    head.end_time = max(head.end_time, seg.end_time)
+
+
 def merge(segments: list[TextSegment]) -> MergedResult:
-    """Merge segments from multiple sources, deduplicate, sort by time."""
+    """Merge segments from multiple sources, deduplicate, sort by time.
+
+    A segment is dropped if an already kept segment of the same or higher
+    priority starts within DUPLICATE_WINDOW of it and has similar text.
+    Similar texts recurring within COLLAPSE_GAP of each other (the shorter
+    of both sources' gaps) are then collapsed into one segment. This is
+    IncrementalMerger with all input known up front.
+    """
     if not segments:
         return MergedResult(segments=[], full_text="", stats={})
+    merger = IncrementalMerger(())
+    for seg in segments:
+        merger.push(seg)
+    merged = merger.finish()
+    return MergedResult(segments=merged, full_text="\n\n".join(s.text for s in merged), stats=merger.stats())
+
+
+@dataclass(eq=False)
+class _Run:
+    """A segment being collapsed, with the texts that joined it."""
+
+    segment: TextSegment
+    members: dict[str, set[str]] = field(default_factory=dict)  # Text -> shingles; empty if too short
+    keys: list[tuple] = field(default_factory=list)  # LSH buckets it is indexed under
+
+
+class IncrementalMerger:
+    """Merge per-source segment streams as they arrive.
+
+    Each source's segments must arrive in start order. A segment is merged
+    once the watermark (the latest start seen from the slowest source
+    still open) passes it, in the same order and with the same decisions
+    as ``merge``; it is emitted once no later segment can collapse into
+    it. Only the dedupe window, open runs and segments waiting on slower
+    sources are held, not the whole timeline.
+
+    Collapse finds earlier similar segments through MinHash LSH buckets
+    over the open runs' texts, confirmed with the exact Jaccard test, so
+    it stays near linear over the whole timeline. Not thread safe.
+    """
+
+    def __init__(self, sources: Iterable[Union[TextSource, str]]):
+        self._open = {TextSource(source) for source in sources}
+        self._latest: dict[TextSource, float] = {}
+        self._pending: list[tuple[float, int, int, TextSegment]] = []  # Heap in merge's sort order
+        self._seq = 0
+        self._window: deque[tuple[TextSegment, set[str], int]] = deque()
+        self._runs: deque[_Run] = deque()  # Not yet emitted, in start order
+        # Emitted early, still extendable: heap of (end_time + its gap, seq, run),
+        # the key refreshed lazily as runs grow
+        self._early: list[tuple[float, int, _Run]] = []
+        self._buckets: dict[tuple, list[_Run]] = {}
+        self._rows: dict[str, tuple[int, ...]] = {}
+        self._absorbed: dict[str, int] = {}
+        self._counts: dict[str, list[int]] = {}  # Source -> [segments, chars] emitted
+
+    @property
+    def watermark(self) -> float:
+        """Start time below which every source's segments have all arrived."""
+        if not self._open:
+            return float("inf")
+        return min(self._latest.get(source, float("-inf")) for source in self._open)
+
+    def add(self, source: Union[TextSource, str], segments: Iterable[TextSegment]) -> list[TextSegment]:
+        """Take new segments from a source; returns the segments finalized by them."""
+        source = TextSource(source)
+        for seg in segments:
+            self.push(seg)
+            if seg.start_time > self._latest.get(source, float("-inf")):
+                self._latest[source] = seg.start_time
+        return self._advance()
+
+    def close(self, source: Union[TextSource, str]) -> list[TextSegment]:
+        """Mark a source as done; returns the segments this finalizes."""
+        self._open.discard(TextSource(source))
+        return self._advance()
+
+    def finish(self) -> list[TextSegment]:
+        """Close every source; returns the remaining segments."""
+        self._open.clear()
+        return self._advance()
+
+    def preview(self) -> list[TextSegment]:
+        """Copies of the segments not yet emitted, in start order: open runs, then waiting input."""
+        waiting = [entry[3] for entry in sorted(self._pending)]
+        return [replace(run.segment) for run in self._runs] + [replace(seg) for seg in waiting]
+
+    def stats(self) -> dict:
+        """Per-source stats of the segments emitted so far, as in ``merge``."""
+        stats = {}
+        for src in TextSource:
+            count, chars = self._counts.get(src.value, (0, 0))
+            if count > 0:
+                stats[src.value] = {"segmentCount": count, "charCount": chars}
+                if self._absorbed.get(src.value):
+                    stats[src.value]["collapsed"] = self._absorbed[src.value]
+        return stats
+
+    def push(self, seg: TextSegment) -> None:
+        """Queue a segment without moving the watermark; it is merged once the watermark passes it."""
+        # Start order, higher priority first, then arrival: merge's sort order
+        heapq.heappush(self._pending, (seg.start_time, -SOURCE_PRIORITY.get(seg.source, 0), self._seq, seg))
+        self._seq += 1
+
+    def _advance(self) -> list[TextSegment]:
+        watermark = self.watermark
+        emitted: list[TextSegment] = []
+        # A segment at the watermark may still be preceded by a higher priority one
+        while self._pending and self._pending[0][0] < watermark:
+            seg = heapq.heappop(self._pending)[3]
+            self._retire(seg.start_time, emitted)
+            self._merge(seg)
+        self._retire(watermark, emitted)
+        return emitted
+
+    def _retire(self, floor: float, emitted: list[TextSegment]) -> None:
+        """Emit leading runs that no segment starting at ``floor`` or later can extend.
+
+        A leading run open for over EARLY_EMIT_SECONDS is emitted anyway and
+        finalized later; until then its segment may still grow.
+        """
+        while self._early and floor > self._early[0][0]:
+            _, seq, run = heapq.heappop(self._early)
+            if not self._finalize(run, floor):
+                # Extended since it was queued
+                heapq.heappush(self._early, (run.segment.end_time + _gap(run.segment.source), seq, run))
+        while self._runs:
+            run = self._runs[0]
+            if self._finalize(run, floor):
+                self._runs.popleft()
+            elif floor - run.segment.start_time > EARLY_EMIT_SECONDS:
+                heapq.heappush(self._early, (run.segment.end_time + _gap(run.segment.source), self._seq, self._runs.popleft()))
+                self._seq += 1
+            else:
+                break
+            emitted.append(run.segment)
+
+    def _finalize(self, run: _Run, floor: float) -> bool:
+        """Close the run if it can no longer be extended; counts it in the stats."""
+        if run.members and floor - run.segment.end_time <= _gap(run.segment.source):
+            return False
+        for key in run.keys:
+            self._buckets[key].remove(run)
+            if not self._buckets[key]:
+                del self._buckets[key]
+        counts = self._counts.setdefault(run.segment.source.value, [0, 0])
+        counts[0] += 1
+        counts[1] += len(run.segment.text)
+        return True
+
+    def _merge(self, seg: TextSegment) -> None:
+        while self._window and seg.start_time - self._window[0][0].start_time > DUPLICATE_WINDOW:
+            self._window.popleft()
+        priority = SOURCE_PRIORITY.get(seg.source, 0)
+        shingles = _shingles(seg.text)
+        if _shadowed(shingles, priority, self._window):
+            return
+        self._window.append((seg, shingles, priority))
+
+        if len(seg.text) < COLLAPSE_MIN_CHARS or not shingles:
+            self._runs.append(_Run(replace(seg)))
+            return
+        if len(self._rows) > LSH_ROW_CACHE:
+            self._rows.clear()
+        signature = _minhash(shingles, self._rows)
+        keys = [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]) for band in range(LSH_BANDS)]
+        # The latest similar run is the one a repeat would extend
+        latest = None
+        for key in keys:
+            for run in self._buckets.get(key, ()):
+                if (latest is None or run.segment.start_time > latest.segment.start_time) and any(
+                    _similar(shingles, other) for other in run.members.values()
+                ):
+                    latest = run
+        # A run only spans the shorter of the two sources' gaps
+        if latest is not None and seg.start_time - latest.segment.end_time <= min(
+            _gap(seg.source), _gap(latest.segment.source)
+        ):
+            _absorb(latest.segment, seg, self._absorbed)
+            if seg.text not in latest.members:
+                latest.members[seg.text] = shingles
+                self._index(latest, keys)
+            return
+        run = _Run(replace(seg), {seg.text: shingles})
+        self._index(run, keys)
+        self._runs.append(run)
 
-    # Sort by start_time, then by source priority
-    sorted_segs = sorted(
-        segments,
-        key=lambda s: (s.start_time, -SOURCE_PRIORITY.get(s.source, 0)),
-    )
-
-    merged: list[TextSegment] = []
-    for seg in sorted_segs:
-        skip = False
-        for existing in merged:
-            if _is_duplicate(seg, existing):
-                # Prefer higher priority source
-                if SOURCE_PRIORITY.get(seg.source, 0) <= SOURCE_PRIORITY.get(existing.source, 0):
-                    skip = True
-                    break
-        if not skip:
-            merged.append(seg)
-
-    # Sort by start_time for final output
-    merged.sort(key=lambda s: s.start_time)
-
-    # Build full text
-    full_text = "\n\n".join(s.text for s in merged)
-
-    # Stats
-    stats = {}
-    for src in TextSource:
-        count = sum(1 for s in merged if s.source == src)
-        chars = sum(len(s.text) for s in merged if s.source == src)
-        if count > 0:
-            stats[src.value] = {"segmentCount": count, "charCount": chars}
-
-    return MergedResult(segments=merged, full_text=full_text, stats=stats)
+    def _index(self, run: _Run, keys: list[tuple]) -> None:
+        for key in keys:
+            bucket = self._buckets.setdefault(key, [])
+            if len(bucket) < LSH_BUCKET_LIMIT and run not in bucket:
+                bucket.append(run)
+                run.keys.append(key)
@@ -0,0 +1,97 @@
+"""Process-wide registry of loaded ASR models."""
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from app.cancellation import CancellationToken
+from app.extractors.asr_backends import get_backend
+
+
+class ModelRegistry:
+    """Load each model once and share it across tasks.
+
+    Models are keyed by backend and size. Loading is guarded per model so
+    concurrent first requests trigger a single load. Whisper keeps
+    decoding state on the model object, so inference on one model is
+    serialized through ``inference_lock``.
+    """
+
+    def __init__(self):
+        self._models: dict[str, Any] = {}
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._inference_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _locks_for(self, key: str) -> tuple[threading.Lock, threading.Lock]:
+        with self._lock:
+            if key not in self._load_locks:
+                self._load_locks[key] = threading.Lock()
+                self._inference_locks[key] = threading.Lock()
+            return self._load_locks[key], self._inference_locks[key]
+
+    def get(self, model_size: str, backend: Optional[str] = None):
+        """Get a loaded model, loading it on first use.
+
+        Raises BackendUnavailableError if the backend is not installed.
+        """
+        engine = get_backend(backend)
+        key = _key(engine.name, model_size)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        engine.ensure_available()
+        load_lock, _ = self._locks_for(key)
+        with load_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = engine.load(model_size)
+                self._models[key] = model
+        return model
+
+    def inference_lock(self, model_size: str, backend: Optional[str] = None) -> threading.Lock:
+        """Lock that serializes inference on one model instance."""
+        return self._locks_for(_key(get_backend(backend).name, model_size))[1]
+
+    @contextmanager
+    def inference(
+        self,
+        model_size: str,
+        cancel_token: Optional[CancellationToken] = None,
+        backend: Optional[str] = None,
+    ):
+        """Hold the model's inference lock, giving up early if cancelled."""
+        lock = self.inference_lock(model_size, backend)
+        while not lock.acquire(timeout=0.5):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def warm_up(self, model_size: str, backend: Optional[str] = None) -> None:
+        """Load the model and run one short inference to prime kernels."""
+        model = self.get(model_size, backend)
+        import numpy as np
+        with self.inference_lock(model_size, backend):
+            get_backend(backend).transcribe(model, np.zeros(16000, dtype=np.float32))
+
+    def loaded(self) -> list[str]:
+        return sorted(self._models)
+
+
+def _key(backend: str, model_size: str) -> str:
+    return f"{backend}:{model_size}"
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
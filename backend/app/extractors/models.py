@@ -32,6 +32,16 @@ class TextSegment:
             "confidence": self.confidence,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "TextSegment":
+        return cls(
+            source=TextSource(data["source"]),
+            start_time=float(data["startTime"]),
+            end_time=float(data["endTime"]),
+            text=data["text"],
+            confidence=float(data.get("confidence", 1.0)),
+        )
+
 
 @dataclass
 class MergedResult:
@@ -0,0 +1,709 @@
+"""OCR extractor: on-screen text from frames sampled at visual changes."""
+import base64
+import bisect
+import importlib.util
+import io
+import logging
+import threading
+import time
+import zlib
+from typing import Callable, Optional
+
+from app.cancellation import CancellationToken
+from app.extractors.asr_backends import BackendUnavailableError
+from app.extractors.frames import Crop, VideoInfo, iter_frames, probe_video, sample_keyframes, scaled_size
+from app.extractors.models import TextSegment, TextSource
+
+logger = logging.getLogger(__name__)
+
+# Width of the grayscale thumbnail frames are compared on
+THUMB_WIDTH = 160
+# Bottom fraction of the frame where burned-in captions usually sit
+CAPTION_BAND = 0.25
+# Gray level difference at which a thumbnail pixel counts as changed
+PIXEL_DELTA = 24
+# Fraction of changed pixels that makes a frame worth recognizing again:
+# a new shot anywhere, or a new caption line in the caption band
+SCENE_THRESHOLD = 0.25
+CAPTION_THRESHOLD = 0.02
+# Recognized lines below this confidence are dropped
+MIN_CONFIDENCE = 0.6
+# Lines on screen longer than this are streamed in pieces, so a persistent
+# text (a channel watermark) does not hold back everything after it
+STREAM_PIECE_SECONDS = 30.0
+
+# OCR_REGION values besides "top,bottom" fractions of the frame height
+REGION_AUTO = "auto"
+REGION_FULL = "full"
+# Caption region detection: keyframes looked at (decoded this wide, enough
+# to keep caption strokes sharp), horizontal strips scored, and the part
+# of the frame (from the top) where captions are searched
+REGION_KEYFRAMES = 40
+REGION_PROBE_WIDTH = 480
+REGION_STRIPS = 20
+REGION_SEARCH_FROM = 0.5
+# A strip holds captions when its edge density is this many times the
+# frame's median strip, and at least REGION_MIN_DENSITY
+REGION_CONTRAST = 2.0
+REGION_MIN_DENSITY = 0.04
+EDGE_DELTA = 40
+
+# Blank rows between frames stacked into one OCR call
+STACK_GAP = 16
+
+# Frame fingerprint: difference hash over a grid of this many rows and
+# columns (512 bits), fine enough to tell caption lines apart
+HASH_ROWS = 16
+HASH_COLS = 32
+# OCR cache keys quantise the fingerprint grid: neighbouring cells closer
+# than KEY_MARGIN gray levels count as equal, so noise in flat areas does
+# not change the key. Lookups also try the keys with the KEY_PROBES cells
+# nearest the margin flipped (2**KEY_PROBES keys), as re-encoding can push
+# those across
+KEY_MARGIN = 12
+KEY_PROBES = 3
+# A cache hit is used only if a GUARD_WIDTH wide thumbnail stored with it
+# (in steps of GUARD_STEP gray levels) matches within PIXEL_DELTA. At this
+# width one changed character of a 16px caption in a 1280 wide frame
+# moves a pixel by about twice PIXEL_DELTA, re-encoding by under half.
+# Thumbnails over GUARD_CELLS pixels (taller than a caption band) are
+# scaled down further, so every cache entry stays small
+GUARD_WIDTH = 320
+GUARD_CELLS = 320 * 48
+GUARD_STEP = 8
+
+SegmentCallback = Callable[[list[TextSegment]], None]
+# Recognized line: (text, confidence)
+Line = tuple[str, float]
+
+
+class OCREngine:
+    """PaddleOCR, loaded once per process on first use.
+
+    Recognition is serialized: the Paddle predictor is not thread-safe.
+    """
+
+    package = "paddleocr"
+    install_hint = "pip install paddleocr"
+
+    def __init__(self, lang: str = "ch"):
+        self.lang = lang
+        self._ocr = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec(self.package) is not None
+
+    def ensure_available(self) -> None:
+        if not self.available():
+            raise BackendUnavailableError(f"OCR 引擎 PaddleOCR 未安装（{self.install_hint}），已跳过画面文字识别")
+
+    def _run(self, image: "np.ndarray") -> list:
+        with self._lock:
+            if self._ocr is None:
+                self.ensure_available()
+                from paddleocr import PaddleOCR
+
+                try:
+                    self._ocr = PaddleOCR(use_angle_cls=True, lang=self.lang, show_log=False)
+                except Exception as e:
+                    raise BackendUnavailableError(f"OCR 模型加载失败: {e}") from e
+            result = self._ocr.ocr(image, cls=True)
+        # One entry per input image; None when nothing was found
+        return (result[0] if result else None) or []
+
+    def recognize(self, image: "np.ndarray") -> list[Line]:
+        """Text lines ``(text, confidence)`` in a BGR image, top to bottom."""
+        return [(text, float(conf)) for _box, (text, conf) in self._run(image)]
+
+    def recognize_batch(self, images: list["np.ndarray"], limit: int = 0) -> list[list[Line]]:
+        """Recognize several images with as few engine calls as possible.
+
+        Images are packed into stacks (see ``pack_images``) of at most
+        ``limit`` (0: no limit), each stacked vertically with a blank gap
+        and recognized in one call; every line is assigned back to an
+        image by the vertical center of its box. A stack of caption strips
+        or small pictures costs one detection and one recognition pass.
+        """
+        import numpy as np
+
+        lines: list[list[Line]] = [[] for _ in images]
+        for stack in pack_images([image.shape for image in images], limit):
+            if len(stack) == 1:
+                lines[stack[0]] = self.recognize(images[stack[0]])
+                continue
+            width = max(images[i].shape[1] for i in stack)
+            tops = []
+            height = 0
+            for i in stack:
+                tops.append(height)
+                height += images[i].shape[0] + STACK_GAP
+            canvas = np.zeros((height - STACK_GAP, width, 3), dtype=np.uint8)
+            for i, top in zip(stack, tops):
+                image = images[i]
+                canvas[top: top + image.shape[0], : image.shape[1]] = image
+            for box, (text, conf) in self._run(canvas):
+                center = sum(point[1] for point in box) / len(box)
+                index = bisect.bisect_right(tops, center) - 1
+                lines[stack[max(0, index)]].append((text, float(conf)))
+        return lines
+
+
+def pack_images(shapes: list[tuple], limit: int = 0) -> list[list[int]]:
+    """Group image indices, in order, into stacks for one OCR call each.
+
+    A stack grows while its stacked height stays within its widest image,
+    so the detector scales it no more than it would scale that image
+    alone, and while it holds fewer than ``limit`` images (0: no limit).
+    Tall images, like phone screenshots, end up alone.
+    """
+    stacks: list[list[int]] = []
+    height = width = 0
+    for i, shape in enumerate(shapes):
+        h, w = shape[0], shape[1]
+        if stacks and (not limit or len(stacks[-1]) < limit) and height + STACK_GAP + h <= max(width, w):
+            stacks[-1].append(i)
+            height += STACK_GAP + h
+            width = max(width, w)
+        else:
+            stacks.append([i])
+            height, width = h, w
+    return stacks
+
+
+def decode_image(data: bytes) -> "np.ndarray":
+    """Decode image bytes (JPEG, PNG, WebP, first GIF frame) to BGR in memory.
+
+    Uses Pillow, which PaddleOCR depends on. Raises ValueError if the
+    bytes are not a readable image.
+    """
+    import numpy as np
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            rgb = np.asarray(image.convert("RGB"))
+    except Exception as e:
+        raise ValueError("无法解码图片（格式不支持或文件已损坏）") from e
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+_engine: Optional[OCREngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine(lang: str = "ch") -> OCREngine:
+    """Get the process-wide OCR engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None or _engine.lang != lang:
+            _engine = OCREngine(lang)
+        return _engine
+
+
+def parse_region(spec: str) -> tuple[float, float]:
+    """Parse OCR_REGION "top,bottom" (fractions of the height). Raises ValueError."""
+    try:
+        top, bottom = (float(v) for v in spec.split(","))
+    except ValueError:
+        raise ValueError(f"无效的 OCR_REGION: {spec}（可选: auto、full 或 上,下 比例，如 0.7,1.0）") from None
+    if not 0 <= top < bottom <= 1:
+        raise ValueError(f"无效的 OCR_REGION: {spec}（需满足 0 <= 上 < 下 <= 1）")
+    return top, bottom
+
+
+def detect_caption_region(keyframes: "np.ndarray") -> Optional[tuple[float, float]]:
+    """Find the horizontal band burned-in captions occupy, from grayscale keyframes.
+
+    Text is dense in sharp vertical edges. Each horizontal strip is scored
+    by the share of edge pixels, averaged over the keyframes; the band is
+    the run of strips in the lower part of the frame that stand out from
+    the frame's typical strip, padded by one strip. None if nothing does.
+    """
+    import numpy as np
+
+    if not len(keyframes):
+        return None
+    edges = np.abs(np.diff(keyframes.astype(np.int16), axis=2)) > EDGE_DELTA
+    rows = edges.mean(axis=(0, 2))
+    strips = np.array([s.mean() for s in np.array_split(rows, REGION_STRIPS)])
+    floor = max(REGION_MIN_DENSITY, REGION_CONTRAST * float(np.median(strips)))
+    first = int(REGION_STRIPS * REGION_SEARCH_FROM)
+    hits = [i for i in range(first, REGION_STRIPS) if strips[i] >= floor]
+    if not hits:
+        return None
+    # The densest strip and its neighbours that also qualify
+    best = max(hits, key=lambda i: strips[i])
+    top = bottom = best
+    while top - 1 in hits:
+        top -= 1
+    while bottom + 1 in hits:
+        bottom += 1
+    top, bottom = max(0, top - 1), min(REGION_STRIPS, bottom + 2)
+    return top / REGION_STRIPS, bottom / REGION_STRIPS
+
+
+def _downscale(frame: "np.ndarray", rows: int, cols: int) -> "np.ndarray":
+    """Grayscale of a BGR frame averaged down to at most rows x cols cells."""
+    import numpy as np
+
+    gray = frame.mean(axis=2, dtype=np.float32)
+    rows, cols = max(1, min(rows, gray.shape[0])), max(1, min(cols, gray.shape[1]))
+    h, w = gray.shape[0] // rows * rows, gray.shape[1] // cols * cols
+    return gray[:h, :w].reshape(rows, h // rows, cols, w // cols).mean(axis=(1, 3))
+
+
+def frame_fingerprint(frame: "np.ndarray") -> int:
+    """Difference hash of a BGR frame.
+
+    The frame is averaged down to a HASH_ROWS x (HASH_COLS + 1) grayscale
+    grid; each bit says whether a cell is brighter than its right-hand
+    neighbour. Re-encoding noise and small shifts flip few bits.
+    """
+    import numpy as np
+
+    grid = _downscale(frame, HASH_ROWS, HASH_COLS + 1)
+    bits = (grid[:, 1:] > grid[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def cache_keys(frame: "np.ndarray", lang: str) -> tuple[list[str], str]:
+    """OCR cache keys and collision guard for the pixels OCR reads.
+
+    A key is the fingerprint grid's brighter / darker / equal pattern
+    (quantised with KEY_MARGIN), language and frame size, so re-encoded
+    copies of a frame share it. The first key is the frame's own, the
+    others are the probes to look up as well. Frames with different text
+    can share a key; the guard, a thumbnail of at most GUARD_CELLS pixels,
+    tells them apart (``guard_matches``).
+    """
+    import hashlib
+    import itertools
+    import math
+
+    import numpy as np
+
+    from app.services.ocr_cache import make_ocr_key
+
+    diff = np.diff(_downscale(frame, HASH_ROWS, HASH_COLS + 1), axis=1).ravel()
+    levels = (diff > KEY_MARGIN).astype(np.int8) - (diff < -KEY_MARGIN)
+    uncertain = np.argsort(np.abs(np.abs(diff) - KEY_MARGIN))[:KEY_PROBES]
+    size = (frame.shape[1], frame.shape[0])
+    keys = []
+    for count in range(len(uncertain) + 1):
+        for cells in itertools.combinations(uncertain, count):
+            probe = levels.copy()
+            probe[list(cells)] = np.where(levels[list(cells)] != 0, 0, np.sign(diff[list(cells)]))
+            keys.append(make_ocr_key(hashlib.sha256(probe.tobytes()).hexdigest(), lang, size))
+    rows, cols = frame.shape[:2]
+    step = max(1, cols // GUARD_WIDTH, math.ceil(math.sqrt(rows * cols / GUARD_CELLS)))
+    thumb = _downscale(frame, frame.shape[0] // step, frame.shape[1] // step)
+    guard = (thumb // GUARD_STEP).astype(np.uint8).tobytes()
+    return keys, base64.b64encode(zlib.compress(guard)).decode("ascii")
+
+
+def guard_matches(a: Optional[str], b: str) -> bool:
+    """Whether two ``cache_keys`` guards show the same picture.
+
+    Re-encoding noise averages out over a thumbnail pixel; a changed
+    character moves at least one by more than PIXEL_DELTA.
+    """
+    import numpy as np
+
+    if a is None:
+        return False
+    x, y = (np.frombuffer(zlib.decompress(base64.b64decode(g)), dtype=np.uint8).astype(np.int16) for g in (a, b))
+    return len(x) == len(y) and int(np.abs(x - y).max(initial=0)) * GUARD_STEP <= PIXEL_DELTA
+
+
+def _share_runs(
+    pending: list[tuple[list[str], str]], known: dict[str, dict]
+) -> tuple[dict[int, str], dict[int, int]]:
+    """Match ``cache_keys`` results against cached entries and each other.
+
+    Returns the key of the cached entry used by each frame with one whose
+    guard matches, and for each other frame the index of the frame whose
+    engine run it shares (its own index if it needs one).
+    """
+    cached: dict[int, str] = {}
+    runs: dict[int, int] = {}
+    for i, (keys, guard) in enumerate(pending):
+        hit = next((key for key in keys if key in known and guard_matches(known[key].get("check"), guard)), None)
+        if hit is not None:
+            cached[i] = hit
+            continue
+        runs[i] = next(
+            (j for j, run in runs.items() if run == j and guard_matches(pending[j][1], guard)),
+            i,
+        )
+    return cached, runs
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class _ChangeDetector:
+    """Decide which sampled frames differ enough from the last recognized one.
+
+    Frames are compared as small grayscale thumbnails against the frame
+    last sent to OCR, not the previous sample, so slow fades and scrolling
+    add up until they cross a threshold. ``band`` is the bottom fraction
+    checked for caption changes; 1.0 when frames are already cropped to
+    the caption region. ``caption_changed`` tells whether the last change
+    was in the caption band; it is only tracked for uncropped frames.
+    """
+
+    def __init__(self, band: float = CAPTION_BAND):
+        self.band = band
+        self.caption_changed = False
+        self._reference = None
+
+    def changed(self, frame: "np.ndarray") -> bool:
+        import numpy as np
+
+        step = max(1, frame.shape[1] // THUMB_WIDTH)
+        thumb = frame[::step, ::step].mean(axis=2, dtype=np.float32)
+        reference, self._reference = self._reference, thumb
+        self.caption_changed = False
+        if reference is None:
+            return True
+        moved = np.abs(thumb - reference) > PIXEL_DELTA
+        band = moved[int(len(moved) * (1 - self.band)):]
+        self.caption_changed = self.band < 1.0 and band.mean() > CAPTION_THRESHOLD
+        if moved.mean() > SCENE_THRESHOLD or band.mean() > CAPTION_THRESHOLD:
+            return True
+        self._reference = reference
+        return False
+
+
+class _LineTracker:
+    """Turn per-frame OCR lines into segments spanning their time on screen.
+
+    ``segment_callback`` receives segments in start order, as the merger
+    expects: a finished line waits until the lines that appeared before it
+    have left the screen. Lines on screen for long are passed on in pieces
+    of STREAM_PIECE_SECONDS (the merger collapses them again); the final
+    output has each line whole.
+    """
+
+    def __init__(self, segment_callback: Optional[SegmentCallback]):
+        self.segments: list[TextSegment] = []
+        self._on_screen: dict[str, TextSegment] = {}  # Lines in the last recognized frame
+        self._callback = segment_callback
+        self._piece_start: dict[str, float] = {}  # Start of each on-screen line's unstreamed part
+        self._held: list[TextSegment] = []  # Streamed pieces waiting for earlier lines
+
+    def update(self, t: float, recognized: list[Line]) -> None:
+        lines: dict[str, float] = {}
+        for text, confidence in recognized:
+            text = text.strip()
+            if text and confidence >= MIN_CONFIDENCE:
+                lines[text] = max(confidence, lines.get(text, 0.0))
+
+        gone = [seg for text, seg in self._on_screen.items() if text not in lines]
+        pieces = []
+        for seg in gone:
+            seg.end_time = t
+            del self._on_screen[seg.text]
+            pieces.append(self._piece(seg, t, ongoing=False))
+        for text, seg in self._on_screen.items():
+            if t - self._piece_start[text] >= STREAM_PIECE_SECONDS:
+                pieces.append(self._piece(seg, t, ongoing=True))
+        for text, confidence in lines.items():
+            seg = self._on_screen.get(text)
+            if seg is None:
+                self._on_screen[text] = TextSegment(
+                    source=TextSource.OCR,
+                    start_time=t,
+                    end_time=t,
+                    text=text,
+                    confidence=confidence,
+                )
+                self._piece_start[text] = t
+            else:
+                seg.confidence = max(seg.confidence, confidence)
+        self.segments.extend(gone)
+        self._stream(pieces)
+
+    def finish(self, end: float) -> list[TextSegment]:
+        remaining = list(self._on_screen.values())
+        pieces = []
+        for seg in remaining:
+            seg.end_time = end
+            pieces.append(self._piece(seg, end, ongoing=False))
+        self._on_screen.clear()
+        self.segments.extend(remaining)
+        self._stream(pieces)
+        self.segments.sort(key=lambda s: s.start_time)
+        return self.segments
+
+    def _piece(self, seg: TextSegment, t: float, ongoing: bool) -> TextSegment:
+        """The part of a line shown since its last streamed piece, up to ``t``."""
+        if ongoing:
+            start, self._piece_start[seg.text] = self._piece_start[seg.text], t
+        else:
+            start = self._piece_start.pop(seg.text)
+        return TextSegment(source=TextSource.OCR, start_time=start, end_time=t, text=seg.text, confidence=seg.confidence)
+
+    def _stream(self, pieces: list[TextSegment]) -> None:
+        if not self._callback:
+            return
+        self._held.extend(pieces)
+        floor = min(self._piece_start.values(), default=float("inf"))
+        ready = sorted((seg for seg in self._held if seg.start_time <= floor), key=lambda s: s.start_time)
+        self._held = [seg for seg in self._held if seg.start_time > floor]
+        if ready:
+            self._callback(ready)
+
+
+class OCRExtractor:
+    """Extract on-screen text from video frames.
+
+    Frames are sampled every ``interval`` seconds but only sent to OCR
+    when the picture or its caption band changed since the last
+    recognized frame, so the number of OCR calls follows the number of
+    distinct on-screen texts rather than the duration. Each recognized
+    line becomes one segment spanning the time it stayed on screen.
+
+    ``region`` limits decoding and OCR to a horizontal band: "auto" looks
+    for a caption band in the keyframes (whole frame if none is found),
+    "full" keeps the whole frame, and "top,bottom" fixes the band as
+    fractions of the height. Narrow frames are stacked up to
+    ``batch_size`` per OCR call.
+
+    Changed frames are fingerprinted first. One within ``hash_distance``
+    bits of the last recognized frame is skipped, which leaves the text
+    on screen and extends its span. On uncropped frames a caption changes
+    too few bits of the whole-frame hash, so frames whose caption band
+    changed are never skipped. The rest are looked up by perceptual key
+    (``cache_keys``) in the shared OCR cache, when one is given, so
+    re-encoded intros and outros hit across videos; only misses reach the
+    engine. Raises BackendUnavailableError when PaddleOCR is not installed.
+    """
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        lang: str = "ch",
+        region: str = REGION_AUTO,
+        batch_size: int = 8,
+        hash_distance: int = 6,
+    ):
+        self.interval = interval
+        self.lang = lang
+        self.region = region
+        self.batch_size = max(1, batch_size)
+        self.hash_distance = hash_distance
+        if region not in (REGION_AUTO, REGION_FULL):
+            parse_region(region)
+
+    def cache_settings(self) -> dict:
+        """Settings that affect OCR output, for cache keys."""
+        return {
+            "interval": self.interval,
+            "lang": self.lang,
+            "region": self.region,
+            "hashDistance": self.hash_distance,
+            "ocrKey": "perceptual",  # Drops results cached under earlier OCR cache keys
+            "scene": SCENE_THRESHOLD,
+            "caption": CAPTION_THRESHOLD,
+            "confidence": MIN_CONFIDENCE,
+        }
+
+    def image_cache_settings(self) -> dict:
+        """Settings that affect OCR output for still images, for cache keys."""
+        return {"lang": self.lang, "confidence": MIN_CONFIDENCE}
+
+    def _crop(
+        self,
+        media_path: str,
+        info: VideoInfo,
+        cancel_token: Optional[CancellationToken],
+    ) -> Optional[Crop]:
+        """Source pixels to decode, or None for the whole frame."""
+        if self.region == REGION_FULL:
+            return None
+        if self.region == REGION_AUTO:
+            keyframes = sample_keyframes(
+                media_path, scaled_size(info, REGION_PROBE_WIDTH), REGION_KEYFRAMES, cancel_token
+            )
+            band = detect_caption_region(keyframes)
+            if band is None:
+                return None
+        else:
+            band = parse_region(self.region)
+        top = int(info.height * band[0]) // 2 * 2
+        bottom = min(info.height, -(-int(info.height * band[1]) // 2) * 2)
+        if bottom - top >= info.height:
+            return None
+        return info.width, bottom - top, 0, top
+
+    def extract(
+        self,
+        media_path: str,
+        progress_callback: Optional[Callable[[int], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        segment_callback: Optional[SegmentCallback] = None,
+        stats: Optional[dict] = None,
+        cache=None,
+    ) -> list[TextSegment]:
+        """Extract on-screen text. Returns [] for media without a video stream.
+
+        ``segment_callback`` receives lines in start order as they leave the screen.
+        ``stats``, if given, is filled with the region used, decode and
+        OCR throughput and cache hits. ``cache`` provides blocking
+        ``lookup(keys) -> {key: lines}``, ``record(used_keys, frames)`` and
+        ``store({key: lines})``, e.g. ``OCRCache.bind``.
+        """
+        engine = get_ocr_engine(self.lang)
+        engine.ensure_available()
+        info = probe_video(media_path)
+        if info is None:
+            return []
+
+        started = time.perf_counter()
+        crop = self._crop(media_path, info, cancel_token)
+        size = scaled_size(info, crop=crop)
+        per_call = max(1, min(self.batch_size, size[0] // (size[1] + STACK_GAP)))
+        detector = _ChangeDetector(band=1.0 if crop else CAPTION_BAND)
+        tracker = _LineTracker(segment_callback)
+        pending: list[tuple[float, "np.ndarray", list[str], str]] = []  # (seconds, frame, cache keys, guard)
+        sampled = recognized = deduped = calls = decoded = hits = 0
+        last_fingerprint: Optional[int] = None
+        end = 0.0
+        pct = -1
+
+        def flush() -> None:
+            nonlocal calls, hits
+            if not pending:
+                return
+            probes = list({key for _, _, keys, _ in pending for key in keys})
+            known = cache.lookup(probes) if cache is not None else {}
+            used, runs = _share_runs([(keys, guard) for _, _, keys, guard in pending], known)
+            if cache is not None:
+                cache.record(list(used.values()), len(pending))
+            hits += len(used)
+            lines = {i: known[key]["items"] for i, key in used.items()}
+            # One engine run per distinct uncached frame
+            todo = sorted(set(runs.values()))
+            if todo:
+                frames = [pending[i][1] for i in todo]
+                calls += len(pack_images([frame.shape for frame in frames], self.batch_size))
+                results = engine.recognize_batch(frames, self.batch_size)
+                fresh = {i: [list(line) for line in found] for i, found in zip(todo, results)}
+                if cache is not None:
+                    cache.store({pending[i][2][0]: {"items": fresh[i], "check": pending[i][3]} for i in todo})
+                lines.update({i: fresh[run] for i, run in runs.items()})
+            for i, (t, _, _, _) in enumerate(pending):
+                tracker.update(t, [(text, conf) for text, conf in lines[i]])
+            pending.clear()
+
+        for t, frame in iter_frames(media_path, self.interval, size, cancel_token, crop=crop):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            sampled += 1
+            decoded += frame.nbytes
+            end = t + self.interval
+            if progress_callback and info.duration and min(99, int(t * 100 / info.duration)) != pct:
+                pct = min(99, int(t * 100 / info.duration))
+                progress_callback(pct)
+            if not detector.changed(frame):
+                continue
+            fingerprint = frame_fingerprint(frame)
+            if (
+                last_fingerprint is not None
+                and not detector.caption_changed
+                and hamming(fingerprint, last_fingerprint) <= self.hash_distance
+            ):
+                deduped += 1
+                continue
+            last_fingerprint = fingerprint
+            recognized += 1
+            frame = frame.copy()  # Safe from the decoder reusing its buffer
+            pending.append((t, frame, *cache_keys(frame, self.lang)))
+            if len(pending) >= per_call:
+                flush()
+        flush()
+        segments = tracker.finish(end)
+
+        elapsed = time.perf_counter() - started
+        run_stats = {
+            "region": [round(crop[3] / info.height, 3), round((crop[3] + crop[1]) / info.height, 3)] if crop else None,
+            "frameSize": list(size),
+            "framesSampled": sampled,
+            "framesRecognized": recognized,
+            "framesDeduped": deduped,
+            "cacheHits": hits,
+            "cacheMisses": recognized - hits,
+            "cacheHitRate": round(hits / recognized, 4) if recognized else 0.0,
+            "ocrCalls": calls,
+            "bytesDecoded": decoded,
+            "framesPerSecond": round(sampled / elapsed, 1) if elapsed else 0.0,
+            "seconds": round(elapsed, 2),
+        }
+        logger.info("OCR %s: %s", media_path, run_stats)
+        if stats is not None:
+            stats.update(run_stats)
+        return segments
+
+    def extract_images(
+        self,
+        images: list[bytes],
+        cache=None,
+        stats: Optional[dict] = None,
+    ) -> list:
+        """Recognize many encoded images together; one result per image, in order.
+
+        Each result is a list of TextSegments (one per line, at time 0) or
+        the ValueError raised for bytes that are not an image. Images are
+        decoded in memory and keyed like frames (``cache_keys``); ``cache`` (as in
+        ``extract``) is queried once for the whole batch, and the misses
+        are packed into as few engine calls as ``pack_images`` allows.
+        Raises BackendUnavailableError when PaddleOCR is not installed.
+        """
+        engine = get_ocr_engine(self.lang)
+        engine.ensure_available()
+        started = time.perf_counter()
+        results: list = [None] * len(images)
+        decoded: list[tuple[int, "np.ndarray", list[str], str]] = []  # (index, image, cache keys, guard)
+        for i, data in enumerate(images):
+            try:
+                image = decode_image(data)
+            except ValueError as e:
+                results[i] = e
+                continue
+            decoded.append((i, image, *cache_keys(image, self.lang)))
+
+        probes = list({key for _, _, keys, _ in decoded for key in keys})
+        known = cache.lookup(probes) if cache is not None and probes else {}
+        used, runs = _share_runs([(keys, guard) for _, _, keys, guard in decoded], known)
+        if cache is not None and decoded:
+            cache.record(list(used.values()), len(decoded))
+        hits = len(used)
+        lines = {j: known[key]["items"] for j, key in used.items()}
+        # One engine run per distinct uncached image
+        todo = sorted(set(runs.values()))
+        calls = 0
+        if todo:
+            batch = [decoded[j][1] for j in todo]
+            calls = len(pack_images([image.shape for image in batch]))
+            fresh = {j: [list(line) for line in found] for j, found in zip(todo, engine.recognize_batch(batch))}
+            if cache is not None:
+                cache.store({decoded[j][2][0]: {"items": fresh[j], "check": decoded[j][3]} for j in todo})
+            lines.update({j: fresh[run] for j, run in runs.items()})
+
+        for j, (i, _, _, _) in enumerate(decoded):
+            results[i] = [
+                TextSegment(source=TextSource.OCR, start_time=0.0, end_time=0.0, text=text.strip(), confidence=conf)
+                for text, conf in lines[j]
+                if text.strip() and conf >= MIN_CONFIDENCE
+            ]
+        if stats is not None:
+            stats.update({
+                "batchSize": len(images),
+                "cacheHits": hits,
+                "ocrCalls": calls,
+                "seconds": round(time.perf_counter() - started, 3),
+            })
+        return results
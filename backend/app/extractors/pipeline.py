@@ -1,12 +1,34 @@
 """Extraction pipeline orchestrator."""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterable, Optional
 
+from app.cancellation import CancellationToken
 from app.config import get_settings
 from app.extractors.asr import ASRExtractor
-from app.extractors.merger import merge
+from app.extractors.asr_backends import BackendUnavailableError
+from app.extractors.audio import AudioStream
+from app.extractors.graph import Stage, run_graph
+from app.extractors.merger import IncrementalMerger, merge
+from app.extractors.model_registry import get_model_registry
 from app.extractors.models import MergedResult, TextSegment
+from app.extractors.ocr import OCRExtractor
 from app.extractors.subtitle import SubtitleExtractor
+from app.services.checkpoint import TaskCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# Extractor stages that may run at once per pipeline slot (subtitle, ASR, OCR)
+STAGES_PER_TASK = 3
+
+# Minimum seconds between partial result snapshots of one run
+PARTIAL_INTERVAL = 5.0
+
+SourceExtract = Callable[[CancellationToken], list[TextSegment]]
+PartialCallback = Callable[[MergedResult], None]
 
 
 def _progress(stage: str, pct: int, callback: Optional[Callable[[str, int], None]] = None):
@@ -14,14 +36,86 @@ def _progress(stage: str, pct: int, callback: Optional[Callable[[str, int], None
         callback(stage, pct)
 
 
+class _PartialResults:
+    """Segments each source has produced so far, passed on as merged snapshots.
+
+    Sources ``add`` segments as they are decoded (in start order) and
+    ``set`` their full output when done. They go through an
+    IncrementalMerger, so each segment is merged once rather than on every
+    snapshot. A snapshot (the finalized segments, then the merger's
+    preview of the rest) goes to the callback at most once per
+    PARTIAL_INTERVAL, on the calling stage thread.
+    """
+
+    def __init__(self, callback: Optional[PartialCallback], sources: Iterable[str]):
+        self._callback = callback
+        self._merger = IncrementalMerger(sources)
+        self._merged: list[TextSegment] = []
+        self._streamed: set[str] = set()
+        self._lock = threading.Lock()
+        self._last_emit = 0.0
+
+    def add(self, source: str, segments: list[TextSegment]) -> None:
+        if self._callback is None:
+            return
+        with self._lock:
+            self._streamed.add(source)
+            self._merged.extend(self._merger.add(source, segments))
+            self._maybe_emit()
+
+    def set(self, source: str, segments: list[TextSegment]) -> None:
+        if self._callback is None:
+            return
+        with self._lock:
+            if source not in self._streamed:  # Checkpointed, or not a streaming extractor
+                self._merged.extend(self._merger.add(source, sorted(segments, key=lambda s: s.start_time)))
+            self._merged.extend(self._merger.close(source))
+            self._maybe_emit()
+
+    def _maybe_emit(self) -> None:
+        now = time.monotonic()
+        if now - self._last_emit < PARTIAL_INTERVAL:
+            return
+        self._last_emit = now
+        segments = self._merged + self._merger.preview()
+        self._callback(MergedResult(
+            segments=segments,
+            full_text="\n\n".join(s.text for s in segments),
+            stats=self._merger.stats(),
+        ))
+
+
 class ExtractPipeline:
-    """Orchestrate subtitle -> ASR -> merge extraction."""
+    """Orchestrate extraction as a stage graph.
+
+    Each text source (subtitle, ASR, OCR) is an independent stage; they
+    run concurrently on the pipeline's thread pool and merge joins them.
+    OCR runs in "full" mode when ``OCR_ENABLED`` is set.
+    """
 
     def __init__(self):
         settings = get_settings()
         self.subtitle_extractor = SubtitleExtractor()
-        self.asr_extractor = ASRExtractor(model_size=settings.asr_model)
-        self.ocr_interval = settings.ocr_interval
+        self.asr_extractor = ASRExtractor(
+            model_size=settings.asr_model,
+            workers=settings.asr_workers,
+            backend=settings.asr_backend,
+        )
+        # Model sizes a task may be given, fastest first
+        self.asr_tiers = [m.strip() for m in settings.asr_tiers.split(",") if m.strip()] or [settings.asr_model]
+        self.ocr_enabled = settings.ocr_enabled
+        self.ocr_extractor = OCRExtractor(
+            interval=settings.ocr_interval,
+            lang=settings.ocr_lang,
+            region=settings.ocr_region,
+            batch_size=settings.ocr_batch_size,
+            hash_distance=settings.ocr_hash_distance,
+        )
+        self._executor = ThreadPoolExecutor(
+            # Streamed tasks run their stages alongside those in extract slots
+            max_workers=(max(1, settings.extract_concurrency) + max(1, settings.stream_concurrency)) * STAGES_PER_TASK,
+            thread_name_prefix="tg-pipeline",
+        )
 
     def run(
         self,
@@ -29,34 +123,215 @@ class ExtractPipeline:
         subtitle_path: Optional[str] = None,
         extract_mode: str = "full",  # subtitle_first | full | asr_only
         progress_callback: Optional[Callable[[str, int], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        checkpoint: Optional[TaskCheckpoint] = None,
+        partial_callback: Optional[PartialCallback] = None,
+        asr_model: Optional[str] = None,
+        ocr_cache=None,
     ) -> MergedResult:
-        """Run extraction pipeline."""
-        all_segments: list[TextSegment] = []
+        """Run extraction pipeline. Raises TaskCancelledError if cancelled.
+
+        With a checkpoint, each source's segments are persisted as they
+        complete and reused on the next run. ``partial_callback`` receives
+        merged snapshots of the text extracted so far while sources run.
+        ``asr_model`` overrides the configured model size for this run.
+        ``ocr_cache`` is the shared OCR result cache (see OCRExtractor).
+        """
         path = Path(media_path)
 
         if not path.exists():
             return MergedResult(segments=[], full_text="", stats={"error": "文件不存在"})
 
-        # Check if video (skip ASR for images)
+        # Videos get ASR (and OCR when enabled); images are OCR'd by the executor
         is_video = path.suffix.lower() in {".mp4", ".mkv", ".webm", ".mov", ".avi", ".flv", ".m4v"}
 
-        # 1. Subtitle
+        source_stats: dict[str, dict] = {}
+        sources: dict[str, SourceExtract] = {}
         if extract_mode != "asr_only":
-            _progress("subtitle", 0, progress_callback)
-            sub_segs = self.subtitle_extractor.extract(media_path, subtitle_path)
-            all_segments.extend(sub_segs)
-            _progress("subtitle", 100, progress_callback)
-
-        # 2. ASR (only for video, and if full or asr_only)
+            sources["subtitle"] = lambda token: self.subtitle_extractor.extract(media_path, subtitle_path)
         if is_video and extract_mode in ("full", "asr_only"):
-            _progress("asr", 0, progress_callback)
-            asr_segs = self.asr_extractor.extract(media_path, progress_callback)
-            all_segments.extend(asr_segs)
-            _progress("asr", 100, progress_callback)
+            sources["asr"] = lambda token: self.asr_extractor.extract(
+                media_path,
+                progress_callback=lambda pct: _progress("asr", pct, progress_callback),
+                cancel_token=token,
+                segment_callback=lambda segments: partials.add("asr", segments),
+                model_size=asr_model,
+            )
+        if is_video and self.needs_frames(extract_mode):
+            sources["ocr"] = lambda token: self.ocr_extractor.extract(
+                media_path,
+                progress_callback=lambda pct: _progress("ocr", pct, progress_callback),
+                cancel_token=token,
+                segment_callback=lambda segments: partials.add("ocr", segments),
+                stats=source_stats.setdefault("ocr", {}),
+                cache=ocr_cache,
+            )
+        partials = _PartialResults(partial_callback, sources)
+        return self._run_sources(
+            sources, progress_callback, cancel_token, checkpoint, partials, asr_model, source_stats
+        )
+
+    def needs_frames(self, extract_mode: str) -> bool:
+        """Whether extraction in this mode reads video frames (for OCR)."""
+        return self.ocr_enabled and extract_mode == "full"
+
+    def run_stream(
+        self,
+        audio: Optional[AudioStream],
+        subtitle_path: Optional[str] = None,
+        extract_mode: str = "full",
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        checkpoint: Optional[TaskCheckpoint] = None,
+        duration: Optional[float] = None,
+        partial_callback: Optional[PartialCallback] = None,
+        asr_model: Optional[str] = None,
+    ) -> MergedResult:
+        """Like ``run``, but ASR consumes ``audio`` while it is still arriving.
+
+        Used for streamed remote media, where there is no media file: the
+        subtitle (if any) was downloaded separately to ``subtitle_path``.
+        ``audio`` may be None when the ASR segments are already checkpointed.
+        Without video frames there is no OCR; callers stream only when
+        ``needs_frames`` is false.
+        """
+        sources: dict[str, SourceExtract] = {}
+        if extract_mode != "asr_only":
+            sources["subtitle"] = lambda token: self.subtitle_extractor.extract(None, subtitle_path)
+        if extract_mode in ("full", "asr_only"):
+            sources["asr"] = lambda token: self.asr_extractor.extract_stream(
+                audio,
+                progress_callback=lambda pct: _progress("asr", pct, progress_callback),
+                cancel_token=token,
+                duration=duration,
+                segment_callback=lambda segments: partials.add("asr", segments),
+                model_size=asr_model,
+            )
+        partials = _PartialResults(partial_callback, sources)
+        return self._run_sources(sources, progress_callback, cancel_token, checkpoint, partials, asr_model)
+
+    def _run_sources(
+        self,
+        sources: dict[str, SourceExtract],
+        progress_callback: Optional[Callable[[str, int], None]],
+        cancel_token: Optional[CancellationToken],
+        checkpoint: Optional[TaskCheckpoint],
+        partials: _PartialResults,
+        asr_model: Optional[str] = None,
+        source_stats: Optional[dict[str, dict]] = None,
+    ) -> MergedResult:
+        """Run the source extractors concurrently, then merge their segments.
+
+        A source whose engine is unavailable contributes no segments; the
+        reason is reported in the result stats under its name. The ASR
+        model and backend used are recorded in the ASR stats, and
+        ``source_stats`` that extractors filled in are added to their
+        source's stats.
+        """
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        # Stages poll their own token so a failing stage can stop its siblings
+        stage_token = CancellationToken()
+        unregister = cancel_token.on_cancel(stage_token.cancel) if cancel_token else None
+
+        unavailable: dict[str, str] = {}
+
+        def source_stage(name: str, extract: SourceExtract) -> Stage:
+            return Stage(name, lambda _: self._extract_source(
+                name, lambda: extract(stage_token), progress_callback, checkpoint, unavailable, partials
+            ))
+
+        def merge_stage(outputs: dict) -> MergedResult:
+            if checkpoint:
+                checkpoint.audio_path.unlink(missing_ok=True)  # Segments supersede the audio
+            segments = [seg for name in sources for seg in outputs[name]]
+            result = self._merge(segments, progress_callback, stage_token)
+            if "asr" in sources:
+                result.stats["asr"] = {
+                    "segmentCount": 0,
+                    "charCount": 0,
+                    **result.stats.get("asr", {}),
+                    "model": asr_model or self.asr_extractor.model_size,
+                    "backend": self.asr_extractor.backend.name,
+                }
+            for name, extra in (source_stats or {}).items():
+                if extra:
+                    result.stats[name] = {"segmentCount": 0, "charCount": 0, **result.stats.get(name, {}), **extra}
+            for name, reason in unavailable.items():
+                result.stats[name] = {
+                    "segmentCount": 0,
+                    "charCount": 0,
+                    **result.stats.get(name, {}),
+                    "unavailable": reason,
+                }
+            return result
+
+        stages = [source_stage(name, extract) for name, extract in sources.items()]
+        stages.append(Stage("merge", merge_stage, deps=tuple(sources)))
+        try:
+            return run_graph(stages, self._executor, cancel_token, stage_token)["merge"]
+        finally:
+            if unregister:
+                unregister()
+
+    def _extract_source(
+        self,
+        source: str,
+        extract: Callable[[], list[TextSegment]],
+        progress_callback: Optional[Callable[[str, int], None]],
+        checkpoint: Optional[TaskCheckpoint],
+        unavailable: dict[str, str],
+        partials: _PartialResults,
+    ) -> list[TextSegment]:
+        """Run one extractor, reusing its checkpointed segments if present.
 
-        # 3. Merge
+        If the extractor's engine is unavailable, the reason is recorded in
+        ``unavailable`` and nothing is checkpointed, so a later run after
+        installing it extracts the source.
+        """
+        _progress(source, 0, progress_callback)
+        segments = checkpoint.load_segments(source) if checkpoint else None
+        if segments is None:
+            try:
+                segments = extract()
+            except BackendUnavailableError as e:
+                logger.warning("%s skipped: %s", source, e)
+                unavailable[source] = str(e)
+                segments = []
+            else:
+                if checkpoint:
+                    checkpoint.save_segments(source, segments)
+        partials.set(source, segments)
+        _progress(source, 100, progress_callback)
+        return segments
+
+    def _merge(
+        self,
+        segments: list[TextSegment],
+        progress_callback: Optional[Callable[[str, int], None]],
+        cancel_token: Optional[CancellationToken],
+    ) -> MergedResult:
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
         _progress("merge", 0, progress_callback)
-        result = merge(all_segments)
+        result = merge(segments)
         _progress("merge", 100, progress_callback)
-
         return result
+
+
+_pipeline: Optional[ExtractPipeline] = None
+
+
+def get_pipeline() -> ExtractPipeline:
+    """Get the process-wide pipeline, shared across tasks."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ExtractPipeline()
+    return _pipeline
+
+
+def warm_up() -> None:
+    """Load and prime every configured ASR model size, so all tiers stay resident. Blocking."""
+    pipeline = get_pipeline()
+    for model_size in pipeline.asr_tiers:
+        get_model_registry().warm_up(model_size, pipeline.asr_extractor.backend.name)
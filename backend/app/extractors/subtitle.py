@@ -50,25 +50,30 @@ class SubtitleExtractor:
 
     def extract(
         self,
-        media_path: str,
+        media_path: Optional[str],
         subtitle_path: Optional[str] = None,
     ) -> list[TextSegment]:
         """Extract subtitles from file or video."""
         if subtitle_path:
             return self._parse_file(subtitle_path)
+        found = self.find_subtitle(media_path) if media_path else None
+        return self._parse_file(found) if found else []
+
+    def find_subtitle(self, media_path: str) -> Optional[str]:
+        """Find a sidecar subtitle file for the media."""
         # Try to find sidecar subtitle (same name, different ext)
         media_dir = Path(media_path).parent
         base = Path(media_path).stem
         for ext in [".srt", ".vtt"]:
             p = media_dir / f"{base}{ext}"
             if p.exists():
-                return self._parse_file(str(p))
+                return str(p)
         # yt-dlp outputs e.g. video.zh-Hans.vtt - glob for any .srt/.vtt in same dir
         for pattern in [f"{base}.*.srt", f"{base}.*.vtt", "*.srt", "*.vtt"]:
             for p in media_dir.glob(pattern):
                 if p.suffix.lower() in (".srt", ".vtt"):
-                    return self._parse_file(str(p))
-        return []
+                    return str(p)
+        return None
 
     def _parse_file(self, path: str) -> list[TextSegment]:
         p = Path(path)
@@ -5,18 +5,36 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.database import init_db
+from app.api import batches as batches_router
+from app.api import system as system_router
 from app.api import tasks as tasks_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Application lifespan: init DB on startup."""
+    """Application lifespan: init DB and resume work on startup, stop workers on shutdown."""
+    import asyncio
+    import logging
+
     from app.config import get_settings
+    from app.extractors.asr_parallel import shutdown_asr_pool
+    from app.extractors.pipeline import warm_up
+    from app.orchestrator import recover_tasks, shutdown_scheduler
     settings = get_settings()
     settings.data_dir.mkdir(parents=True, exist_ok=True)
     (settings.data_dir / "cache").mkdir(parents=True, exist_ok=True)
     await init_db()
+    if settings.asr_preload:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        except Exception:
+            logging.getLogger(__name__).warning("ASR warm-up failed; model will load on first task", exc_info=True)
+    # In worker mode, workers reclaim interrupted tasks once their leases expire
+    if settings.recover_on_startup and settings.task_execution == "inline":
+        await recover_tasks()
     yield
+    await shutdown_scheduler()
+    shutdown_asr_pool()
 
 
 app = FastAPI(
@@ -35,6 +53,8 @@ app.add_middleware(
 )
 
 app.include_router(tasks_router.router, prefix="/api/tasks", tags=["tasks"])
+app.include_router(batches_router.router, prefix="/api/batches", tags=["batches"])
+app.include_router(system_router.router, prefix="/api/system", tags=["system"])
 
 
 @app.get("/")
@@ -1,4 +1,7 @@
 """Data models."""
-from app.models.task import Task, TaskResult, TaskStatus
+from app.models.task import Task, TaskPartialResult, TaskResult, TaskStatus
+from app.models.cache import ExtractCacheEntry, OCRCacheEntry
+from app.models.batch import TaskBatch, TaskBatchItem
+from app.models.lease import TaskLease
 
-__all__ = ["Task", "TaskResult", "TaskStatus"]
+__all__ = ["Task", "TaskResult", "TaskPartialResult", "TaskStatus", "ExtractCacheEntry", "OCRCacheEntry", "TaskBatch", "TaskBatchItem", "TaskLease"]
@@ -0,0 +1,35 @@
+"""Task batch models."""
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class TaskBatch(Base):
+    """A group of tasks submitted together."""
+
+    __tablename__ = "task_batches"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    options: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TaskBatchItem(Base):
+    """Membership of a task in a batch, in submission order."""
+
+    __tablename__ = "task_batch_items"
+
+    task_id: Mapped[str] = mapped_column(String(36), ForeignKey("tasks.id"), primary_key=True)
+    batch_id: Mapped[str] = mapped_column(String(36), ForeignKey("task_batches.id"), nullable=False)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("idx_task_batch_items_batch", "batch_id", "position"),
+    )
@@ -0,0 +1,45 @@
+"""Extraction result and OCR cache models."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Text, Integer, DateTime, Index
+from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ExtractCacheEntry(Base):
+    """Stored extraction result keyed by media hash and extraction settings."""
+
+    __tablename__ = "extract_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    media_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    full_text: Mapped[str] = mapped_column(Text, nullable=False)
+    segments: Mapped[dict] = mapped_column(JSON, nullable=False)  # {"items": [segment dicts]}
+    stats: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    settings: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_hit_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_extract_cache_media_hash", "media_hash"),
+    )
+
+
+class OCRCacheEntry(Base):
+    """OCR output for one perceptual frame key, shared across tasks (LRU by last use)."""
+
+    __tablename__ = "ocr_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    lines: Mapped[dict] = mapped_column(JSON, nullable=False)  # {"items": [[text, confidence], ...], "check": guard}
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_ocr_cache_last_used", "last_used_at"),
+    )
@@ -0,0 +1,28 @@
+"""Task lease model for worker processes."""
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class TaskLease(Base):
+    """A worker's time-limited claim on a task.
+
+    The worker renews ``expires_at`` while it runs the task; once the
+    lease expires, any worker may claim the task again.
+    """
+
+    __tablename__ = "task_leases"
+
+    task_id: Mapped[str] = mapped_column(String(36), ForeignKey("tasks.id"), primary_key=True)
+    worker_id: Mapped[str] = mapped_column(String(128), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        Index("idx_task_leases_expires_at", "expires_at"),
+        Index("idx_task_leases_worker", "worker_id"),
+    )
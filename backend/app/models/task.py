@@ -62,3 +62,18 @@ class TaskResult(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     task: Mapped["Task"] = relationship("Task", back_populates="result")
+
+
+class TaskPartialResult(Base):
+    """Text a running task has extracted so far.
+
+    Rewritten as extraction progresses and removed once the TaskResult is
+    saved; a failed or cancelled task keeps what it had produced.
+    """
+
+    __tablename__ = "task_partial_results"
+
+    task_id: Mapped[str] = mapped_column(String(36), ForeignKey("tasks.id"), primary_key=True)
+    full_text: Mapped[str] = mapped_column(Text, nullable=False)
+    segments: Mapped[dict] = mapped_column(JSON, nullable=False)  # {"items": [segment dicts]}
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,20 @@
 """Task orchestrator."""
-from app.orchestrator.executor import execute_task
+from app.orchestrator.executor import cancel_execution, execute_task, recover_tasks
+from app.orchestrator.scheduler import (
+    TaskScheduler,
+    batch_lane,
+    dispatch_task,
+    get_scheduler,
+    shutdown_scheduler,
+)
 
-__all__ = ["execute_task"]
+__all__ = [
+    "execute_task",
+    "cancel_execution",
+    "recover_tasks",
+    "TaskScheduler",
+    "batch_lane",
+    "dispatch_task",
+    "get_scheduler",
+    "shutdown_scheduler",
+]
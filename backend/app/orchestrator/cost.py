@@ -0,0 +1,73 @@
+"""Task cost estimates used for queue ordering and admission control.
+
+Costs are rough seconds of worker time. They only need to rank tasks
+and size the backlog, not predict wall-clock time.
+"""
+import os
+from typing import Optional
+
+from app.parsers.models import MediaResource
+
+# Seconds of ASR compute per second of media on CPU, by Whisper model (openai-whisper)
+ASR_REALTIME_FACTOR = {
+    "tiny": 0.1,
+    "base": 0.2,
+    "small": 0.5,
+    "medium": 1.0,
+    "large": 2.0,
+    "large-v2": 2.0,
+    "large-v3": 2.0,
+}
+
+# Relative ASR compute by backend (faster-whisper int8 on CTranslate2 is ~4x faster)
+ASR_BACKEND_FACTOR = {
+    "whisper": 1.0,
+    "faster-whisper": 0.25,
+}
+
+# Duration assumed when neither the platform nor the file tells us
+DEFAULT_DURATION = 600.0
+
+# Typical bitrate of local video (~2 Mbit/s), to guess duration from size
+LOCAL_BYTES_PER_SECOND = 250_000
+
+# Seconds of frame decoding and change detection per second of video when
+# OCR is on; recognition itself scales with the number of distinct texts
+OCR_REALTIME_FACTOR = 0.05
+
+# Parse, download setup and subtitle parsing, per task
+BASE_COST = 5.0
+
+
+def estimate_duration(media: MediaResource) -> Optional[float]:
+    """Media duration in seconds: from the platform, else guessed from file size."""
+    if media.duration_sec:
+        return media.duration_sec
+    if media.local_path:
+        try:
+            return os.path.getsize(media.local_path) / LOCAL_BYTES_PER_SECOND
+        except OSError:
+            return None
+    return None
+
+
+def estimate_cost(
+    duration: Optional[float],
+    media_type: str = "video",
+    extract_mode: str = "full",
+    asr_model: str = "base",
+    asr_backend: str = "whisper",
+    ocr: bool = False,
+) -> float:
+    """Estimated seconds of work for one task.
+
+    Only ASR and OCR scale with duration; subtitle-only extraction and
+    images cost a constant.
+    """
+    if media_type != "video" or extract_mode == "subtitle_first":
+        return BASE_COST
+    seconds = duration if duration is not None else DEFAULT_DURATION
+    factor = ASR_REALTIME_FACTOR.get(asr_model, 1.0) * ASR_BACKEND_FACTOR.get(asr_backend, 1.0)
+    if ocr and extract_mode == "full":
+        factor += OCR_REALTIME_FACTOR
+    return BASE_COST + seconds * factor
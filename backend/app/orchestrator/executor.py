@@ -1,16 +1,63 @@
 """Task execution logic."""
 import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import asdict
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
+from app.cancellation import CancellationToken, TaskCancelledError
+from app.config import get_settings
 from app.database import async_session
-from app.extractors.pipeline import ExtractPipeline
-from app.models.task import TaskStatus
+from app.extractors.asr_backends import BackendUnavailableError
+from app.extractors.audio import AudioStream
+from app.extractors.merger import merge, merger_settings
+from app.extractors.models import MergedResult
+from app.extractors.pipeline import get_pipeline
+from app.models.task import Task, TaskStatus
+from app.orchestrator.cost import estimate_cost, estimate_duration
+from app.orchestrator.image_batch import get_image_batcher
+from app.orchestrator.progress import get_progress_hub
+from app.orchestrator.singleflight import get_single_flight
+from app.orchestrator.tiering import choose_asr_model
 from app.parsers import get_default_registry
-from app.parsers.models import UnsupportedPlatformError
+from app.parsers.models import MediaResource, UnsupportedPlatformError
+from app.repositories.batch_repository import BatchRepository
 from app.repositories.task_repository import TaskRepository, TaskResultRepository
+from app.services.checkpoint import TaskCheckpoint
+from app.services.downloader import download_media, download_subtitles, stream_audio
+from app.services.ocr_cache import get_ocr_cache
+from app.services.result_cache import get_result_cache, hash_media, make_cache_key
 from app.services.storage import StorageService
 
+logger = logging.getLogger(__name__)
+
+# Statuses of tasks that were started but not finished
+ACTIVE_STATUSES = (
+    TaskStatus.PENDING.value,
+    TaskStatus.PARSING.value,
+    TaskStatus.DOWNLOADING.value,
+    TaskStatus.EXTRACTING.value,
+    TaskStatus.MERGING.value,
+)
+
+DONE_STAGE_PROGRESS = {
+    "parsing": {"status": "done", "progress": 100},
+    "downloading": {"status": "done", "progress": 100},
+    "subtitle": {"status": "done", "progress": 100},
+    "asr": {"status": "done", "progress": 100},
+    "merge": {"status": "done", "progress": 100},
+}
+
+
+def _done_stage_progress(stats: Optional[dict]) -> dict:
+    """Stage progress of a completed task: every stage done, OCR if it ran."""
+    if stats and "ocr" in stats:
+        return {**DONE_STAGE_PROGRESS, "ocr": {"status": "done", "progress": 100}}
+    return DONE_STAGE_PROGRESS
+
 
 async def _update_progress(
     task_id: str,
@@ -19,151 +66,796 @@ async def _update_progress(
     stage_progress: Optional[dict] = None,
     error: Optional[str] = None,
 ):
-    """Update task progress in DB."""
+    """Update task progress in DB and push it to stream subscribers.
+
+    Updates are fanned out to coalesced follower tasks.
+    """
+    single_flight = get_single_flight()
+    flight = single_flight.get(task_id)
+    if flight is not None and flight.leader_id == task_id:
+        flight.snapshot["status"] = status
+        if progress is not None:
+            flight.snapshot["progress"] = progress
+        if stage_progress is not None:
+            flight.snapshot["stage_progress"] = stage_progress
+    updated = []
     async with async_session() as session:
         repo = TaskRepository(session)
-        await repo.update_status(
-            task_id,
-            status=status,
-            progress=progress,
-            stage_progress=stage_progress,
-            error=error,
-        )
+        for member_id in single_flight.members_of(task_id):
+            if await repo.update_status(
+                member_id,
+                status=status,
+                progress=progress,
+                stage_progress=stage_progress,
+                error=error,
+                unless_status=TaskStatus.CANCELLED.value,
+            ):
+                updated.append(member_id)
         await session.commit()
+    hub = get_progress_hub()
+    for member_id in updated:
+        hub.publish(member_id, status=status, progress=progress, stage_progress=stage_progress, error=error)
 
 
+# Minimum seconds between stage progress writes for one task
+STAGE_FLUSH_INTERVAL = 1.0
 
+# Tasks whose in-memory stage progress is newer than the DB, and those with a writer running
+_stages_dirty: set[str] = set()
+_stages_flushing: set[str] = set()
 
-async def execute_task(task_id: str) -> None:
-    """Execute extraction task. Runs in background."""
-    storage = StorageService()
-    registry = get_default_registry()
-    pipeline = ExtractPipeline()
 
-    async with async_session() as session:
-        task_repo = TaskRepository(session)
-        result_repo = TaskResultRepository(session)
-        task = await task_repo.get(task_id)
+def _publish_stage(task_id: str, stage: str, pct: int) -> None:
+    """Push a stage update for a task and its followers.
 
-    if not task:
-        return
+    Subscribers get every update; the DB copy of stage_progress is
+    written behind, at most once per STAGE_FLUSH_INTERVAL per task.
+    """
+    hub = get_progress_hub()
+    stage_progress = {stage: {"status": "done" if pct >= 100 else "running", "progress": pct}}
+    for member_id in get_single_flight().members_of(task_id):
+        hub.publish(member_id, stage_progress=stage_progress)
+        _stages_dirty.add(member_id)
+        if member_id not in _stages_flushing:
+            _stages_flushing.add(member_id)
+            asyncio.ensure_future(_flush_stage_progress(member_id))
 
-    if task.status in (TaskStatus.COMPLETED.value, TaskStatus.CANCELLED.value, TaskStatus.FAILED.value):
-        return
 
+async def _flush_stage_progress(task_id: str) -> None:
+    """Write a task's latest stage progress until no newer update is pending.
+
+    A single writer per task keeps writes ordered; updates arriving while
+    it sleeps are coalesced into its next write.
+    """
     try:
-        # 1. PARSING
-        await _update_progress(
-            task_id,
-            status=TaskStatus.PARSING.value,
-            progress=5,
-            stage_progress={"parsing": {"status": "running", "progress": 0}},
-        )
-        parse_result = registry.parse(task.input)
+        while task_id in _stages_dirty:
+            _stages_dirty.discard(task_id)
+            snapshot = get_progress_hub().snapshot(task_id)
+            if snapshot is None or snapshot["status"] is None:
+                break  # Finished: the outcome writes the final stage progress
+            async with async_session() as session:
+                await TaskRepository(session).update_stage_progress(
+                    task_id, snapshot["stageProgress"], while_status=snapshot["status"]
+                )
+                await session.commit()
+            await asyncio.sleep(STAGE_FLUSH_INTERVAL)
+    finally:
+        _stages_dirty.discard(task_id)
+        _stages_flushing.discard(task_id)
 
-        if parse_result.error:
-            await _update_progress(task_id, status=TaskStatus.FAILED.value, error=parse_result.error)
-            return
 
-        # Update task platform/metadata
-        async with async_session() as session:
-            task_repo = TaskRepository(session)
-            t = await task_repo.get(task_id)
+# Tasks with a partial result waiting to be written, and those with a writer running
+_partials_pending: dict[str, dict] = {}
+_partials_flushing: set[str] = set()
+
+
+def _partial_callback(loop: asyncio.AbstractEventLoop, task_id: str):
+    """Pipeline callback that hands merged snapshots to the event loop."""
+    def on_partial(merged: MergedResult) -> None:
+        payload = {"full_text": merged.full_text, "segments": [s.to_dict() for s in merged.segments]}
+        loop.call_soon_threadsafe(_publish_partial, task_id, payload)
+    return on_partial
+
+
+def _publish_partial(task_id: str, payload: dict) -> None:
+    """Store the latest partial result of a task and its followers.
+
+    Snapshots are written in order by one writer per task; one arriving
+    while a write is in flight replaces any older unwritten one.
+    """
+    for member_id in get_single_flight().members_of(task_id):
+        _partials_pending[member_id] = payload
+        if member_id not in _partials_flushing:
+            _partials_flushing.add(member_id)
+            asyncio.ensure_future(_flush_partial(member_id))
+
+
+def _is_live(task_id: str) -> bool:
+    """Whether the hub still tracks the task; it drops tasks once they finish."""
+    snapshot = get_progress_hub().snapshot(task_id)
+    return snapshot is not None and snapshot["status"] is not None
+
+
+async def _flush_partial(task_id: str) -> None:
+    try:
+        while task_id in _partials_pending:
+            payload = _partials_pending.pop(task_id)
+            if not _is_live(task_id):
+                break  # Finished: the final result supersedes it
+            async with async_session() as session:
+                await TaskResultRepository(session).save_partial(task_id, payload["full_text"], payload["segments"])
+                await session.commit()
+            # Publishing for a task that finished during the write would
+            # recreate its hub entry, and nothing would remove it again
+            if not _is_live(task_id):
+                break
+            get_progress_hub().publish(task_id, partial_segments=len(payload["segments"]))
+    finally:
+        _partials_pending.pop(task_id, None)
+        _partials_flushing.discard(task_id)
+
+
+async def _update_metadata(task_id: str, platform: str, metadata: dict) -> None:
+    """Record parsed platform/metadata on the task and its followers."""
+    single_flight = get_single_flight()
+    flight = single_flight.get(task_id)
+    if flight is not None and flight.leader_id == task_id:
+        flight.snapshot["platform"] = platform
+        flight.snapshot["metadata"] = metadata
+    async with async_session() as session:
+        task_repo = TaskRepository(session)
+        for member_id in single_flight.members_of(task_id):
+            t = await task_repo.get(member_id)
             if t:
-                t.platform = parse_result.platform.value
-                t.metadata_ = parse_result.metadata
+                t.platform = platform
+                t.metadata_ = metadata
                 await task_repo.update(t)
-                await session.commit()
+        await session.commit()
 
-        media = parse_result.media_list[0]
-        media_path = media.local_path
 
-        # 2. DOWNLOADING (for local, just ensure we have path; for remote would download)
+async def _apply_snapshot(task_id: str, snapshot: dict) -> None:
+    """Bring a newly attached follower up to the leader's current state."""
+    if "platform" in snapshot:
+        await _update_metadata(task_id, snapshot["platform"], snapshot["metadata"])
+    if "status" in snapshot:
         await _update_progress(
             task_id,
-            status=TaskStatus.DOWNLOADING.value,
-            progress=10,
-            stage_progress={"downloading": {"status": "running", "progress": 0}},
+            status=snapshot["status"],
+            progress=snapshot.get("progress"),
+            stage_progress=snapshot.get("stage_progress"),
         )
 
-        if media.url:
-            # Remote: download to cache (yt-dlp) with subtitles
+
+# Results waiting to be written, with the futures of the tasks waiting on them
+_results_pending: list[tuple[tuple, asyncio.Future]] = []
+_result_writer: Optional[asyncio.Task] = None
+
+
+async def _save_result(task_id: str, full_text: str, segments: list, stats: Optional[dict]) -> None:
+    """Save the result and mark the task completed, unless it was cancelled.
+
+    Results are group-committed: one writer drains every result that is
+    waiting into a single transaction, so tasks finishing together (such
+    as a batch of images) share one write.
+    """
+    global _result_writer
+    future = asyncio.get_running_loop().create_future()
+    _results_pending.append(((task_id, full_text, segments, stats), future))
+    if _result_writer is None:
+        _result_writer = asyncio.ensure_future(_write_results())
+    await future
+
+
+async def _write_results() -> None:
+    global _result_writer
+    try:
+        while _results_pending:
+            batch = list(_results_pending)
+            _results_pending.clear()
             try:
-                import yt_dlp
-                task_dir = storage.get_task_dir(task_id)
-                out_path = task_dir / "video.%(ext)s"
-                ydl_opts = {
-                    "outtmpl": str(out_path),
-                    "writesubtitles": True,
-                    "writeautomaticsub": True,
-                    "subtitleslangs": ["zh", "zh-Hans", "zh-CN", "en"],
-                    "subtitlesformat": "vtt/srt/best",
-                    "quiet": True,
-                }
-                yt_dlp.YoutubeDL(ydl_opts).download([media.url])
-                files = list(task_dir.glob("video.*"))
-                video_files = [f for f in files if f.suffix.lower() in (".mp4", ".mkv", ".webm", ".flv", ".m4a")]
-                media_path = str(video_files[0]) if video_files else (str(files[0]) if files else None)
-            except Exception as e:
-                await _update_progress(task_id, status=TaskStatus.FAILED.value, error=f"下载失败: {e}")
-                return
-        else:
-            # Local: copy to cache for consistency (optional, could use directly)
-            # Using directly to avoid disk duplication for local files
-            pass
+                completed = await _commit_results([item for item, _ in batch])
+            except Exception:
+                # Write one by one, so a bad result only fails its own task
+                completed = []
+                for item, future in batch:
+                    try:
+                        completed += await _commit_results([item])
+                    except Exception as e:
+                        future.set_exception(e)
+            for task_id, stage_progress in completed:
+                get_progress_hub().publish(
+                    task_id,
+                    status=TaskStatus.COMPLETED.value,
+                    progress=100,
+                    stage_progress=stage_progress,
+                )
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+    finally:
+        _result_writer = None
 
-        if not media_path or not Path(media_path).exists():
-            await _update_progress(task_id, status=TaskStatus.FAILED.value, error="无法获取媒体文件")
-            return
 
-        # 3. EXTRACTING
-        await _update_progress(
+async def _commit_results(items: list[tuple]) -> list[tuple[str, dict]]:
+    """Save results and mark their tasks completed in one transaction.
+
+    Returns the ids completed, each with the stage progress stored.
+    """
+    completed = []
+    async with async_session() as session:
+        task_repo = TaskRepository(session)
+        result_repo = TaskResultRepository(session)
+        for task_id, full_text, segments, stats in items:
+            stage_progress = _done_stage_progress(stats)
+            updated = await task_repo.update_status(
+                task_id,
+                status=TaskStatus.COMPLETED.value,
+                progress=100,
+                stage_progress=stage_progress,
+                unless_status=TaskStatus.CANCELLED.value,
+            )
+            if not updated:
+                continue
+            await result_repo.save(task_id, full_text=full_text, segments=segments, stats=stats)
+            await result_repo.delete_partial(task_id)
+            completed.append((task_id, stage_progress))
+        await session.commit()
+    return completed
+
+
+async def _apply_outcome(task_id: str, outcome: Optional[dict]) -> None:
+    """Write a flight outcome to one task row."""
+    if outcome is None:
+        return
+    if outcome["status"] == TaskStatus.COMPLETED.value:
+        result = outcome["result"]
+        try:
+            await _save_result(task_id, result["full_text"], result["segments"], result["stats"])
+            return
+        except Exception as e:
+            logger.exception("Saving the result of task %s failed", task_id)
+            outcome = _failed(f"保存结果失败: {e}")
+    async with async_session() as session:
+        updated = await TaskRepository(session).update_status(
             task_id,
-            status=TaskStatus.EXTRACTING.value,
-            progress=15,
-            stage_progress={
-                "subtitle": {"status": "pending", "progress": 0},
-                "asr": {"status": "pending", "progress": 0},
-                "merge": {"status": "pending", "progress": 0},
-            },
+            status=outcome["status"],
+            error=outcome.get("error"),
+            unless_status=TaskStatus.CANCELLED.value,
         )
+        await session.commit()
+    if updated:
+        get_progress_hub().publish(task_id, status=outcome["status"], error=outcome.get("error"))
 
-        # Run extraction (sync - run in executor to not block event loop)
-        loop = asyncio.get_event_loop()
-        merged = await loop.run_in_executor(None, lambda: pipeline.run(media_path))
 
-        # 4. SAVE RESULT & COMPLETE
-        async with async_session() as session:
-            task_repo = TaskRepository(session)
-            result_repo = TaskResultRepository(session)
+def _has_unavailable(stats: dict) -> bool:
+    """Whether a source was skipped because its engine is missing; such results are not cached."""
+    return any(isinstance(v, dict) and "unavailable" in v for v in stats.values())
 
-            segments_dict = [s.to_dict() for s in merged.segments]
-            await result_repo.save(
-                task_id,
-                full_text=merged.full_text,
-                segments=segments_dict,
-                stats=merged.stats,
+
+def _completed(full_text: str, segments: list, stats: Optional[dict]) -> dict:
+    return {
+        "status": TaskStatus.COMPLETED.value,
+        "result": {"full_text": full_text, "segments": segments, "stats": stats},
+    }
+
+
+def _failed(error: str) -> dict:
+    return {"status": TaskStatus.FAILED.value, "error": error}
+
+
+def _cancelled() -> dict:
+    return {"status": TaskStatus.CANCELLED.value}
+
+
+async def _run(task: Task, options: dict, cancel_token: CancellationToken) -> dict:
+    """Run one task, discarding its checkpoints once it reaches an outcome.
+
+    Checkpoints survive only interruptions (process exit or shutdown), so
+    ``recover_tasks`` can resume from them on the next start.
+    """
+    storage = StorageService()
+    checkpoint = TaskCheckpoint(storage.get_task_dir(task.id))
+    try:
+        outcome = await _run_stages(task, options, cancel_token, checkpoint)
+    except (TaskCancelledError, asyncio.CancelledError):
+        raise
+    except Exception:
+        _discard_checkpoint(storage, task.id, checkpoint)
+        raise
+    _discard_checkpoint(storage, task.id, checkpoint)
+    return outcome
+
+
+def _discard_checkpoint(storage: StorageService, task_id: str, checkpoint: TaskCheckpoint) -> None:
+    parsed = checkpoint.get("parse")
+    if parsed and parsed["media"].get("url"):
+        # Cleanup cache for remote: downloaded media belongs to the task
+        storage.cleanup_task(task_id)
+    else:
+        checkpoint.clear()
+
+
+async def _run_stages(
+    task: Task,
+    options: dict,
+    cancel_token: CancellationToken,
+    checkpoint: TaskCheckpoint,
+) -> dict:
+    """Parse, download and extract, skipping stages already checkpointed."""
+    from app.orchestrator.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    registry = get_default_registry()
+    pipeline = get_pipeline()
+    result_cache = get_result_cache()
+    task_id = task.id
+    extract_mode = options.get("extract_mode", "full")
+
+    # 1. PARSING
+    await _update_progress(
+        task_id,
+        status=TaskStatus.PARSING.value,
+        progress=5,
+        stage_progress={"parsing": {"status": "running", "progress": 0}},
+    )
+    parsed = checkpoint.get("parse")
+    if parsed is None:
+        parse_result = await scheduler.run_in_stage("parsing", registry.parse, task.input)
+
+        if parse_result.error:
+            return _failed(parse_result.error)
+
+        parsed = {
+            "platform": parse_result.platform.value,
+            "metadata": parse_result.metadata,
+            "media": asdict(parse_result.media_list[0]),
+        }
+        checkpoint.mark("parse", parsed)
+
+    media = MediaResource(**parsed["media"])
+    media_path = media.local_path
+    duration = estimate_duration(media)
+
+    # Model size is chosen once per task; a resumed task keeps its choice
+    tier = checkpoint.get("asr_model")
+    if tier is None:
+        settings = get_settings()
+        tier = {"model": choose_asr_model(
+            pipeline.asr_tiers,
+            duration,
+            scheduler.backlog() / max(1, settings.extract_concurrency),
+            options.get("asr_quality"),
+            backlog_step=settings.asr_tier_backlog,
+            long_media=settings.asr_tier_long_media,
+        )}
+        checkpoint.mark("asr_model", tier)
+    asr_model = tier["model"]
+    cost = estimate_cost(
+        duration,
+        media.media_type,
+        extract_mode,
+        asr_model,
+        pipeline.asr_extractor.backend.name,
+        pipeline.ocr_enabled,
+    )
+    scheduler.set_cost(task_id, cost)
+
+    # Update task platform/metadata; the cost orders claims of the task by
+    # workers if it is resumed elsewhere
+    metadata = {**parsed["metadata"], "estimatedCost": round(cost, 1)}
+    if options:
+        metadata["options"] = options
+    await _update_metadata(task_id, parsed["platform"], metadata)
+
+    # Images carry text only on screen: OCR them when enabled; otherwise they
+    # go through the plain pipeline like videos, which skips OCR
+    if media.media_type == "image" and media_path and pipeline.ocr_enabled and extract_mode != "asr_only":
+        return await _run_image(media_path)
+
+    # 2. DOWNLOADING (for local, just ensure we have path; for remote would download)
+    await _update_progress(
+        task_id,
+        status=TaskStatus.DOWNLOADING.value,
+        progress=10,
+        stage_progress={
+            "parsing": {"status": "done", "progress": 100},
+            "downloading": {"status": "running", "progress": 0},
+        },
+    )
+
+    loop = asyncio.get_running_loop()
+
+    def on_download_progress(pct: int) -> None:
+        loop.call_soon_threadsafe(_publish_stage, task_id, "downloading", pct)
+
+    downloaded = checkpoint.get("download")
+    streaming = (
+        media.url
+        and get_settings().stream_ingest
+        and extract_mode in ("full", "asr_only")
+        and not pipeline.needs_frames(extract_mode)
+        and not (downloaded and Path(downloaded["media_path"]).exists())
+    )
+    if streaming:
+        return await _run_streaming(task_id, media, extract_mode, asr_model, cancel_token, checkpoint)
+
+    if downloaded and Path(downloaded["media_path"]).exists():
+        media_path = downloaded["media_path"]
+    elif media.url:
+        # Remote: download to cache (yt-dlp) with subtitles
+        try:
+            media_path = await scheduler.run_in_stage(
+                "downloading", download_media, media.url, checkpoint.task_dir, cancel_token, on_download_progress
             )
-            await task_repo.update_status(
-                task_id,
-                status=TaskStatus.COMPLETED.value,
-                progress=100,
-                stage_progress={
-                    "parsing": {"status": "done", "progress": 100},
-                    "downloading": {"status": "done", "progress": 100},
-                    "subtitle": {"status": "done", "progress": 100},
-                    "asr": {"status": "done", "progress": 100},
-                    "merge": {"status": "done", "progress": 100},
-                },
+        except TaskCancelledError:
+            raise
+        except Exception as e:
+            return _failed(f"下载失败: {e}")
+        if media_path:
+            checkpoint.mark("download", {"media_path": media_path})
+    else:
+        # Local: copy to cache for consistency (optional, could use directly)
+        # Using directly to avoid disk duplication for local files
+        pass
+
+    if not media_path or not Path(media_path).exists():
+        return _failed("无法获取媒体文件")
+
+    # 3. EXTRACTING
+    await _update_progress(
+        task_id,
+        status=TaskStatus.EXTRACTING.value,
+        progress=15,
+        stage_progress={
+            "parsing": {"status": "done", "progress": 100},
+            "downloading": {"status": "done", "progress": 100},
+            "subtitle": {"status": "pending", "progress": 0},
+            "asr": {"status": "pending", "progress": 0},
+            **({"ocr": {"status": "pending", "progress": 0}} if pipeline.needs_frames(extract_mode) else {}),
+            "merge": {"status": "pending", "progress": 0},
+        },
+    )
+
+    # Content-addressed cache: identical media + settings reuse the stored result
+    hashes = checkpoint.get("hash")
+    if hashes is None or hashes.get("media_path") != media_path:
+        subtitle_path = pipeline.subtitle_extractor.find_subtitle(media_path)
+        hashes = {
+            "media_path": media_path,
+            "media": await scheduler.run_in_stage("downloading", hash_media, media_path),
+            "subtitle": await scheduler.run_in_stage("downloading", hash_media, subtitle_path) if subtitle_path else None,
+        }
+        checkpoint.mark("hash", hashes)
+    media_hash = hashes["media"]
+    cache_settings = {
+        "subtitle": hashes["subtitle"],
+        "extract_mode": extract_mode,
+        "asr_model": asr_model,
+        "asr_backend": pipeline.asr_extractor.backend.name,
+        "merger": merger_settings(),
+    }
+    if pipeline.needs_frames(extract_mode):
+        cache_settings["ocr"] = pipeline.ocr_extractor.cache_settings()
+    cache_key = make_cache_key(media_hash, cache_settings)
+    cached = await result_cache.lookup(cache_key)
+    if cached is not None:
+        return _completed(cached["full_text"], cached["segments"], cached["stats"])
+
+    # Run extraction on the CPU-bound stage pool; stage progress is pushed live
+    ocr_cache = get_ocr_cache()
+
+    def on_progress(stage: str, pct: int) -> None:
+        loop.call_soon_threadsafe(_publish_stage, task_id, stage, pct)
+
+    merged = await scheduler.run_in_stage(
+        "extracting",
+        partial(
+            pipeline.run,
+            media_path,
+            extract_mode=extract_mode,
+            progress_callback=on_progress,
+            cancel_token=cancel_token,
+            checkpoint=checkpoint,
+            partial_callback=_partial_callback(loop, task_id),
+            asr_model=asr_model,
+            ocr_cache=ocr_cache.bind(loop) if ocr_cache else None,
+        ),
+    )
+    if "error" not in merged.stats and not _has_unavailable(merged.stats):
+        await result_cache.store(cache_key, media_hash, merged, cache_settings)
+    return _completed(merged.full_text, [s.to_dict() for s in merged.segments], merged.stats)
+
+
+async def _run_image(media_path: str) -> dict:
+    """Extract on-screen text from a local image through the shared image batcher.
+
+    The image is read once into memory; it is hashed for the result cache
+    and handed to the batcher as bytes, skipping the per-stage progress
+    writes of media tasks.
+    """
+    from app.orchestrator.scheduler import get_scheduler
+
+    pipeline = get_pipeline()
+    result_cache = get_result_cache()
+    try:
+        data = await get_scheduler().run_in_stage("downloading", Path(media_path).read_bytes)
+    except OSError as e:
+        return _failed(f"无法读取图片: {e}")
+    media_hash = hashlib.sha256(data).hexdigest()
+    cache_settings = {
+        "image": pipeline.ocr_extractor.image_cache_settings(),
+        "merger": merger_settings(),
+    }
+    cache_key = make_cache_key(media_hash, cache_settings)
+    cached = await result_cache.lookup(cache_key)
+    if cached is not None:
+        return _completed(cached["full_text"], cached["segments"], cached["stats"])
+
+    try:
+        segments, batch_stats = await get_image_batcher().recognize(data)
+    except ValueError as e:
+        return _failed(str(e))
+    except BackendUnavailableError as e:
+        return _completed("", [], {"ocr": {"segmentCount": 0, "charCount": 0, "unavailable": str(e)}})
+    merged = merge(segments)
+    merged.stats["ocr"] = {"segmentCount": 0, "charCount": 0, **merged.stats.get("ocr", {}), "batch": batch_stats}
+    await result_cache.store(cache_key, media_hash, merged, cache_settings)
+    return _completed(merged.full_text, [s.to_dict() for s in merged.segments], merged.stats)
+
+
+async def _run_streaming(
+    task_id: str,
+    media: MediaResource,
+    extract_mode: str,
+    asr_model: str,
+    cancel_token: CancellationToken,
+    checkpoint: TaskCheckpoint,
+) -> dict:
+    """Download and extract a remote media concurrently.
+
+    Only the audio track is fetched; it is decoded as it arrives and ASR
+    transcribes completed chunks in the extracting stage while the rest is
+    still downloading, so latency approaches max(download, ASR) instead of
+    their sum. The result cache is keyed on the hash of the downloaded
+    audio stream, known once the download ends: a hit then stops the ASR
+    still catching up and returns the stored result.
+    """
+    from app.orchestrator.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    pipeline = get_pipeline()
+    result_cache = get_result_cache()
+    loop = asyncio.get_running_loop()
+
+    # Hashes of the audio stream and subtitle, kept across interruptions
+    hashes = checkpoint.get("stream_hash") or {}
+    subtitle_path = None
+    if extract_mode != "asr_only" and checkpoint.load_segments("subtitle") is None:
+        try:
+            subtitle_path = await scheduler.run_in_stage(
+                "downloading", download_subtitles, media.url, checkpoint.task_dir, cancel_token
             )
-            await session.commit()
+        except TaskCancelledError:
+            raise
+        except Exception as e:
+            return _failed(f"下载失败: {e}")
+        hashes = {"subtitle": None}
+        if subtitle_path:
+            hashes["subtitle"] = await scheduler.run_in_stage("downloading", hash_media, subtitle_path)
+        checkpoint.mark("stream_hash", hashes)
+    # Subtitles resumed from a checkpoint without their hash cannot be keyed
+    cacheable = extract_mode == "asr_only" or "subtitle" in hashes
+    cache_settings = {
+        "ingest": "stream",
+        "subtitle": hashes.get("subtitle"),
+        "extract_mode": extract_mode,
+        "asr_model": asr_model,
+        "asr_backend": pipeline.asr_extractor.backend.name,
+        "merger": merger_settings(),
+    }
+    if cacheable and hashes.get("audio"):
+        cached = await result_cache.lookup(make_cache_key(hashes["audio"], cache_settings))
+        if cached is not None:
+            return _completed(cached["full_text"], cached["segments"], cached["stats"])
 
-        # Cleanup cache for remote (optional)
-        if media.url:
-            storage.cleanup_task(task_id)
+    await _update_progress(
+        task_id,
+        status=TaskStatus.EXTRACTING.value,
+        progress=15,
+        stage_progress={
+            "parsing": {"status": "done", "progress": 100},
+            "downloading": {"status": "running", "progress": 0},
+            "subtitle": {"status": "pending", "progress": 0},
+            "asr": {"status": "pending", "progress": 0},
+            "merge": {"status": "pending", "progress": 0},
+        },
+    )
 
+    def on_download_progress(pct: int) -> None:
+        loop.call_soon_threadsafe(_publish_stage, task_id, "downloading", pct)
+
+    def on_progress(stage: str, pct: int) -> None:
+        loop.call_soon_threadsafe(_publish_stage, task_id, stage, pct)
+
+    # Extraction also stops on a cache hit, without cancelling the task
+    extract_token = CancellationToken()
+    unregister = cancel_token.on_cancel(extract_token.cancel)
+
+    async def ingest(audio: AudioStream) -> Optional[dict]:
+        # Stream the audio, then look up the result cached for it
+        hashes["audio"] = await scheduler.run_in_stage(
+            "downloading", stream_audio, media.url, audio, cancel_token, on_download_progress
+        )
+        checkpoint.mark("stream_hash", hashes)
+        if not cacheable:
+            return None
+        cached = await result_cache.lookup(make_cache_key(hashes["audio"], cache_settings))
+        if cached is not None:
+            extract_token.cancel()
+        return cached
+
+    jobs = []
+    audio = None
+    if checkpoint.load_segments("asr") is None:
+        if checkpoint.audio_path.exists():
+            audio = AudioStream.from_file(checkpoint.audio_path)  # Fully decoded before an interruption
+        else:
+            audio = AudioStream(checkpoint.audio_path)
+            jobs.append(ingest(audio))
+    jobs.append(scheduler.run_in_stage(
+        "streaming",
+        partial(
+            pipeline.run_stream,
+            audio,
+            subtitle_path,
+            extract_mode=extract_mode,
+            progress_callback=on_progress,
+            cancel_token=extract_token,
+            checkpoint=checkpoint,
+            duration=media.duration_sec,
+            partial_callback=_partial_callback(loop, task_id),
+            asr_model=asr_model,
+        ),
+    ))
+    # Wait for both so neither job's failure goes unobserved. If this
+    # coroutine is cancelled, the stage threads may still be running and
+    # stop through the callback once the flight token is cancelled
+    *ingested, merged = await asyncio.gather(*jobs, return_exceptions=True)
+    unregister()
+    cached = ingested[0] if ingested and isinstance(ingested[0], dict) else None
+    if cached is not None and not cancel_token.cancelled:
+        return _completed(cached["full_text"], cached["segments"], cached["stats"])
+    for outcome in (*ingested, merged):
+        if isinstance(outcome, TaskCancelledError):
+            raise outcome
+    if ingested and isinstance(ingested[0], Exception):
+        return _failed(f"下载失败: {ingested[0]}")
+    if isinstance(merged, Exception):
+        raise merged
+    if cacheable and hashes.get("audio") and "error" not in merged.stats and not _has_unavailable(merged.stats):
+        cache_key = make_cache_key(hashes["audio"], cache_settings)
+        await result_cache.store(cache_key, hashes["audio"], merged, cache_settings)
+    return _completed(merged.full_text, [s.to_dict() for s in merged.segments], merged.stats)
+
+
+async def recover_tasks() -> int:
+    """Requeue tasks left unfinished by a previous process.
+
+    Each resumes from its last checkpoint. Returns the number requeued.
+    """
+    from app.orchestrator.scheduler import DEFAULT_LANE, batch_lane, get_scheduler
+
+    async with async_session() as session:
+        repo = TaskRepository(session)
+        tasks = await repo.list_by_status(ACTIVE_STATUSES)
+        for t in tasks:
+            await repo.update_status(t.id, status=TaskStatus.PENDING.value)
+        batch_ids = await BatchRepository(session).batch_ids_for([t.id for t in tasks])
+        await session.commit()
+
+    scheduler = get_scheduler()
+    for t in tasks:
+        batch_id = batch_ids.get(t.id)
+        scheduler.submit(t.id, lane=batch_lane(batch_id) if batch_id else DEFAULT_LANE)
+    return len(tasks)
+
+
+async def execute_task(task_id: str) -> None:
+    """Execute extraction task. Scheduled by TaskScheduler.
+
+    Tasks with the same canonical input and options share one execution:
+    the first becomes the leader, later ones follow and copy its outcome.
+    """
+    from app.orchestrator.scheduler import get_scheduler
+
+    try:
+        async with async_session() as session:
+            task_repo = TaskRepository(session)
+            task = await task_repo.get(task_id)
+
+        if not task:
+            return
+
+        if task.status in (TaskStatus.COMPLETED.value, TaskStatus.CANCELLED.value, TaskStatus.FAILED.value):
+            return
+
+        options = (task.metadata_ or {}).get("options") or {}
+        canonical = await get_scheduler().run_in_stage("parsing", get_default_registry().canonicalize, task.input)
+    except asyncio.CancelledError:
+        # No flight yet, so nothing else removes the uploaded media
+        if not get_scheduler().stopping:
+            await _cleanup_abandoned(task_id)
+        raise
+    single_flight = get_single_flight()
+    key = f"{canonical}|{json.dumps(options, sort_keys=True)}"
+
+    flight, is_leader = single_flight.join(key, task_id)
+    if not is_leader:
+        get_scheduler().set_cost(task_id, 0.0)  # The leader does the work
+        await _apply_snapshot(task_id, flight.snapshot)
+        try:
+            await flight.done.wait()
+        except asyncio.CancelledError:
+            if task_id in flight.members:
+                raise  # Shutdown, not a user cancel
+            StorageService().cleanup_task(task_id)
+            return
+        await _apply_outcome(task_id, flight.outcome)
+        return
+
+    outcome = None
+    try:
+        outcome = await _run(task, options, flight.token)
     except UnsupportedPlatformError as e:
-        await _update_progress(task_id, status=TaskStatus.FAILED.value, error=str(e.message))
+        outcome = _failed(str(e.message))
+    except TaskCancelledError:
+        if get_scheduler().stopping:
+            return  # Shutdown cancelled the token: resume from checkpoints later
+        outcome = _cancelled()
+    except asyncio.CancelledError:
+        if get_scheduler().stopping or not flight.token.cancelled:
+            raise  # Shutdown, not a user cancel
+        outcome = _cancelled()
     except Exception as e:
-        await _update_progress(task_id, status=TaskStatus.FAILED.value, error=str(e))
+        outcome = _failed(str(e))
         raise
+    finally:
+        single_flight.finish(flight, outcome)
+        if task_id in flight.members:
+            await _apply_outcome(task_id, outcome)
+        # Also a leader cancelled or deleted while followers kept the work going
+        if outcome is not None and (outcome["status"] == TaskStatus.CANCELLED.value or task_id not in flight.members):
+            StorageService().cleanup_task(task_id)
+
+
+async def _cleanup_abandoned(task_id: str) -> None:
+    """Remove the files of a task cancelled or deleted before it joined a flight."""
+    async with async_session() as session:
+        task = await TaskRepository(session).get(task_id)
+    if task is None or task.status == TaskStatus.CANCELLED.value:
+        StorageService().cleanup_task(task_id)
+
+
+def cancel_execution(task_id: str) -> None:
+    """Stop work for a task whose row was just marked cancelled.
+
+    A cancelled follower simply detaches. The shared execution is only
+    stopped once every task attached to it is cancelled: the token kills
+    child processes and the leader's job is cancelled so queued or running
+    stages unwind promptly.
+    """
+    from app.orchestrator.scheduler import get_scheduler
+
+    scheduler = get_scheduler()
+    single_flight = get_single_flight()
+    flight = single_flight.get(task_id)
+    if flight is None:
+        # Not yet attached to a flight (or not running in this process)
+        scheduler.cancel(task_id)
+        return
+    abandoned = single_flight.leave(task_id)
+    if abandoned is not None:
+        abandoned.token.cancel()
+        scheduler.cancel(abandoned.leader_id)
+    elif task_id != flight.leader_id:
+        scheduler.cancel(task_id)
@@ -0,0 +1,110 @@
+"""Batched OCR for image tasks.
+
+Image tasks are cheap individually but numerous (screenshot dumps run to
+thousands), so their fixed costs dominate: an extracting slot, an OCR
+cache query and at least one engine call each. Tasks that reach OCR
+within a short window share all of these.
+"""
+import asyncio
+import logging
+from functools import partial
+from typing import Optional
+
+from app.config import get_settings
+from app.extractors.models import TextSegment
+from app.extractors.pipeline import get_pipeline
+from app.services.ocr_cache import get_ocr_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ImageBatcher:
+    """Collect image OCR requests and run them as one extraction call.
+
+    A batch is flushed when it holds ``batch_size`` images or ``window``
+    seconds after its first one arrived. It runs in one extracting slot,
+    in the lane of the task that opened it. Methods run on the event loop.
+    """
+
+    def __init__(self, batch_size: int, window: float):
+        self.batch_size = max(1, batch_size)
+        self.window = window
+        self._pending: list[tuple[bytes, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.images = 0
+
+    async def recognize(self, data: bytes) -> tuple[list[TextSegment], dict]:
+        """OCR one encoded image; returns its segments and the batch's stats.
+
+        Raises ValueError for bytes that are not an image and
+        BackendUnavailableError when the OCR engine is missing.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((data, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: list[tuple[bytes, asyncio.Future]]) -> None:
+        from app.orchestrator.scheduler import get_scheduler
+
+        batch = [(data, future) for data, future in batch if not future.done()]  # Drop cancelled tasks
+        if not batch:
+            return
+        cache = get_ocr_cache()
+        stats: dict = {}
+        try:
+            results = await get_scheduler().run_in_stage("extracting", partial(
+                get_pipeline().ocr_extractor.extract_images,
+                [data for data, _ in batch],
+                cache.bind(asyncio.get_running_loop()) if cache else None,
+                stats,
+            ))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.images += len(batch)
+        logger.info("Image OCR batch: %s", stats)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result((result, stats))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "avgBatchSize": round(self.images / self.batches, 1) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+_batcher: Optional[ImageBatcher] = None
+
+
+def get_image_batcher() -> ImageBatcher:
+    """Get the process-wide image OCR batcher."""
+    global _batcher
+    if _batcher is None:
+        settings = get_settings()
+        _batcher = ImageBatcher(settings.ocr_image_batch, settings.ocr_image_batch_window)
+    return _batcher
@@ -0,0 +1,120 @@
+"""In-memory task progress state and push subscriptions."""
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class ProgressHub:
+    """Latest progress per running task, fanned out to stream subscribers.
+
+    Must be used from the event loop thread; worker threads hand updates
+    over with ``loop.call_soon_threadsafe``.
+    """
+
+    def __init__(self):
+        self._state: dict[str, dict] = {}
+        self._task_subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._all_subscribers: set[asyncio.Queue] = set()
+
+    def publish(
+        self,
+        task_id: str,
+        status: Optional[str] = None,
+        progress: Optional[int] = None,
+        stage_progress: Optional[dict] = None,
+        error: Optional[str] = None,
+        partial_segments: Optional[int] = None,
+    ) -> None:
+        """Merge an update into the task's state and push it to subscribers.
+
+        ``stage_progress`` entries are merged per stage, so extractors can
+        report one stage at a time. ``partial_segments`` counts the segments
+        of the stored partial result, so clients know when to refetch it.
+        """
+        state = self._state.setdefault(
+            task_id,
+            {
+                "taskId": task_id,
+                "status": None,
+                "progress": 0,
+                "stageProgress": {},
+                "error": None,
+                "partialSegments": 0,
+            },
+        )
+        if status is not None:
+            state["status"] = status
+        if progress is not None:
+            state["progress"] = progress
+        if stage_progress is not None:
+            state["stageProgress"] = {**state["stageProgress"], **stage_progress}
+        if error is not None:
+            state["error"] = error
+        if partial_segments is not None:
+            state["partialSegments"] = partial_segments
+        event = dict(state, stageProgress=dict(state["stageProgress"]))
+
+        for queue in (*self._task_subscribers.get(task_id, ()), *self._all_subscribers):
+            _offer(queue, event)
+        if state["status"] in TERMINAL_STATUSES:
+            del self._state[task_id]
+
+    def snapshot(self, task_id: str) -> Optional[dict]:
+        """Latest in-memory state of a running task, or None."""
+        state = self._state.get(task_id)
+        return dict(state, stageProgress=dict(state["stageProgress"])) if state else None
+
+    def running(self) -> list[dict]:
+        return [self.snapshot(task_id) for task_id in list(self._state)]
+
+    @contextmanager
+    def subscribe(self, task_id: Optional[str] = None):
+        """Yield a queue of events for one task, or for all tasks if task_id is None."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if task_id is None:
+            self._all_subscribers.add(queue)
+        else:
+            self._task_subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            if task_id is None:
+                self._all_subscribers.discard(queue)
+            else:
+                subscribers = self._task_subscribers.get(task_id)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del self._task_subscribers[task_id]
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._state),
+            "subscribers": len(self._all_subscribers) + sum(len(s) for s in self._task_subscribers.values()),
+        }
+
+
+def _offer(queue: asyncio.Queue, event: dict) -> None:
+    """Put without blocking; a slow subscriber loses its oldest events."""
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(event)
+
+
+_hub: Optional[ProgressHub] = None
+
+
+def get_progress_hub() -> ProgressHub:
+    """Get the process-wide progress hub."""
+    global _hub
+    if _hub is None:
+        _hub = ProgressHub()
+    return _hub
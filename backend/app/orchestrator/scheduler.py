@@ -0,0 +1,311 @@
+"""In-process task scheduler with per-stage worker pools."""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from app.config import get_settings
+from app.orchestrator.cost import estimate_cost
+from app.orchestrator.singleflight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# Lane of individually submitted tasks; each batch gets its own lane
+DEFAULT_LANE = "interactive"
+
+# Lane and estimated cost of the task whose job is running in the current asyncio context
+_current_lane: ContextVar[str] = ContextVar("task_lane", default=DEFAULT_LANE)
+_current_cost: ContextVar[float] = ContextVar("task_cost", default=0.0)
+
+# Longest Retry-After suggested to rejected submissions, in seconds
+MAX_RETRY_AFTER = 3600
+
+
+def batch_lane(batch_id: str) -> str:
+    return f"batch:{batch_id}"
+
+
+class StageGate:
+    """Concurrency gate and dedicated worker pool for one execution stage.
+
+    Waiters are grouped into lanes that are served round-robin, so a
+    batch of hundreds of tasks takes turns with interactive tasks instead
+    of queueing ahead of them. Within a lane the cheapest task goes first
+    (shortest job first, to minimize mean latency), with aging: each
+    second of waiting discounts ``aging_rate`` seconds of estimated cost,
+    so long jobs are never starved. Equal-cost tasks stay FIFO. Blocking work
+    submitted through ``run`` executes on the stage's own thread pool, so
+    a slow stage can never exhaust the threads another stage depends on.
+    """
+
+    def __init__(self, name: str, concurrency: int, aging_rate: float = 1.0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.aging_rate = aging_rate
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix=f"tg-{name}",
+        )
+        self._active = 0
+        # Lanes with waiters, in round-robin order (next lane to serve first).
+        # Each lane is a heap of (cost + aging_rate * enqueue time, seq, future).
+        self._lanes: OrderedDict[str, list[tuple[float, int, asyncio.Future]]] = OrderedDict()
+        self._seq = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for queue in self._lanes.values() for _, _, fut in queue if not fut.done())
+
+    async def acquire(self, lane: str = DEFAULT_LANE, cost: float = 0.0) -> None:
+        """Wait for a free slot in the given lane."""
+        if self._active < self.concurrency and not self.waiting:
+            self._active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        # Waiting discounts cost, so ordering by cost + aging * enqueue time
+        # is the same as ordering by the aged cost at any later moment
+        key = cost + self.aging_rate * time.monotonic()
+        heapq.heappush(self._lanes.setdefault(lane, []), (key, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over just before cancellation: pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Release a slot, handing it to the next lane's cheapest waiter by aged cost, if any."""
+        while self._lanes:
+            lane, queue = next(iter(self._lanes.items()))
+            _, _, fut = heapq.heappop(queue)
+            if queue:
+                self._lanes.move_to_end(lane)
+            else:
+                del self._lanes[lane]
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active = max(0, self._active - 1)
+
+    @asynccontextmanager
+    async def slot(self, lane: str = DEFAULT_LANE, cost: float = 0.0):
+        await self.acquire(lane, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn: Callable, *args, lane: str = DEFAULT_LANE, cost: float = 0.0):
+        """Run blocking ``fn(*args)`` on this stage's pool while holding a slot.
+
+        If the caller is cancelled, the slot stays held until the worker
+        thread actually returns, so cancelled work never oversubscribes
+        the pool. Cancellable work should poll a CancellationToken.
+        """
+        async with self.slot(lane, cost):
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self.executor, fn, *args)
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                await asyncio.wait({fut})
+                if not fut.cancelled():
+                    fut.exception()  # Mark retrieved; the caller is unwinding anyway
+                raise
+
+    def snapshot(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": self.waiting,
+            "lanes": len(self._lanes),
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TaskScheduler:
+    """Run submitted tasks with a bounded number of slots per stage.
+
+    Stages:
+        parsing     - platform metadata lookups (network bound)
+        downloading - media downloads (network bound)
+        extracting  - subtitle / ASR / merge (CPU bound)
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str], "asyncio.Future"],
+        stage_concurrency: Optional[dict[str, int]] = None,
+    ):
+        settings = get_settings()
+        limits = {
+            "parsing": settings.parse_concurrency,
+            "downloading": settings.download_concurrency,
+            "extracting": settings.extract_concurrency,
+            # Streaming ASR waits on the download between chunks, so it
+            # gets its own slots instead of idling an extract slot
+            "streaming": settings.stream_concurrency,
+        }
+        limits.update(stage_concurrency or {})
+        self._runner = runner
+        self.stages = {name: StageGate(name, n, settings.queue_aging_rate) for name, n in limits.items()}
+        self._jobs: dict[str, asyncio.Task] = {}
+        self._costs: dict[str, float] = {}
+        self._submitted = 0
+        self._finished = 0
+        self._stopping = False
+        self.backlog_budget = settings.backlog_budget
+        # Assumed for tasks not parsed yet
+        self.default_cost = estimate_cost(None, asr_model=settings.asr_model, asr_backend=settings.asr_backend)
+
+    def submit(self, task_id: str, lane: str = DEFAULT_LANE) -> None:
+        """Queue a task for execution in a lane. Duplicate submissions are ignored."""
+        if task_id in self._jobs:
+            return
+        job = asyncio.get_running_loop().create_task(self._run(task_id, lane))
+        self._jobs[task_id] = job
+        self._submitted += 1
+
+    async def _run(self, task_id: str, lane: str) -> None:
+        _current_lane.set(lane)  # Job runs in its own context copy
+        try:
+            await self._runner(task_id)
+        except Exception:
+            # Runner records the failure on the task itself
+            logger.exception("Task %s failed", task_id)
+        finally:
+            self._jobs.pop(task_id, None)
+            self._costs.pop(task_id, None)
+            self._finished += 1
+
+    def set_cost(self, task_id: str, cost: float) -> None:
+        """Record a task's estimated cost once known. Call from the task's own job.
+
+        The cost orders the task's later stage waits and counts toward the
+        backlog used for admission control.
+        """
+        self._costs[task_id] = cost
+        _current_cost.set(cost)
+
+    def backlog(self) -> float:
+        """Estimated seconds of work for all queued and running tasks."""
+        return sum(self._costs.get(task_id, self.default_cost) for task_id in self._jobs)
+
+    def admit(self, count: int = 1, backlog: Optional[float] = None, workers: int = 1) -> Optional[int]:
+        """Check whether count new tasks fit in the backlog budget.
+
+        Returns None if they may be submitted, else the suggested
+        Retry-After in seconds. An idle scheduler always admits, so a
+        single oversized batch is not rejected forever. ``backlog`` and
+        ``workers`` describe tasks running in worker processes instead of
+        this scheduler's own jobs.
+        """
+        if backlog is None:
+            backlog = self.backlog() if self._jobs else 0.0
+        if self.backlog_budget <= 0 or backlog <= 0:
+            return None
+        excess = backlog + count * self.default_cost - self.backlog_budget
+        if excess <= 0:
+            return None
+        # Work drains at roughly one cost-second per second per extract slot
+        throughput = self.stages["extracting"].concurrency * max(1, workers)
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(excess / throughput)))
+
+    def is_running(self, task_id: str) -> bool:
+        """Whether a job for task_id is queued or running here."""
+        return task_id in self._jobs
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel the job running task_id. Returns False if it is not running here."""
+        job = self._jobs.get(task_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    @property
+    def stopping(self) -> bool:
+        """Whether shutdown has begun; cancellations from then on are not user cancels."""
+        return self._stopping
+
+    def stage(self, name: str) -> StageGate:
+        return self.stages[name]
+
+    async def run_in_stage(self, name: str, fn: Callable, *args):
+        """Run blocking work within the given stage's limits, in the calling task's lane."""
+        return await self.stages[name].run(fn, *args, lane=_current_lane.get(), cost=_current_cost.get())
+
+    def stats(self) -> dict:
+        """Queue depth and per-stage occupancy."""
+        stages = {name: gate.snapshot() for name, gate in self.stages.items()}
+        return {
+            "inFlight": len(self._jobs),
+            "queued": sum(s["waiting"] for s in stages.values()),
+            "submitted": self._submitted,
+            "finished": self._finished,
+            "backlogSeconds": round(self.backlog()),
+            "backlogBudget": self.backlog_budget,
+            "stages": stages,
+        }
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs and stop worker pools.
+
+        Stage threads cannot be interrupted, so the executions' tokens are
+        cancelled too: running stages stop at their next check instead of
+        finishing work that would be thrown away. Checkpoints are kept.
+        """
+        self._stopping = True
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        get_single_flight().cancel_all()
+        if jobs:
+            await asyncio.gather(*jobs, return_exceptions=True)
+        for gate in self.stages.values():
+            gate.shutdown()
+
+
+_scheduler: Optional[TaskScheduler] = None
+
+
+def get_scheduler() -> TaskScheduler:
+    """Get the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        from app.orchestrator.executor import execute_task
+        _scheduler = TaskScheduler(execute_task)
+    return _scheduler
+
+
+def dispatch_task(task_id: str, lane: str = DEFAULT_LANE) -> None:
+    """Start a newly created task.
+
+    In ``inline`` mode it runs in this process; in ``worker`` mode it is
+    left pending for a worker process to claim.
+    """
+    if get_settings().task_execution == "worker":
+        return
+    get_scheduler().submit(task_id, lane)
+
+
+async def shutdown_scheduler() -> None:
+    """Stop the process-wide scheduler if it was started."""
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.shutdown()
+        _scheduler = None
@@ -0,0 +1,101 @@
+"""Coalesce identical in-flight tasks into a single execution."""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.cancellation import CancellationToken
+
+
+@dataclass
+class Flight:
+    """One execution shared by every task with the same key.
+
+    The leader runs the work; followers wait on ``done`` and copy the
+    outcome into their own task rows.
+    """
+
+    key: str
+    leader_id: str
+    members: list[str]
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    # Cancelled once every member task has been cancelled
+    token: CancellationToken = field(default_factory=CancellationToken)
+    # Latest progress/metadata fields, replayed onto late joiners
+    snapshot: dict = field(default_factory=dict)
+    # Final outcome: {"status", "error", "result"}
+    outcome: Optional[dict] = None
+
+
+class SingleFlight:
+    """Registry of in-flight executions keyed by canonical input."""
+
+    def __init__(self):
+        self._flights: dict[str, Flight] = {}
+        self._by_task: dict[str, Flight] = {}
+        self._coalesced_total = 0
+
+    def join(self, key: str, task_id: str) -> tuple[Flight, bool]:
+        """Attach to the running flight for key, or start one. Returns (flight, is_leader)."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(key=key, leader_id=task_id, members=[task_id])
+            self._flights[key] = flight
+            self._by_task[task_id] = flight
+            return flight, True
+        if task_id not in flight.members:
+            flight.members.append(task_id)
+            self._coalesced_total += 1
+        self._by_task[task_id] = flight
+        return flight, False
+
+    def members_of(self, task_id: str) -> list[str]:
+        """Task rows that should receive updates made for task_id's flight."""
+        flight = self._by_task.get(task_id)
+        if flight is None or flight.leader_id != task_id:
+            return [task_id]
+        return list(flight.members)
+
+    def get(self, task_id: str) -> Optional[Flight]:
+        return self._by_task.get(task_id)
+
+    def leave(self, task_id: str) -> Optional[Flight]:
+        """Detach a cancelled task. Returns its flight if no members remain."""
+        flight = self._by_task.pop(task_id, None)
+        if flight is None:
+            return None
+        if task_id in flight.members:
+            flight.members.remove(task_id)
+        return flight if not flight.members else None
+
+    def finish(self, flight: Flight, outcome: dict) -> None:
+        """Record the outcome, stop accepting joins and wake followers."""
+        flight.outcome = outcome
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        for task_id in flight.members:
+            if self._by_task.get(task_id) is flight:
+                del self._by_task[task_id]
+        flight.done.set()
+
+    def cancel_all(self) -> None:
+        """Cancel every running execution's token, so its stages stop at the next check."""
+        for flight in self._flights.values():
+            flight.token.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "flights": len(self._flights),
+            "followers": sum(len(f.members) - 1 for f in self._flights.values()),
+            "coalescedTotal": self._coalesced_total,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight registry."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,38 @@
+"""Per-task ASR model choice.
+
+With several model sizes configured (``ASR_TIERS``, fastest first), each
+task gets the most accurate one the current load allows: long media and
+a deep extraction backlog step down to faster models, and a request may
+pin the choice with ``options.asr_quality``.
+"""
+from typing import Optional
+
+# options.asr_quality values; anything else is treated as "balanced"
+QUALITY_FAST = "fast"
+QUALITY_BALANCED = "balanced"
+QUALITY_ACCURATE = "accurate"
+
+
+def choose_asr_model(
+    tiers: list[str],
+    duration: Optional[float],
+    backlog_per_slot: float,
+    quality: Optional[str] = None,
+    backlog_step: float = 600.0,
+    long_media: float = 1800.0,
+) -> str:
+    """Pick a model size from ``tiers`` (ordered fastest first).
+
+    "fast" and "accurate" take the first and last tier. Otherwise start
+    from the last tier and step down one tier per ``backlog_step``
+    seconds of queued work per extraction slot, and one more for media
+    longer than ``long_media`` seconds.
+    """
+    if quality == QUALITY_FAST:
+        return tiers[0]
+    if quality == QUALITY_ACCURATE:
+        return tiers[-1]
+    steps = int(backlog_per_slot // backlog_step) if backlog_step > 0 else 0
+    if duration is not None and long_media > 0 and duration > long_media:
+        steps += 1
+    return tiers[max(0, len(tiers) - 1 - steps)]
@@ -17,6 +17,10 @@ class IPlatformParser(ABC):
         """Parse input and return media resources."""
         pass
 
+    def canonicalize(self, input_str: str) -> str:
+        """Stable identity of the input; equal values mean the same media."""
+        return input_str.strip()
+
     @property
     @abstractmethod
     def platform(self) -> PlatformType:
@@ -1,6 +1,8 @@
 """Bilibili video parser adapter using yt-dlp."""
 import re
+import urllib.request
 from typing import Optional
+from urllib.parse import parse_qs, urlparse
 
 from app.parsers.base import IPlatformParser
 from app.parsers.models import MediaResource, PlatformParseResult, PlatformType
@@ -13,6 +15,10 @@ BILIBILI_PATTERNS = [
     r"bili33\.com",
 ]
 
+BV_PATTERN = re.compile(r"(BV[0-9A-Za-z]{10})")
+AV_PATTERN = re.compile(r"(?:^|[/=])av(\d+)", re.IGNORECASE)
+SHORT_LINK_PATTERN = re.compile(r"b23\.tv|bili2233\.cn", re.IGNORECASE)
+
 
 def is_bilibili_url(input_str: str) -> bool:
     """Check if input is a Bilibili URL."""
@@ -22,6 +28,29 @@ def is_bilibili_url(input_str: str) -> bool:
     return any(re.search(p, s, re.IGNORECASE) for p in BILIBILI_PATTERNS)
 
 
+def resolve_short_link(url: str, timeout: float = 5.0) -> str:
+    """Follow b23.tv redirects to the full video URL."""
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as resp:
+        return resp.geturl()
+
+
+def canonical_video_id(url: str) -> Optional[str]:
+    """Extract "BVxxxx" / "av123" (plus part number) from a Bilibili URL."""
+    match = BV_PATTERN.search(url)
+    if match:
+        video_id = match.group(1)
+    else:
+        match = AV_PATTERN.search(url)
+        if not match:
+            return None
+        video_id = f"av{match.group(1)}"
+    page = parse_qs(urlparse(url).query).get("p", ["1"])[0]
+    return video_id if page in ("", "1") else f"{video_id}?p={page}"
+
+
 class BilibiliAdapter(IPlatformParser):
     """Parse Bilibili video URLs. Uses yt-dlp for extraction."""
 
@@ -32,6 +61,16 @@ class BilibiliAdapter(IPlatformParser):
     def can_handle(self, input_str: str) -> bool:
         return is_bilibili_url(input_str)
 
+    def canonicalize(self, input_str: str) -> str:
+        url = input_str.strip()
+        if SHORT_LINK_PATTERN.search(url):
+            try:
+                url = resolve_short_link(url)
+            except Exception:
+                return url
+        video_id = canonical_video_id(url)
+        return f"bilibili:{video_id}" if video_id else url
+
     def parse(self, input_str: str) -> PlatformParseResult:
         url = input_str.strip()
         try:
@@ -37,6 +37,9 @@ class LocalAdapter(IPlatformParser):
     def can_handle(self, input_str: str) -> bool:
         return is_local_file(input_str)
 
+    def canonicalize(self, input_str: str) -> str:
+        return f"local:{resolve_path(input_str)}"
+
     def parse(self, input_str: str) -> PlatformParseResult:
         path = resolve_path(input_str)
         if not path.exists():
@@ -30,6 +30,13 @@ class PlatformParserRegistry:
                     return parser.parse(input_str)
             raise UnsupportedPlatformError(f"不支持的链接: {input_str[:80]}...")
 
+    def canonicalize(self, input_str: str) -> str:
+        """Canonical identity of the input, used to coalesce identical tasks."""
+        for _, parser in self._parsers:
+            if parser.can_handle(input_str):
+                return parser.canonicalize(input_str)
+        return input_str.strip()
+
 
 def get_default_registry() -> PlatformParserRegistry:
     """Get registry with default adapters."""
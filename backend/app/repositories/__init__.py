@@ -1,4 +1,6 @@
 """Repositories."""
 from app.repositories.task_repository import TaskRepository, TaskResultRepository
+from app.repositories.cache_repository import ExtractCacheRepository, OCRCacheRepository
+from app.repositories.batch_repository import BatchRepository
 
-__all__ = ["TaskRepository", "TaskResultRepository"]
+__all__ = ["TaskRepository", "TaskResultRepository", "ExtractCacheRepository", "OCRCacheRepository", "BatchRepository"]
@@ -0,0 +1,76 @@
+"""Task batch repository."""
+from typing import Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.batch import TaskBatch, TaskBatchItem
+from app.models.task import Task
+
+
+class BatchRepository:
+    """TaskBatch CRUD and aggregate queries."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(self, batch: TaskBatch, tasks: list[Task]) -> TaskBatch:
+        """Create a batch together with its tasks, in one flush."""
+        batch.total = len(tasks)
+        self.session.add(batch)
+        self.session.add_all(tasks)
+        await self.session.flush()
+        self.session.add_all(
+            TaskBatchItem(task_id=t.id, batch_id=batch.id, position=i) for i, t in enumerate(tasks)
+        )
+        await self.session.flush()
+        return batch
+
+    async def get(self, batch_id: str) -> Optional[TaskBatch]:
+        """Get batch by ID."""
+        result = await self.session.execute(select(TaskBatch).where(TaskBatch.id == batch_id))
+        return result.scalar_one_or_none()
+
+    async def list_tasks(self, batch_id: str, limit: int = 100, offset: int = 0) -> list[Task]:
+        """Tasks of a batch in submission order."""
+        result = await self.session.execute(
+            select(Task)
+            .join(TaskBatchItem, TaskBatchItem.task_id == Task.id)
+            .where(TaskBatchItem.batch_id == batch_id)
+            .order_by(TaskBatchItem.position)
+            .offset(offset)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def status_summary(self, batch_id: str) -> dict[str, tuple[int, int]]:
+        """Per status: (task count, sum of task progress)."""
+        result = await self.session.execute(
+            select(Task.status, func.count(), func.coalesce(func.sum(Task.progress), 0))
+            .join(TaskBatchItem, TaskBatchItem.task_id == Task.id)
+            .where(TaskBatchItem.batch_id == batch_id)
+            .group_by(Task.status)
+        )
+        return {status: (int(count), int(progress)) for status, count, progress in result.all()}
+
+    async def batch_ids_for(self, task_ids: list[str]) -> dict[str, str]:
+        """Map task id -> batch id for tasks that belong to a batch."""
+        if not task_ids:
+            return {}
+        result = await self.session.execute(
+            select(TaskBatchItem.task_id, TaskBatchItem.batch_id).where(TaskBatchItem.task_id.in_(task_ids))
+        )
+        return dict(result.all())
+
+    async def remove_task(self, task_id: str) -> None:
+        """Drop a task from its batch, if any, keeping the batch total consistent."""
+        batch_id = (await self.session.execute(
+            select(TaskBatchItem.batch_id).where(TaskBatchItem.task_id == task_id)
+        )).scalar_one_or_none()
+        if batch_id is None:
+            return
+        await self.session.execute(delete(TaskBatchItem).where(TaskBatchItem.task_id == task_id))
+        await self.session.execute(
+            update(TaskBatch).where(TaskBatch.id == batch_id).values(total=TaskBatch.total - 1)
+        )
+        await self.session.flush()
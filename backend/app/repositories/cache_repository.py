@@ -0,0 +1,139 @@
+"""Extraction result and OCR cache repositories."""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import upsert
+from app.models.cache import ExtractCacheEntry, OCRCacheEntry
+
+
+class ExtractCacheRepository:
+    """ExtractCacheEntry CRUD operations."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, cache_key: str) -> Optional[ExtractCacheEntry]:
+        """Get cache entry by key."""
+        result = await self.session.execute(
+            select(ExtractCacheEntry).where(ExtractCacheEntry.cache_key == cache_key)
+        )
+        return result.scalar_one_or_none()
+
+    async def save(
+        self,
+        cache_key: str,
+        media_hash: str,
+        full_text: str,
+        segments: list,
+        stats: Optional[dict] = None,
+        settings: Optional[dict] = None,
+    ) -> None:
+        """Insert or replace a cache entry.
+
+        An upsert, so tasks finishing the same content at the same time
+        (duplicate images in one OCR batch) do not collide on the key.
+        """
+        stmt = upsert(ExtractCacheEntry).values(
+            cache_key=cache_key,
+            media_hash=media_hash,
+            full_text=full_text,
+            segments={"items": segments},
+            stats=stats,
+            settings=settings,
+            hits=0,
+            created_at=datetime.utcnow(),
+        )
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[ExtractCacheEntry.cache_key],
+            set_={
+                "full_text": stmt.excluded.full_text,
+                "segments": stmt.excluded.segments,
+                "stats": stmt.excluded.stats,
+                "settings": stmt.excluded.settings,
+            },
+        ))
+        await self.session.flush()
+
+    async def record_hit(self, cache_key: str) -> None:
+        """Increment the persisted hit counter."""
+        await self.session.execute(
+            update(ExtractCacheEntry)
+            .where(ExtractCacheEntry.cache_key == cache_key)
+            .values(hits=ExtractCacheEntry.hits + 1, last_hit_at=datetime.utcnow())
+        )
+        await self.session.flush()
+
+    async def totals(self) -> tuple[int, int]:
+        """Return (entry count, total persisted hits)."""
+        result = await self.session.execute(
+            select(func.count(), func.coalesce(func.sum(ExtractCacheEntry.hits), 0))
+        )
+        count, hits = result.one()
+        return int(count), int(hits)
+
+
+class OCRCacheRepository:
+    """OCRCacheEntry lookups, upserts and LRU eviction."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_many(self, cache_keys: list[str]) -> dict[str, dict]:
+        """Entries for the keys that are cached."""
+        if not cache_keys:
+            return {}
+        result = await self.session.execute(
+            select(OCRCacheEntry.cache_key, OCRCacheEntry.lines).where(OCRCacheEntry.cache_key.in_(cache_keys))
+        )
+        return dict(result.all())
+
+    async def record_hits(self, uses: dict[str, int]) -> None:
+        """Add each entry's number of uses to its hit counter and mark it used."""
+        now = datetime.utcnow()
+        by_count: dict[int, list[str]] = {}
+        for key, count in uses.items():
+            by_count.setdefault(count, []).append(key)
+        for count, keys in by_count.items():
+            await self.session.execute(
+                update(OCRCacheEntry)
+                .where(OCRCacheEntry.cache_key.in_(keys))
+                .values(hits=OCRCacheEntry.hits + count, last_used_at=now)
+            )
+        await self.session.flush()
+
+    async def save_many(self, entries: dict[str, dict]) -> None:
+        """Insert or replace entries."""
+        if not entries:
+            return
+        now = datetime.utcnow()
+        stmt = upsert(OCRCacheEntry).values([
+            {"cache_key": key, "lines": entry, "hits": 0, "created_at": now, "last_used_at": now}
+            for key, entry in entries.items()
+        ])
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[OCRCacheEntry.cache_key],
+            set_={"lines": stmt.excluded.lines, "last_used_at": stmt.excluded.last_used_at},
+        ))
+        await self.session.flush()
+
+    async def evict(self, capacity: int) -> int:
+        """Delete the least recently used entries beyond ``capacity``. Returns the count."""
+        keep = (
+            select(OCRCacheEntry.cache_key)
+            .order_by(OCRCacheEntry.last_used_at.desc())
+            .limit(capacity)
+        )
+        result = await self.session.execute(delete(OCRCacheEntry).where(OCRCacheEntry.cache_key.not_in(keep)))
+        await self.session.flush()
+        return result.rowcount or 0
+
+    async def totals(self) -> tuple[int, int]:
+        """Return (entry count, total persisted hits)."""
+        result = await self.session.execute(
+            select(func.count(), func.coalesce(func.sum(OCRCacheEntry.hits), 0)).select_from(OCRCacheEntry)
+        )
+        count, hits = result.one()
+        return int(count), int(hits)
@@ -1,11 +1,18 @@
 """Task and TaskResult repository."""
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import select, update, delete, func, desc
+from sqlalchemy import select, update, delete, func, desc, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.task import Task, TaskResult, TaskStatus
+from app.database import upsert
+from app.models.batch import TaskBatchItem
+from app.models.lease import TaskLease
+from app.models.task import Task, TaskPartialResult, TaskResult, TaskStatus
+
+# Claimable tasks per lane (interactive, or one batch) ranked by cost on each claim
+CLAIM_SCAN = 64
 
 
 class TaskRepository:
@@ -39,8 +46,13 @@ class TaskRepository:
         progress: Optional[int] = None,
         stage_progress: Optional[dict] = None,
         error: Optional[str] = None,
-    ) -> None:
-        """Update task status and related fields."""
+        unless_status: Optional[str] = None,
+    ) -> bool:
+        """Update task status and related fields.
+
+        With ``unless_status``, rows currently in that status are left
+        untouched. Returns whether a row was updated.
+        """
         values = {"status": status, "updated_at": datetime.utcnow()}
         if progress is not None:
             values["progress"] = progress
@@ -48,8 +60,186 @@ class TaskRepository:
             values["stage_progress"] = stage_progress
         if error is not None:
             values["error"] = error
-        await self.session.execute(update(Task).where(Task.id == task_id).values(**values))
+        query = update(Task).where(Task.id == task_id)
+        if unless_status is not None:
+            query = query.where(Task.status != unless_status)
+        result = await self.session.execute(query.values(**values))
+        await self.session.flush()
+        return result.rowcount > 0
+
+    async def update_stage_progress(self, task_id: str, stage_progress: dict, while_status: str) -> bool:
+        """Replace stage progress, only while the task is still in while_status."""
+        result = await self.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status == while_status)
+            .values(stage_progress=stage_progress, updated_at=datetime.utcnow())
+        )
+        await self.session.flush()
+        return result.rowcount > 0
+
+    async def list_by_status(self, statuses: tuple[str, ...]) -> list[Task]:
+        """All tasks in any of the given statuses, oldest first."""
+        result = await self.session.execute(
+            select(Task).where(Task.status.in_(statuses)).order_by(Task.created_at)
+        )
+        return list(result.scalars().all())
+
+    async def count_by_status(self, statuses: tuple[str, ...]) -> int:
+        """Number of tasks in any of the given statuses."""
+        result = await self.session.execute(select(func.count()).select_from(Task).where(Task.status.in_(statuses)))
+        return result.scalar() or 0
+
+    async def claim(
+        self,
+        worker_id: str,
+        statuses: tuple[str, ...],
+        limit: int,
+        lease_seconds: float,
+        default_cost: float = 0.0,
+        aging_rate: float = 0.0,
+    ) -> list[Task]:
+        """Lease up to limit unclaimed tasks in the given statuses, in scheduling order.
+
+        As in the in-process scheduler, individually submitted tasks take
+        turns with batches, and batches with each other, those with the
+        fewest tasks running first. Within a lane the cheapest task goes
+        first: its ``estimatedCost`` metadata (``default_cost`` until it
+        has been parsed), less ``aging_rate`` per second since it was
+        created. A task is claimable if it has no lease or its lease
+        expired (its worker died). Each lease is taken with one conditional
+        upsert, so concurrent workers never both win the same task.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=lease_seconds)
+        ranked = (
+            select(
+                Task.id,
+                Task.created_at,
+                Task.metadata_.label("task_metadata"),
+                TaskBatchItem.batch_id,
+                func.row_number().over(partition_by=TaskBatchItem.batch_id, order_by=Task.created_at).label("rank"),
+            )
+            .outerjoin(TaskLease, TaskLease.task_id == Task.id)
+            .outerjoin(TaskBatchItem, TaskBatchItem.task_id == Task.id)
+            .where(Task.status.in_(statuses), or_(TaskLease.task_id.is_(None), TaskLease.expires_at < now))
+            .subquery()
+        )
+        rows = (await self.session.execute(select(ranked).where(ranked.c.rank <= max(limit, CLAIM_SCAN)))).all()
+        running = dict((await self.session.execute(
+            select(TaskBatchItem.batch_id, func.count())
+            .join(TaskLease, TaskLease.task_id == TaskBatchItem.task_id)
+            .where(TaskLease.expires_at >= now)
+            .group_by(TaskBatchItem.batch_id)
+        )).all())
+
+        lanes: dict[Optional[str], list[tuple[float, datetime, str]]] = {}
+        for row in rows:
+            cost = (row.task_metadata or {}).get("estimatedCost", default_cost)
+            key = cost - aging_rate * (now - row.created_at).total_seconds()
+            lanes.setdefault(row.batch_id, []).append((key, row.created_at, row.id))
+        for queue in lanes.values():
+            queue.sort()
+        interactive = deque(lanes.pop(None, []))
+        batches = deque(
+            deque(lanes[batch_id])
+            for batch_id in sorted(lanes, key=lambda b: (running.get(b, 0), min(c for _, c, _ in lanes[b])))
+        )
+        # Interactive tasks alternate with the batches, which take turns
+        order = []
+        interactive_turn = True
+        while interactive or batches:
+            if interactive and (interactive_turn or not batches):
+                order.append(interactive.popleft()[2])
+            else:
+                queue = batches.popleft()
+                order.append(queue.popleft()[2])
+                if queue:
+                    batches.append(queue)
+            interactive_turn = not interactive_turn
+
+        claimed = []
+        for task_id in order:
+            if len(claimed) >= limit:
+                break
+            stmt = upsert(TaskLease).values(
+                task_id=task_id, worker_id=worker_id, expires_at=expires_at, heartbeat_at=now, attempts=1
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TaskLease.task_id],
+                set_={
+                    "worker_id": worker_id,
+                    "expires_at": expires_at,
+                    "heartbeat_at": now,
+                    "attempts": TaskLease.attempts + 1,
+                },
+                where=TaskLease.expires_at < now,
+            )
+            result = await self.session.execute(stmt)
+            if result.rowcount:
+                claimed.append(task_id)
+        await self.session.flush()
+        if not claimed:
+            return []
+        result = await self.session.execute(select(Task).where(Task.id.in_(claimed)))
+        tasks = {t.id: t for t in result.scalars().all()}
+        return [tasks[task_id] for task_id in claimed if task_id in tasks]
+
+    async def renew_leases(self, worker_id: str, task_ids: list[str], lease_seconds: float) -> set[str]:
+        """Extend this worker's leases. Returns the task ids it still holds."""
+        if not task_ids:
+            return set()
+        now = datetime.utcnow()
+        await self.session.execute(
+            update(TaskLease)
+            .where(TaskLease.worker_id == worker_id, TaskLease.task_id.in_(task_ids))
+            .values(expires_at=now + timedelta(seconds=lease_seconds), heartbeat_at=now)
+        )
+        result = await self.session.execute(
+            select(TaskLease.task_id).where(TaskLease.worker_id == worker_id, TaskLease.task_id.in_(task_ids))
+        )
         await self.session.flush()
+        return set(result.scalars().all())
+
+    async def release_leases(self, worker_id: str, task_ids: list[str]) -> None:
+        """Drop this worker's leases on the given tasks."""
+        if not task_ids:
+            return
+        await self.session.execute(
+            delete(TaskLease).where(TaskLease.worker_id == worker_id, TaskLease.task_id.in_(task_ids))
+        )
+        await self.session.flush()
+
+    async def lease_summary(self) -> dict[str, int]:
+        """Live (unexpired) lease count per worker."""
+        result = await self.session.execute(
+            select(TaskLease.worker_id, func.count())
+            .where(TaskLease.expires_at >= datetime.utcnow())
+            .group_by(TaskLease.worker_id)
+        )
+        return {worker_id: int(count) for worker_id, count in result.all()}
+
+    async def is_leased(self, task_id: str) -> bool:
+        """Whether a worker holds a live lease on the task."""
+        result = await self.session.execute(
+            select(TaskLease.task_id).where(TaskLease.task_id == task_id, TaskLease.expires_at >= datetime.utcnow())
+        )
+        return result.first() is not None
+
+    async def existing_ids(self, task_ids: list[str]) -> set[str]:
+        """Which of the given tasks have not been deleted."""
+        if not task_ids:
+            return set()
+        result = await self.session.execute(select(Task.id).where(Task.id.in_(task_ids)))
+        return set(result.scalars().all())
+
+    async def ids_with_status(self, task_ids: list[str], status: str) -> list[str]:
+        """Which of the given tasks are currently in status."""
+        if not task_ids:
+            return []
+        result = await self.session.execute(
+            select(Task.id).where(Task.id.in_(task_ids), Task.status == status)
+        )
+        return list(result.scalars().all())
 
     async def list(
         self,
@@ -76,7 +266,8 @@ class TaskRepository:
         return tasks, total
 
     async def delete(self, task_id: str) -> bool:
-        """Delete a task."""
+        """Delete a task and its lease; a worker holding it loses the lease and stops."""
+        await self.session.execute(delete(TaskLease).where(TaskLease.task_id == task_id))
         result = await self.session.execute(delete(Task).where(Task.id == task_id))
         await self.session.flush()
         return result.rowcount > 0
@@ -88,25 +279,53 @@ class TaskResultRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def save(self, task_id: str, full_text: str, segments: list, stats: Optional[dict] = None) -> TaskResult:
-        """Save extraction result."""
-        result = TaskResult(
+    async def save(self, task_id: str, full_text: str, segments: list, stats: Optional[dict] = None) -> None:
+        """Save extraction result, replacing an earlier one (a task run again after a lease takeover)."""
+        values = {
+            "full_text": full_text,
+            "segments": {"items": segments},
+            "stats": stats,
+            "created_at": datetime.utcnow(),
+        }
+        stmt = upsert(TaskResult).values(task_id=task_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[TaskResult.task_id], set_=values)
+        await self.session.execute(stmt)
+        await self.session.flush()
+
+    async def get(self, task_id: str) -> Optional[TaskResult]:
+        """Get result by task ID."""
+        result = await self.session.execute(select(TaskResult).where(TaskResult.task_id == task_id))
+        return result.scalar_one_or_none()
+
+    async def save_partial(self, task_id: str, full_text: str, segments: list) -> None:
+        """Insert or replace the text a running task has extracted so far."""
+        stmt = upsert(TaskPartialResult).values(
             task_id=task_id,
             full_text=full_text,
             segments={"items": segments},
-            stats=stats,
+            updated_at=datetime.utcnow(),
         )
-        self.session.add(result)
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[TaskPartialResult.task_id],
+            set_={
+                "full_text": stmt.excluded.full_text,
+                "segments": stmt.excluded.segments,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
         await self.session.flush()
-        return result
 
-    async def get(self, task_id: str) -> Optional[TaskResult]:
-        """Get result by task ID."""
-        result = await self.session.execute(select(TaskResult).where(TaskResult.task_id == task_id))
+    async def get_partial(self, task_id: str) -> Optional[TaskPartialResult]:
+        result = await self.session.execute(select(TaskPartialResult).where(TaskPartialResult.task_id == task_id))
         return result.scalar_one_or_none()
 
+    async def delete_partial(self, task_id: str) -> None:
+        await self.session.execute(delete(TaskPartialResult).where(TaskPartialResult.task_id == task_id))
+        await self.session.flush()
+
     async def delete(self, task_id: str) -> bool:
-        """Delete result by task ID."""
+        """Delete result (and any partial result) by task ID."""
+        await self.delete_partial(task_id)
         result = await self.session.execute(delete(TaskResult).where(TaskResult.task_id == task_id))
         await self.session.flush()
         return result.rowcount > 0
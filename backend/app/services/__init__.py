@@ -1,4 +1,6 @@
 """Services."""
 from app.services.storage import StorageService
+from app.services.downloader import download_media
+from app.services.result_cache import ResultCache, get_result_cache
 
-__all__ = ["StorageService"]
+__all__ = ["StorageService", "download_media", "ResultCache", "get_result_cache"]
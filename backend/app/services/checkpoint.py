@@ -0,0 +1,82 @@
+"""Per-task stage checkpoints stored in the task working directory."""
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from app.extractors.models import TextSegment
+
+
+class TaskCheckpoint:
+    """Persist completed stage outputs so an interrupted task can resume.
+
+    Layout inside the task dir:
+        checkpoint.json      {stage: data} for parse / download / hash / stream_hash
+        audio.wav            16 kHz mono audio decoded while streaming
+        segments/<src>.json  extractor output per text source
+    Files are written to a temp name and renamed, so anything present is
+    complete.
+    """
+
+    MANIFEST = "checkpoint.json"
+    AUDIO = "audio.wav"
+    SEGMENTS_DIR = "segments"
+
+    def __init__(self, task_dir: Path):
+        self.task_dir = Path(task_dir)
+
+    @property
+    def audio_path(self) -> Path:
+        return self.task_dir / self.AUDIO
+
+    def _read_manifest(self) -> dict:
+        path = self.task_dir / self.MANIFEST
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, stage: str) -> Optional[dict]:
+        """Saved output of a completed stage, or None."""
+        return self._read_manifest().get(stage)
+
+    def mark(self, stage: str, data: dict) -> None:
+        """Record a stage as completed with its output."""
+        manifest = self._read_manifest()
+        manifest[stage] = data
+        _atomic_write(self.task_dir / self.MANIFEST, json.dumps(manifest, ensure_ascii=False))
+
+    def load_segments(self, source: str) -> Optional[list[TextSegment]]:
+        """Saved segments for a text source, or None if not extracted yet."""
+        path = self.task_dir / self.SEGMENTS_DIR / f"{source}.json"
+        if not path.exists():
+            return None
+        try:
+            items = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return [TextSegment.from_dict(item) for item in items]
+
+    def save_segments(self, source: str, segments: list[TextSegment]) -> None:
+        path = self.task_dir / self.SEGMENTS_DIR / f"{source}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, json.dumps([s.to_dict() for s in segments], ensure_ascii=False))
+
+    def clear(self) -> None:
+        """Remove checkpoint files, keeping any media in the task dir."""
+        (self.task_dir / self.MANIFEST).unlink(missing_ok=True)
+        self.audio_path.unlink(missing_ok=True)
+        shutil.rmtree(self.task_dir / self.SEGMENTS_DIR, ignore_errors=True)
+        try:
+            self.task_dir.rmdir()  # Only succeeds if nothing else (e.g. an upload) is left
+        except OSError:
+            pass
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
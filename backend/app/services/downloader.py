@@ -0,0 +1,240 @@
+"""Remote media download via yt-dlp."""
+import hashlib
+import re
+import subprocess
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.cancellation import CancellationToken, TaskCancelledError
+from app.extractors.audio import SAMPLE_RATE, SAMPLE_WIDTH, AudioStream
+
+MEDIA_SUFFIXES = (".mp4", ".mkv", ".webm", ".flv", ".m4a")
+SUBTITLE_LANGS = ["zh", "zh-Hans", "zh-CN", "en"]
+
+# Bytes moved per read while piping the stream (~2 s of decoded audio)
+STREAM_READ_SIZE = SAMPLE_RATE * SAMPLE_WIDTH * 2
+# Progress lines from the template below: downloaded/total bytes. The total
+# falls back to yt-dlp's estimate, printed as a float, and either side is
+# "NA" while unknown
+STREAM_PROGRESS_PATTERN = re.compile(r"^(\d+(?:\.\d+)?|NA)/(\d+(?:\.\d+)?|NA)$")
+
+
+def find_downloaded_media(task_dir: Path) -> Optional[str]:
+    """Pick the downloaded media file in a task directory."""
+    files = [f for f in task_dir.glob("video.*") if not f.name.endswith((".part", ".ytdl"))]
+    video_files = [f for f in files if f.suffix.lower() in MEDIA_SUFFIXES]
+    return str(video_files[0]) if video_files else (str(files[0]) if files else None)
+
+
+def download_media(
+    url: str,
+    task_dir: Path,
+    cancel_token: Optional[CancellationToken] = None,
+    progress_callback: Optional[Callable[[int], None]] = None,
+) -> Optional[str]:
+    """Download media and subtitles into task_dir. Blocking.
+
+    The token is checked from yt-dlp's progress hooks, which fire for
+    every received chunk, so a cancelled download stops within one chunk.
+    ``progress_callback`` receives the download percentage.
+    """
+    import yt_dlp
+
+    last_pct = -1
+
+    def on_progress(status: dict) -> None:
+        nonlocal last_pct
+        check_cancelled(status)
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        if progress_callback and total and status.get("status") == "downloading":
+            pct = min(99, int(status.get("downloaded_bytes", 0) * 100 / total))
+            if pct != last_pct:
+                last_pct = pct
+                progress_callback(pct)
+
+    def check_cancelled(_status: dict) -> None:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+    ydl_opts = {
+        "outtmpl": str(task_dir / "video.%(ext)s"),
+        "writesubtitles": True,
+        "writeautomaticsub": True,
+        "subtitleslangs": SUBTITLE_LANGS,
+        "subtitlesformat": "vtt/srt/best",
+        "quiet": True,
+        "progress_hooks": [on_progress],
+        "postprocessor_hooks": [check_cancelled],
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
+    except Exception:
+        # yt-dlp may wrap the hook's exception in its own DownloadError
+        if cancel_token is not None and cancel_token.cancelled:
+            raise TaskCancelledError("任务已取消")
+        raise
+    return find_downloaded_media(task_dir)
+
+
+def download_subtitles(
+    url: str,
+    task_dir: Path,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Optional[str]:
+    """Download only the subtitles for url into task_dir. Blocking.
+
+    Returns the subtitle path, or None if the video has none.
+    """
+    import yt_dlp
+
+    ydl_opts = {
+        "outtmpl": str(task_dir / "video.%(ext)s"),
+        "skip_download": True,
+        "writesubtitles": True,
+        "writeautomaticsub": True,
+        "subtitleslangs": SUBTITLE_LANGS,
+        "subtitlesformat": "vtt/srt/best",
+        "quiet": True,
+    }
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+    for pattern in ("video.*.srt", "video.*.vtt"):
+        for p in task_dir.glob(pattern):
+            return str(p)
+    return None
+
+
+def stream_audio(
+    url: str,
+    audio: AudioStream,
+    cancel_token: Optional[CancellationToken] = None,
+    progress_callback: Optional[Callable[[int], None]] = None,
+) -> str:
+    """Download the audio track and decode it while it arrives. Blocking.
+
+    yt-dlp writes the best audio format to a pipe feeding ffmpeg, and the
+    decoded 16 kHz PCM is appended to ``audio`` as it is produced, so ASR
+    can start on the first chunks long before the download ends. Nothing
+    but the decoded audio is written to disk. Returns the SHA-256 of the
+    downloaded bytes. ``progress_callback`` receives the download
+    percentage.
+    """
+    download_cmd = [
+        sys.executable, "-m", "yt_dlp",
+        "-f", "bestaudio/best",
+        "-o", "-",
+        "--quiet", "--no-warnings", "--progress", "--newline",
+        "--progress-template", "download:%(progress.downloaded_bytes)s/%(progress.total_bytes,progress.total_bytes_estimate)s",
+        url,
+    ]
+    decode_cmd = [
+        "ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+        "pipe:1",
+    ]
+    download = subprocess.Popen(download_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        decode = subprocess.Popen(decode_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError:
+        download.kill()
+        download.wait()
+        raise
+    if cancel_token is not None:
+        cancel_token.register_process(download)
+        cancel_token.register_process(decode)
+
+    digest = hashlib.sha256()
+    download_log: deque[str] = deque(maxlen=20)
+    decode_log: deque[str] = deque(maxlen=20)
+    last_pct = -1
+
+    def on_download_line(line: str) -> None:
+        nonlocal last_pct
+        match = STREAM_PROGRESS_PATTERN.match(line)
+        if not match:
+            download_log.append(line)
+            return
+        if "NA" in match.groups():
+            return  # Size not known yet; not an error line either
+        done, total = float(match.group(1)), float(match.group(2))
+        if progress_callback and total:
+            pct = min(99, int(done * 100 // total))
+            if pct != last_pct:
+                last_pct = pct
+                progress_callback(pct)
+
+    def pump() -> None:
+        # yt-dlp stdout -> hash + ffmpeg stdin
+        try:
+            while True:
+                block = download.stdout.read(STREAM_READ_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                decode.stdin.write(block)
+        except (BrokenPipeError, ValueError):
+            pass  # ffmpeg exited; its return code reports why
+        finally:
+            try:
+                decode.stdin.close()
+            except OSError:
+                pass
+
+    threads = [
+        threading.Thread(target=pump, daemon=True),
+        threading.Thread(target=_read_lines, args=(download.stderr, on_download_line), daemon=True),
+        threading.Thread(target=_read_lines, args=(decode.stderr, decode_log.append), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    error: Optional[BaseException] = None
+    try:
+        pending = b""
+        while True:
+            block = decode.stdout.read(STREAM_READ_SIZE)
+            if not block:
+                break
+            block = pending + block
+            usable = len(block) - len(block) % SAMPLE_WIDTH
+            audio.append(block[:usable])
+            pending = block[usable:]
+        download.wait()
+        decode.wait()
+        for t in threads:
+            t.join()
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if download.returncode != 0:
+            raise RuntimeError(f"yt-dlp 退出码 {download.returncode}: {' '.join(download_log)}")
+        if decode.returncode != 0:
+            raise RuntimeError(f"ffmpeg 解码失败: {' '.join(decode_log)}")
+        if audio.duration == 0:
+            raise RuntimeError("未获取到音频")
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        for proc in (download, decode):
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            if cancel_token is not None:
+                cancel_token.unregister_process(proc)
+        audio.finish(error)
+    if progress_callback:
+        progress_callback(100)
+    return digest.hexdigest()
+
+
+def _read_lines(stream, on_line: Callable[[str], None]) -> None:
+    for raw in stream:
+        line = raw.decode("utf-8", errors="ignore").strip()
+        if line:
+            on_line(line)
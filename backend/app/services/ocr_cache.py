@@ -0,0 +1,153 @@
+"""OCR output cache keyed by perceptual frame hash, shared across tasks."""
+import asyncio
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from app.config import get_settings
+from app.database import async_session
+from app.repositories.cache_repository import OCRCacheRepository
+
+# Entries also kept in process memory, in front of the database, up to
+# this many and this many bytes of guards and text
+MEMORY_ENTRIES = 4096
+MEMORY_BYTES = 32 << 20
+
+# Stores between LRU evictions of the database table
+EVICT_EVERY = 50
+
+
+def make_ocr_key(digest: str, lang: str, size: tuple[int, int]) -> str:
+    """Cache key for a digest of the pixels OCR sees, its language and frame size.
+
+    The digest is perceptual (see ``ocr.cache_keys``), so near-identical
+    frames can share a key while carrying different text: each entry
+    keeps a guard that callers compare before using a hit.
+    """
+    return hashlib.sha256(f"{lang}:{size[0]}x{size[1]}:{digest}".encode("utf-8")).hexdigest()
+
+
+def _entry_size(entry: dict) -> int:
+    """Approximate bytes an entry holds: its guard and the UTF-8 text of its lines."""
+    return len(entry.get("check") or "") + sum(3 * len(line[0]) for line in entry.get("items", ()))
+
+
+class OCRCache:
+    """Persistent LRU of OCR lines, with a small in-memory LRU in front.
+
+    Entries are ``{"items": [[text, confidence], ...], "check": guard}``.
+    Frames that look the same (a video processed again, an intro or outro
+    re-encoded in other videos) are recognized once. The database
+    table keeps at most ``OCR_CACHE_ENTRIES`` entries, dropping the least
+    recently used. Hits and misses count frames, not probe keys, and an
+    entry counts as used only once its guard matched (``record``). Methods
+    run on the event loop; extraction threads use ``bind``.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._memory_bytes = 0
+        self._stores = 0
+
+    def _remember(self, key: str, entry: dict) -> None:
+        if key in self._memory:
+            self._memory_bytes -= _entry_size(self._memory[key])
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        self._memory_bytes += _entry_size(entry)
+        while len(self._memory) > MEMORY_ENTRIES or (self._memory_bytes > MEMORY_BYTES and len(self._memory) > 1):
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_bytes -= _entry_size(dropped)
+
+    async def lookup(self, keys: list[str]) -> dict[str, dict]:
+        """Cached entries for whichever keys are present, not yet counted as used."""
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                missing.append(key)
+        if missing:
+            async with async_session() as session:
+                stored = await OCRCacheRepository(session).get_many(missing)
+                await session.commit()
+            for key, entry in stored.items():
+                self._remember(key, entry)
+            found.update(stored)
+        return found
+
+    async def record(self, used: list[str], frames: int) -> None:
+        """Count a lookup of ``frames`` frames, served by the entries ``used`` (one per hit)."""
+        self.hits += len(used)
+        self.misses += frames - len(used)
+        if not used:
+            return
+        async with async_session() as session:
+            await OCRCacheRepository(session).record_hits(Counter(used))
+            await session.commit()
+
+    async def store(self, entries: dict[str, dict]) -> None:
+        """Store entries for new keys, evicting old entries now and then."""
+        if not entries:
+            return
+        for key, entry in entries.items():
+            self._remember(key, entry)
+        self._stores += 1
+        async with async_session() as session:
+            repo = OCRCacheRepository(session)
+            await repo.save_many(entries)
+            if self._stores % EVICT_EVERY == 0:
+                await repo.evict(self.capacity)
+            await session.commit()
+
+    async def stats(self) -> dict:
+        """Hit/miss counts since startup plus persisted totals."""
+        async with async_session() as session:
+            entries, total_hits = await OCRCacheRepository(session).totals()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "totalHits": total_hits,
+        }
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> "BoundOCRCache":
+        return BoundOCRCache(self, loop)
+
+
+class BoundOCRCache:
+    """Blocking view of an OCRCache for extraction threads, run on ``loop``."""
+
+    def __init__(self, cache: OCRCache, loop: asyncio.AbstractEventLoop):
+        self._cache = cache
+        self._loop = loop
+
+    def lookup(self, keys: list[str]) -> dict[str, dict]:
+        return asyncio.run_coroutine_threadsafe(self._cache.lookup(keys), self._loop).result()
+
+    def record(self, used: list[str], frames: int) -> None:
+        asyncio.run_coroutine_threadsafe(self._cache.record(used, frames), self._loop).result()
+
+    def store(self, entries: dict[str, dict]) -> None:
+        asyncio.run_coroutine_threadsafe(self._cache.store(entries), self._loop).result()
+
+
+_cache: Optional[OCRCache] = None
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Get the process-wide OCR cache, or None when OCR_CACHE_ENTRIES is 0."""
+    global _cache
+    capacity = get_settings().ocr_cache_entries
+    if capacity <= 0:
+        return None
+    if _cache is None:
+        _cache = OCRCache(capacity)
+    return _cache
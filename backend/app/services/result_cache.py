@@ -0,0 +1,85 @@
+"""Content-addressed cache of extraction results."""
+import hashlib
+import json
+from typing import Optional
+
+from app.database import async_session
+from app.extractors.models import MergedResult
+from app.repositories.cache_repository import ExtractCacheRepository
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_media(path: str) -> str:
+    """SHA-256 of a media file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(media_hash: str, settings: dict) -> str:
+    """Cache key for a media hash under the given extraction settings."""
+    payload = json.dumps({"media": media_hash, **settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Look up and store extraction results, counting hits and misses."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, cache_key: str) -> Optional[dict]:
+        """Return cached {full_text, segments, stats} or None."""
+        async with async_session() as session:
+            repo = ExtractCacheRepository(session)
+            entry = await repo.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            await repo.record_hit(cache_key)
+            await session.commit()
+        self.hits += 1
+        segments = entry.segments.get("items", []) if isinstance(entry.segments, dict) else entry.segments
+        return {"full_text": entry.full_text, "segments": segments, "stats": entry.stats}
+
+    async def store(self, cache_key: str, media_hash: str, merged: MergedResult, settings: dict) -> None:
+        """Store a merged result under the cache key."""
+        async with async_session() as session:
+            repo = ExtractCacheRepository(session)
+            await repo.save(
+                cache_key,
+                media_hash=media_hash,
+                full_text=merged.full_text,
+                segments=[s.to_dict() for s in merged.segments],
+                stats=merged.stats,
+                settings=settings,
+            )
+            await session.commit()
+
+    async def stats(self) -> dict:
+        """Hit/miss counts since startup plus persisted totals."""
+        async with async_session() as session:
+            entries, total_hits = await ExtractCacheRepository(session).totals()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "totalHits": total_hits,
+        }
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache."""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
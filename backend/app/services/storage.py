@@ -1,4 +1,5 @@
 """Storage service for media cache."""
+import shutil
 from pathlib import Path
 from app.config import get_settings
 
@@ -25,6 +26,4 @@ class StorageService:
         """Remove task cache directory."""
         path = self.cache_root / task_id
         if path.exists():
-            for f in path.iterdir():
-                f.unlink()
-            path.rmdir()
+            shutil.rmtree(path, ignore_errors=True)
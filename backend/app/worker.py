@@ -0,0 +1,146 @@
+"""Standalone task worker: ``python -m app.worker``.
+
+With ``TASK_EXECUTION=worker`` the API only records tasks; any number of
+worker processes, on this or other machines sharing the database and
+data directory, claim them through leases in the ``task_leases`` table.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Optional
+
+from app.config import get_settings
+from app.database import async_session, init_db
+from app.extractors.asr_parallel import shutdown_asr_pool
+from app.models.task import TaskStatus
+from app.orchestrator import cancel_execution, get_scheduler, shutdown_scheduler
+from app.orchestrator.executor import ACTIVE_STATUSES
+from app.orchestrator.scheduler import DEFAULT_LANE, batch_lane
+from app.repositories.batch_repository import BatchRepository
+from app.repositories.task_repository import TaskRepository
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claim tasks from the database and run them on the local scheduler.
+
+    Each loop iteration renews the leases of running tasks, stops tasks
+    that were cancelled through the API or whose lease was lost, releases
+    finished ones and claims new work up to ``capacity``. A worker that
+    dies stops renewing; its tasks are claimed again once their leases
+    expire and resume from their checkpoints.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        capacity: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.capacity = capacity or settings.worker_capacity
+        self.lease_seconds = lease_seconds or settings.lease_seconds
+        self.poll_interval = poll_interval or settings.worker_poll_interval
+        self._claimed: set[str] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Poll until stopped, then hand unfinished tasks back."""
+        logger.info("Worker %s started (capacity %d)", self.worker_id, self.capacity)
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self.tick()
+                except Exception:
+                    logger.exception("Worker %s poll failed", self.worker_id)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Renew first so the leases stay held while stages wind down;
+            # interrupted tasks keep their checkpoints, and releasing the
+            # leases lets another worker resume them without waiting
+            async with async_session() as session:
+                await TaskRepository(session).renew_leases(self.worker_id, list(self._claimed), self.lease_seconds)
+                await session.commit()
+            await shutdown_scheduler()
+            shutdown_asr_pool()
+            async with async_session() as session:
+                await TaskRepository(session).release_leases(self.worker_id, list(self._claimed))
+                await session.commit()
+            logger.info("Worker %s stopped", self.worker_id)
+
+    async def tick(self) -> None:
+        scheduler = get_scheduler()
+        finished = [t for t in self._claimed if not scheduler.is_running(t)]
+        running = [t for t in self._claimed if scheduler.is_running(t)]
+
+        async with async_session() as session:
+            repo = TaskRepository(session)
+            await repo.release_leases(self.worker_id, finished)
+            held = await repo.renew_leases(self.worker_id, running, self.lease_seconds)
+            cancelled = await repo.ids_with_status(running, TaskStatus.CANCELLED.value)
+            deleted = set(running) - await repo.existing_ids(running)
+            await session.commit()
+        self._claimed.difference_update(finished)
+
+        # Deleting a task also drops its lease; it is cancelled, not lost
+        for task_id in [*cancelled, *deleted]:
+            cancel_execution(task_id)
+        for task_id in set(running) - held - deleted:
+            # Lease expired and another worker took over: stop duplicate work
+            logger.warning("Worker %s lost lease on task %s", self.worker_id, task_id)
+            scheduler.cancel(task_id)
+            self._claimed.discard(task_id)
+
+        free = self.capacity - len(self._claimed)
+        if free <= 0:
+            return
+        async with async_session() as session:
+            tasks = await TaskRepository(session).claim(
+                self.worker_id,
+                ACTIVE_STATUSES,
+                free,
+                self.lease_seconds,
+                default_cost=scheduler.default_cost,
+                aging_rate=get_settings().queue_aging_rate,
+            )
+            batch_ids = await BatchRepository(session).batch_ids_for([t.id for t in tasks])
+            await session.commit()
+        for t in tasks:
+            self._claimed.add(t.id)
+            batch_id = batch_ids.get(t.id)
+            scheduler.submit(t.id, lane=batch_lane(batch_id) if batch_id else DEFAULT_LANE)
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    settings = get_settings()
+    settings.data_dir.mkdir(parents=True, exist_ok=True)
+    (settings.data_dir / "cache").mkdir(parents=True, exist_ok=True)
+    await init_db()
+    if settings.asr_preload:
+        from app.extractors.pipeline import warm_up
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        except Exception:
+            logger.warning("ASR warm-up failed; model will load on first task", exc_info=True)
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
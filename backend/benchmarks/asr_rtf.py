@@ -0,0 +1,77 @@
+"""Real-time factor of each ASR backend and model size on one audio file.
+
+Usage (from backend/):
+    python -m benchmarks.asr_rtf sample.mp4
+    python -m benchmarks.asr_rtf sample.mp4 --backends whisper faster-whisper --models tiny base small
+
+RTF is transcription wall time divided by audio duration; below 1 means
+faster than real time. Model load time is reported separately. Backends
+that are not installed are listed as skipped.
+"""
+import argparse
+import time
+
+from app.extractors.asr_backends import BACKENDS, get_backend
+from app.extractors.audio import SAMPLE_RATE, decode_pcm
+
+
+def run(media: str, backends: list[str], models: list[str], language: str, seconds: float, threads: int) -> list[dict]:
+    pcm = decode_pcm(media)
+    if seconds:
+        pcm = pcm[: int(seconds * SAMPLE_RATE)]
+    samples = pcm.astype("float32")
+    samples /= 32768.0
+    duration = len(samples) / SAMPLE_RATE
+
+    rows = []
+    for name in backends:
+        backend = get_backend(name)
+        for model_size in models:
+            row = {"backend": name, "model": model_size, "duration": duration}
+            if not backend.available():
+                rows.append({**row, "skipped": f"not installed ({backend.install_hint})"})
+                continue
+            start = time.perf_counter()
+            model = backend.load(model_size, threads)
+            loaded = time.perf_counter()
+            segments = backend.transcribe(model, samples, language=language)
+            done = time.perf_counter()
+            rows.append({
+                **row,
+                "load": loaded - start,
+                "transcribe": done - loaded,
+                "rtf": (done - loaded) / duration,
+                "segments": len(segments),
+                "chars": sum(len(s["text"].strip()) for s in segments),
+            })
+            del model
+    return rows
+
+
+def print_table(rows: list[dict]) -> None:
+    print("| backend | model | audio s | load s | transcribe s | RTF | segments | chars |")
+    print("|---|---|---|---|---|---|---|---|")
+    for r in rows:
+        if "skipped" in r:
+            print(f"| {r['backend']} | {r['model']} | {r['duration']:.1f} | {r['skipped']} | | | | |")
+            continue
+        print(
+            f"| {r['backend']} | {r['model']} | {r['duration']:.1f} | {r['load']:.1f} | "
+            f"{r['transcribe']:.1f} | {r['rtf']:.3f} | {r['segments']} | {r['chars']} |"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("media", help="audio or video file")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--language", default="zh")
+    parser.add_argument("--seconds", type=float, default=0, help="only use the first N seconds")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per model (0: library default)")
+    args = parser.parse_args()
+    print_table(run(args.media, args.backends, args.models, args.language, args.seconds, args.threads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Throughput and peak memory of subtitle parsing, merging and serialization.
+
+Usage (from backend/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --sizes 1000 10000 100000 1000000 --components merge merge_stream
+    python -m benchmarks.micro --save            # record a baseline
+    python -m benchmarks.micro --compare         # compare against it
+
+Inputs are synthetic and seeded: SRT/VTT files of N cues, and N mixed
+subtitle/ASR/OCR segments shaped like a real video (ASR repeating the
+subtitles with small differences, burned-in captions read by OCR over
+several frames, a recurring slogan and a channel watermark). Runs
+offline; no Whisper, ffmpeg or OCR engine is needed.
+
+Time is the best of ``--repeat`` runs; peak memory is measured in a
+separate run under tracemalloc (Python allocations only). ``--compare``
+exits with status 1 if any component is slower or uses more memory
+than the baseline by more than ``--tolerance``.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from app.extractors.merger import IncrementalMerger, merge
+from app.extractors.models import TextSegment, TextSource
+from app.extractors.subtitle import parse_srt, parse_vtt
+
+DEFAULT_BASELINE = Path(__file__).with_name("micro-baseline.json")
+
+# Common Chinese characters, for text with a realistic shingle vocabulary
+CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所"
+    "民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日"
+    "那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想"
+)
+# Cue times wrap before 100 h, the most an SRT/VTT timestamp can express
+MAX_CUE_TIME = 99 * 3600.0
+# Share of ASR segments repeating a subtitle cue, with small differences
+ASR_DUPLICATE_RATE = 0.6
+# Share of subtitle cues also burned into the picture and read by OCR
+OCR_CAPTION_RATE = 0.5
+
+
+def _sentence(rng: random.Random) -> str:
+    return "".join(rng.choice(CHARS) for _ in range(rng.randint(6, 24)))
+
+
+def _misheard(rng: random.Random, text: str) -> str:
+    """``text`` with a character or two changed, as ASR would."""
+    chars = list(text)
+    for _ in range(rng.randint(0, 2)):
+        chars[rng.randrange(len(chars))] = rng.choice(CHARS)
+    return "".join(chars)
+
+
+def _cues(count: int, seed: int) -> list[tuple[float, float, str]]:
+    rng = random.Random(seed)
+    cues = []
+    t = 0.0
+    for _ in range(count):
+        length = rng.uniform(1.2, 4.0)
+        text = _sentence(rng)
+        if rng.random() < 0.2:  # Two-line cue
+            text += "\n" + _sentence(rng)
+        cues.append((t, t + length, text))
+        t += length + rng.uniform(0.0, 0.8)
+        if t > MAX_CUE_TIME:  # Timestamps have two-digit hours; very long files start over
+            t = 0.0
+    return cues
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    ms = round(seconds * 1000)
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}{separator}{ms % 1000:03d}"
+
+
+def make_srt(count: int, seed: int = 0) -> str:
+    """An SRT file of ``count`` cues."""
+    blocks = [
+        f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}"
+        for i, (start, end, text) in enumerate(_cues(count, seed), 1)
+    ]
+    return "\n\n".join(blocks) + "\n"
+
+
+def make_vtt(count: int, seed: int = 0) -> str:
+    """A WebVTT file of ``count`` cues (with cue identifiers)."""
+    blocks = [
+        f"{i}\n{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}"
+        for i, (start, end, text) in enumerate(_cues(count, seed), 1)
+    ]
+    return "WEBVTT\n\n" + "\n\n".join(blocks) + "\n"
+
+
+def make_segments(count: int, seed: int = 0) -> dict[str, list[TextSegment]]:
+    """About ``count`` segments per source name, each list in start order.
+
+    About a third come from each source. Most ASR segments repeat
+    a subtitle cue with jittered times and a misheard character or two;
+    half the cues are also burned in and read by OCR on two or three
+    sampled frames; a slogan recurs every minute and a channel watermark
+    is on screen throughout, in 30 s pieces.
+    """
+    rng = random.Random(seed)
+    sources: dict[str, list[TextSegment]] = {"subtitle": [], "asr": [], "ocr": []}
+    slogan, watermark = "点赞关注不迷路", "@某某频道官方"
+    total = 0
+    t = 0.0
+    next_slogan = next_watermark = 0.0
+    while total < count:
+        length = rng.uniform(1.2, 4.0)
+        text = _sentence(rng)
+        sources["subtitle"].append(TextSegment(TextSource.SUBTITLE, t, t + length, text))
+        total += 1
+        if rng.random() < ASR_DUPLICATE_RATE:
+            start = max(0.0, t + rng.uniform(-0.4, 0.4))
+            sources["asr"].append(TextSegment(TextSource.ASR, start, start + length, _misheard(rng, text), 0.9))
+        else:
+            sources["asr"].append(TextSegment(TextSource.ASR, t, t + length, _sentence(rng), 0.9))
+        total += 1
+        ocr = sources["ocr"]
+        if rng.random() < OCR_CAPTION_RATE and total < count:
+            # The tracker splits a caption when one frame misreads it
+            frame = t
+            while frame < t + length and total < count:
+                end = min(t + length, frame + rng.choice((1.0, 2.0)))
+                ocr.append(TextSegment(TextSource.OCR, frame, end, text if rng.random() < 0.8 else _misheard(rng, text), 0.8))
+                total += 1
+                frame = end
+        if t >= next_slogan and total < count:
+            ocr.append(TextSegment(TextSource.OCR, t, t + 3.0, slogan, 0.95))
+            total += 1
+            next_slogan = t + 60.0
+        if t >= next_watermark and total < count:
+            ocr.append(TextSegment(TextSource.OCR, t, t + 30.0, watermark, 0.95))
+            total += 1
+            next_watermark = t + 30.0
+        t += length + rng.uniform(0.0, 0.8)
+    for segments in sources.values():
+        segments.sort(key=lambda s: s.start_time)
+    return sources
+
+
+def _merge_stream(sources: dict[str, list[TextSegment]], chunk: int = 50) -> list[TextSegment]:
+    """Feed the sources to an IncrementalMerger in interleaved chunks, as extractors would."""
+    merger = IncrementalMerger(sources)
+    out: list[TextSegment] = []
+    longest = max((len(segments) for segments in sources.values()), default=0)
+    for i in range(0, longest, chunk):
+        for name, segments in sources.items():
+            if i < len(segments):
+                out.extend(merger.add(name, segments[i:i + chunk]))
+    out.extend(merger.finish())
+    return out
+
+
+def _flat(sources: dict[str, list[TextSegment]]) -> list[TextSegment]:
+    return [seg for segments in sources.values() for seg in segments]
+
+
+# name -> (make input for size n, run on it, items processed)
+COMPONENTS: dict[str, tuple[Callable[[int], object], Callable[[object], object], Callable[[object], int]]] = {
+    "parse_srt": (make_srt, parse_srt, lambda content: content.count(" --> ")),
+    "parse_vtt": (make_vtt, parse_vtt, lambda content: content.count(" --> ")),
+    "merge": (lambda n: _flat(make_segments(n)), merge, len),
+    "merge_stream": (make_segments, _merge_stream, lambda sources: len(_flat(sources))),
+    "to_dict": (lambda n: _flat(make_segments(n)), lambda segs: [s.to_dict() for s in segs], len),
+    "json": (
+        lambda n: [s.to_dict() for s in _flat(make_segments(n))],
+        lambda dicts: json.dumps({"items": dicts}),
+        len,
+    ),
+}
+
+
+def _check(name: str, data: object, output: object) -> None:
+    """Fail loudly if a component stopped doing its work (e.g. a parser dropping cues)."""
+    if name in ("parse_srt", "parse_vtt") and len(output) != data.count(" --> "):
+        raise AssertionError(f"{name} parsed {len(output)} of {data.count(' --> ')} cues")
+    if name == "merge_stream":
+        batch = merge(_flat(data))
+        if [(s.start_time, s.text) for s in output] != [(s.start_time, s.text) for s in batch.segments]:
+            raise AssertionError("merge_stream output differs from merge")
+
+
+def run(components: list[str], sizes: list[int], repeat: int) -> list[dict]:
+    rows = []
+    for name in components:
+        make, func, count = COMPONENTS[name]
+        for size in sizes:
+            data = make(size)
+            items = count(data)
+            best = float("inf")
+            output = None
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                output = func(data)
+                best = min(best, time.perf_counter() - start)
+            _check(name, data, output)
+            output = None
+            gc.collect()
+            tracemalloc.start()
+            func(data)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append({
+                "component": name,
+                "size": size,
+                "items": items,
+                "seconds": best,
+                "itemsPerSecond": items / best if best else 0.0,
+                "peakBytes": peak,
+            })
+            print(f"{name} {size}: {best:.4f} s, {peak / 1e6:.1f} MB", file=sys.stderr)
+    return rows
+
+
+def compare(rows: list[dict], baseline: dict, tolerance: float) -> list[dict]:
+    """Annotate rows with ratios to the baseline; ``regressed`` beyond ``tolerance``."""
+    base = {(r["component"], r["size"]): r for r in baseline["results"]}
+    for row in rows:
+        ref = base.get((row["component"], row["size"]))
+        if ref is None:
+            continue
+        row["timeRatio"] = row["seconds"] / ref["seconds"] if ref["seconds"] else 1.0
+        row["memoryRatio"] = row["peakBytes"] / ref["peakBytes"] if ref["peakBytes"] else 1.0
+        row["regressed"] = row["timeRatio"] > 1 + tolerance or row["memoryRatio"] > 1 + tolerance
+    return rows
+
+
+def print_table(rows: list[dict]) -> None:
+    compared = any("timeRatio" in r for r in rows)
+    header = "| component | size | items | seconds | items/s | peak MB |"
+    if compared:
+        header += " time vs base | memory vs base |"
+    print(header)
+    print("|---" * header.count(" |") + "|")
+    for r in rows:
+        line = (
+            f"| {r['component']} | {r['size']} | {r['items']} | {r['seconds']:.4f} | "
+            f"{r['itemsPerSecond']:,.0f} | {r['peakBytes'] / 1e6:.1f} |"
+        )
+        if compared:
+            if "timeRatio" in r:
+                flag = " **regressed**" if r["regressed"] else ""
+                line += f" {r['timeRatio']:.2f}x{flag} | {r['memoryRatio']:.2f}x |"
+            else:
+                line += " (no baseline) | |"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--components", nargs="+", default=list(COMPONENTS), choices=list(COMPONENTS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; the best counts")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, type=Path, help="write results as a baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, type=Path, help="compare with a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown or memory growth (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    rows = run(args.components, args.sizes, max(1, args.repeat))
+    regressed = False
+    if args.compare:
+        rows = compare(rows, json.loads(args.compare.read_text()), args.tolerance)
+        regressed = any(r.get("regressed") for r in rows)
+    print_table(rows)
+    if args.save:
+        args.save.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "platform": platform.platform(),
+                "createdAt": datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": [{k: r[k] for k in ("component", "size", "items", "seconds", "itemsPerSecond", "peakBytes")} for r in rows],
+        }, indent=2))
+        print(f"baseline saved to {args.save}", file=sys.stderr)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Parity of the windowed merge with the original all-pairs merge."""
+import random
+
+import pytest
+
+from app.extractors import merger
+from app.extractors.merger import DUPLICATE_WINDOW, SOURCE_PRIORITY, IncrementalMerger, _is_duplicate, merge
+from app.extractors.models import TextSegment, TextSource
+
+
+def reference_merge(segments: list[TextSegment]) -> list[TextSegment]:
+    """The original merge: compare each segment with every kept one."""
+    sorted_segs = sorted(segments, key=lambda s: (s.start_time, -SOURCE_PRIORITY.get(s.source, 0)))
+    merged: list[TextSegment] = []
+    for seg in sorted_segs:
+        skip = False
+        for existing in merged:
+            if _is_duplicate(seg, existing):
+                if SOURCE_PRIORITY.get(seg.source, 0) <= SOURCE_PRIORITY.get(existing.source, 0):
+                    skip = True
+                    break
+        if not skip:
+            merged.append(seg)
+    merged.sort(key=lambda s: s.start_time)
+    return merged
+
+
+@pytest.fixture
+def no_collapse(monkeypatch):
+    # Collapsing repeats came after the sweep; compare the dedupe alone
+    monkeypatch.setattr(merger, "COLLAPSE_MIN_CHARS", float("inf"))
+
+
+def _segment(source: TextSource, start: float, text: str, length: float = 1.0) -> TextSegment:
+    return TextSegment(source=source, start_time=start, end_time=start + length, text=text)
+
+
+def _random_text(rng: random.Random, bases: list[str]) -> str:
+    if rng.random() < 0.05:
+        return ""
+    if rng.random() < 0.6:
+        text = rng.choice(bases)
+    else:
+        text = "".join(rng.choice("的是一不了人我在有他这中大来上abcdef ") for _ in range(rng.randint(1, 80)))
+    if text and rng.random() < 0.5:
+        i = rng.randrange(len(text))
+        text = text[:i] + rng.choice("xyz字") + text[i + 1:]
+    return text
+
+
+def _random_segments(rng: random.Random, n: int) -> list[TextSegment]:
+    # Lengths around 50 cross the character / bigram shingle switch
+    bases = [
+        "".join(rng.choice("春眠不觉晓处处闻啼鸟夜来风雨声花落知多少abc") for _ in range(rng.choice([3, 8, 20, 49, 50, 60, 120])))
+        for _ in range(max(1, n // 8))
+    ]
+    segments = []
+    for _ in range(n):
+        mode = rng.random()
+        if mode < 0.3:
+            start = round(rng.uniform(0, n / 4), 1)
+        elif mode < 0.5:
+            start = rng.randint(0, n // 4) * 1.0  # Many equal starts
+        elif mode < 0.6:
+            start = rng.choice([0.1, 0.2, 0.3, 1.1, 1.2, 1.3, 2.3])  # Gaps near the window edge
+        else:
+            start = rng.uniform(0, n / 4)
+        length = 0.0 if rng.random() < 0.1 else rng.uniform(0.5, 3.0)
+        segments.append(_segment(rng.choice(list(TextSource)), start, _random_text(rng, bases), length))
+    return segments
+
+
+def assert_parity(segments: list[TextSegment]) -> None:
+    expected = reference_merge(segments)
+    result = merge(segments)
+    assert result.segments == expected
+    assert result.full_text == "\n\n".join(s.text for s in expected)
+    for src in TextSource:
+        kept = [s for s in expected if s.source == src]
+        if kept:
+            assert result.stats[src.value] == {"segmentCount": len(kept), "charCount": sum(len(s.text) for s in kept)}
+        else:
+            assert src.value not in result.stats
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.usefixtures("no_collapse")
+def test_random_parity(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        assert_parity(_random_segments(rng, rng.randint(0, 120)))
+
+
+@pytest.mark.usefixtures("no_collapse")
+def test_equal_timestamps():
+    segments = [
+        _segment(TextSource.OCR, 5.0, "大家好欢迎收看"),
+        _segment(TextSource.ASR, 5.0, "大家好欢迎收看"),
+        _segment(TextSource.SUBTITLE, 5.0, "大家好欢迎收看"),
+        _segment(TextSource.ASR, 5.0, "大家好欢迎收看"),
+        _segment(TextSource.ASR, 5.0, "完全不同的内容"),
+    ]
+    assert_parity(segments)
+    assert [(s.source, s.text) for s in merge(segments).segments] == [
+        (TextSource.SUBTITLE, "大家好欢迎收看"),
+        (TextSource.ASR, "完全不同的内容"),
+    ]
+
+
+@pytest.mark.usefixtures("no_collapse")
+def test_zero_length_segments():
+    segments = [
+        _segment(TextSource.OCR, 0.0, "画面文字", 0.0),
+        _segment(TextSource.OCR, 0.0, "画面文字", 0.0),
+        _segment(TextSource.ASR, 0.5, "画面文字", 0.0),
+        _segment(TextSource.SUBTITLE, 3.0, "", 0.0),
+        _segment(TextSource.ASR, 3.0, "", 0.0),
+    ]
+    assert_parity(segments)
+
+
+@pytest.mark.parametrize("gap", [DUPLICATE_WINDOW - 1e-9, DUPLICATE_WINDOW, DUPLICATE_WINDOW + 1e-9])
+@pytest.mark.usefixtures("no_collapse")
+def test_window_edge(gap):
+    segments = [
+        _segment(TextSource.SUBTITLE, 10.0, "同一句台词"),
+        _segment(TextSource.ASR, 10.0 + gap, "同一句台词"),
+        _segment(TextSource.OCR, 10.0 + 2 * gap, "同一句台词"),
+    ]
+    assert_parity(segments)
+    kept = [s.source for s in merge(segments).segments]
+    # Exactly at the window edge still counts as a duplicate; the dropped
+    # ASR segment does not shadow the OCR one after it
+    if gap <= DUPLICATE_WINDOW:
+        assert kept == [TextSource.SUBTITLE, TextSource.OCR]
+    else:
+        assert kept == [TextSource.SUBTITLE, TextSource.ASR, TextSource.OCR]
+
+
+@pytest.mark.usefixtures("no_collapse")
+def test_window_edge_float_starts():
+    # 0.1 + 1.0 and 1.1 differ in binary; both merges must see the same gap
+    segments = [_segment(TextSource.ASR, start, "重复的一句话") for start in (0.1, 1.1, 1.2, 2.2, 2.3, 3.3)]
+    assert_parity(segments)
+
+
+def test_collapse_repeats_a_minute_apart():
+    # A slogan repeated every minute, with narration in between
+    segments = []
+    for minute in range(10):
+        segments.append(_segment(TextSource.OCR, minute * 60.0, "关注频道不迷路", 3.0))
+        segments.append(_segment(TextSource.ASR, minute * 60.0 + 20.0, f"第{minute}段解说内容", 5.0))
+    result = merge(segments)
+    slogans = [s for s in result.segments if s.text == "关注频道不迷路"]
+    assert [(s.start_time, s.end_time) for s in slogans] == [(0.0, 543.0)]
+    assert len(result.segments) == 11
+    assert result.stats["ocr"] == {"segmentCount": 1, "charCount": 7, "collapsed": 9}
+
+    # Streamed one source at a time, the slogan run is emitted early and still extended
+    stream = IncrementalMerger([TextSource.OCR, TextSource.ASR])
+    emitted = []
+    for seg in sorted(segments, key=lambda s: s.start_time):
+        emitted += stream.add(seg.source, [seg])
+    emitted += stream.finish()
+    assert sorted(emitted, key=lambda s: s.start_time) == result.segments
+    assert stream.stats() == result.stats
+
+
+def test_repeated_subtitle_line_survives():
+    # Dialogue said again minutes later is content, not a lingering caption
+    segments = [
+        _segment(TextSource.SUBTITLE, 10.0, "我们明天再见吧", 2.0),
+        _segment(TextSource.SUBTITLE, 50.0, "今天就到这里了", 2.0),
+        _segment(TextSource.SUBTITLE, 250.0, "我们明天再见吧", 2.0),
+    ]
+    result = merge(segments)
+    assert [(s.start_time, s.end_time, s.text) for s in result.segments] == [
+        (10.0, 12.0, "我们明天再见吧"),
+        (50.0, 52.0, "今天就到这里了"),
+        (250.0, 252.0, "我们明天再见吧"),
+    ]
+    assert result.full_text.count("我们明天再见吧") == 2
+    assert "collapsed" not in result.stats["subtitle"]
+
+    # Close repeats of a line still collapse
+    close = merge([_segment(TextSource.ASR, 0.0, "我们明天再见吧", 2.0), _segment(TextSource.ASR, 5.0, "我们明天再见吧", 2.0)])
+    assert [(s.start_time, s.end_time) for s in close.segments] == [(0.0, 7.0)]
@@ -34,6 +34,42 @@ export async function getTask(taskId: string) {
   return api<TaskResponse>(`/api/tasks/${taskId}`)
 }
 
+export const TERMINAL_STATUSES = ['completed', 'failed', 'cancelled']
+
+export type TaskEvent = Pick<TaskResponse, 'status' | 'progress' | 'stageProgress' | 'error'> & {
+  taskId: string
+  /** Segments in the stored partial result; changes when it is rewritten */
+  partialSegments?: number
+}
+
+function subscribe(path: string, onEvent: (e: TaskEvent) => void, onError?: () => void) {
+  const source = new EventSource(`${API_BASE}${path}`)
+  source.onmessage = (msg) => onEvent(JSON.parse(msg.data) as TaskEvent)
+  source.onerror = () => {
+    source.close()
+    onError?.()
+  }
+  return () => source.close()
+}
+
+/** Server-pushed progress for one task. Returns a function that closes the stream. */
+export function subscribeTask(taskId: string, onEvent: (e: TaskEvent) => void, onError?: () => void) {
+  const close = subscribe(
+    `/api/tasks/${taskId}/events`,
+    (e) => {
+      onEvent(e)
+      if (TERMINAL_STATUSES.includes(e.status)) close()
+    },
+    onError,
+  )
+  return close
+}
+
+/** Server-pushed progress for every running task. Returns a function that closes the stream. */
+export function subscribeAllTasks(onEvent: (e: TaskEvent) => void, onError?: () => void) {
+  return subscribe('/api/tasks/events', onEvent, onError)
+}
+
 export async function listTasks(params?: { limit?: number; offset?: number }) {
   const q = new URLSearchParams(params as Record<string, string>)
   return api<{ items: TaskResponse[]; total: number }>(`/api/tasks?${q}`)
@@ -47,6 +83,13 @@ export async function exportTask(taskId: string, format: string) {
   return api<{ content: string; format: string }>(`/api/tasks/${taskId}/export?format=${format}`)
 }
 
+export interface TaskSegment {
+  source: string
+  startTime: number
+  endTime: number
+  text: string
+}
+
 export interface TaskResponse {
   id: string
   input: string
@@ -58,9 +101,15 @@ export interface TaskResponse {
   error: string | null
   result?: {
     fullText: string
-    segments: { source: string; startTime: number; endTime: number; text: string }[]
-    stats: Record<string, { segmentCount: number; charCount: number }>
+    segments: TaskSegment[]
+    stats: Record<string, { segmentCount: number; charCount: number; unavailable?: string }>
   }
+  /** Text extracted so far, while the task runs (or when it stopped early) */
+  partial?: {
+    fullText: string
+    segments: TaskSegment[]
+    updatedAt: string | null
+  } | null
   createdAt: string
   updatedAt: string
 }
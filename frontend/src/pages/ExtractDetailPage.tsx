@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { useParams, Link } from 'react-router-dom'
-import { getTask, cancelTask, exportTask } from '../api/client'
+import { getTask, cancelTask, exportTask, subscribeTask, TERMINAL_STATUSES } from '../api/client'
 import type { TaskResponse } from '../api/client'
 
 export default function ExtractDetailPage() {
@@ -10,22 +10,43 @@ export default function ExtractDetailPage() {
 
   useEffect(() => {
     if (!taskId) return
-    const fetchTask = async () => {
-      try {
-        const t = await getTask(taskId)
-        setTask(t)
-      } catch (err) {
-        setError(err instanceof Error ? err.message : '获取失败')
-      }
-    }
-    fetchTask()
-    const done = ['completed', 'failed', 'cancelled']
-    const interval = setInterval(async () => {
+    let interval: ReturnType<typeof setInterval> | undefined
+    const refresh = async () => {
       const t = await getTask(taskId).catch(() => null)
       if (t) setTask(t)
-      if (t && done.includes(t.status)) clearInterval(interval)
-    }, 2000)
-    return () => clearInterval(interval)
+      return t
+    }
+    // Fallback when the event stream is unavailable
+    const startPolling = () => {
+      if (interval) return
+      interval = setInterval(async () => {
+        const t = await refresh()
+        if (t && TERMINAL_STATUSES.includes(t.status)) clearInterval(interval)
+      }, 2000)
+    }
+    getTask(taskId)
+      .then(setTask)
+      .catch((err) => setError(err instanceof Error ? err.message : '获取失败'))
+    let partialSegments = 0
+    const close = subscribeTask(
+      taskId,
+      (e) => {
+        setTask((t) => t ? { ...t, status: e.status, progress: e.progress, stageProgress: e.stageProgress, error: e.error } : t)
+        // Results are not part of the stream: fetch them once finished, and
+        // the partial text whenever the server has stored a newer one
+        if (TERMINAL_STATUSES.includes(e.status)) {
+          refresh()
+        } else if (e.partialSegments && e.partialSegments !== partialSegments) {
+          partialSegments = e.partialSegments
+          refresh()
+        }
+      },
+      startPolling,
+    )
+    return () => {
+      close()
+      if (interval) clearInterval(interval)
+    }
   }, [taskId])
 
   const handleCancel = async () => {
@@ -91,6 +112,24 @@ export default function ExtractDetailPage() {
 
         {task.error && <p className="mt-4 text-red-600">{task.error}</p>}
 
+        {!task.result && task.partial && (
+          <div className="mt-6">
+            <p className="text-slate-500 text-sm mb-2">
+              {done ? '已提取的部分内容' : '识别中，以下为已提取的部分内容…'}
+            </p>
+            <div className="border border-slate-200 rounded p-4 bg-slate-50 min-h-[200px] space-y-3">
+              {task.partial.segments.map((s, i) => (
+                <div key={i} className="flex gap-2">
+                  <span className="text-xs text-slate-400 shrink-0">
+                    [{s.source}] {s.startTime.toFixed(1)}s
+                  </span>
+                  <span>{s.text}</span>
+                </div>
+              ))}
+            </div>
+          </div>
+        )}
+
         {task.result && (
           <div className="mt-6">
             <div className="flex gap-2 mb-4">
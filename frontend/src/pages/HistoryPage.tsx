@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
-import { listTasks } from '../api/client'
+import { listTasks, subscribeAllTasks } from '../api/client'
 import type { TaskResponse } from '../api/client'
 
 export default function HistoryPage() {
@@ -12,6 +12,9 @@ export default function HistoryPage() {
       .then((r) => setTasks(r.items))
       .catch(() => {})
       .finally(() => setLoading(false))
+    return subscribeAllTasks((e) => {
+      setTasks((items) => items.map((t) => t.id === e.taskId ? { ...t, status: e.status, progress: e.progress } : t))
+    })
   }, [])
 
   if (loading) return <div>加载中…</div>